@@ -0,0 +1,245 @@
+"""Sales analytics from a columnar snapshot of the orders.
+
+Orders are flattened once into typed ``array`` columns (one entry per order
+for status, one per line item for day, product, units and cents) instead of
+being kept as dicts.  Revenue/units per product per day, week and month are
+aggregated from those columns in one batched pass, then kept current by
+applying the store's change feed (new orders, status changes, deletes), so
+refreshing after a checkout touches one order rather than all of them.
+
+Like the dashboard stats, revenue and units leave out Cancelled orders.
+"""
+import threading
+from array import array
+from datetime import date
+
+GRANULARITIES = ('day', 'week', 'month')
+FUNNEL_STATUSES = ['Pending', 'Processing', 'Shipped', 'Delivered', 'Cancelled']
+DELETED = -1
+CHANGE_BATCH = 5000
+
+
+def _day(order_date):
+    """Proleptic ordinal of an order_date, or 0 if it has none"""
+    try:
+        return date.fromisoformat(str(order_date)[:10]).toordinal()
+    except ValueError:
+        return 0
+
+
+def period_key(day, granularity):
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        # Ordinal 1 (0001-01-01) is a Monday, so weeks start on Mondays
+        return day - (day - 1) % 7
+    d = date.fromordinal(day)
+    return d.year * 12 + d.month - 1
+
+
+def period_label(key, granularity):
+    if granularity == 'month':
+        return f"{key // 12:04d}-{key % 12 + 1:02d}"
+    return date.fromordinal(key).isoformat()
+
+
+class SalesAnalytics:
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._cursor = None
+        self._reset()
+
+    def _reset(self):
+        self._rows = {}                      # order_id -> order row
+        self._status = array('b')            # per order: status code, DELETED once gone
+        self._first_line = array('l')        # per order: index of its first line
+        self._line_count = array('l')        # per order: number of lines
+        self._line_day = array('l')          # per line: day ordinal (0 if unknown)
+        self._line_product = array('l')      # per line: product code
+        self._line_units = array('l')
+        self._line_cents = array('q')
+        self._products, self._product_codes = [], {}
+        self._statuses, self._status_codes = [], {}
+        self._status_counts = {}             # status code -> live orders
+        self._totals = {g: {} for g in GRANULARITIES}  # (period, product code) -> [cents, units]
+
+    def _code(self, value, values, codes):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def _counted(self, status_code):
+        return status_code != DELETED and self._statuses[status_code] != 'Cancelled'
+
+    # -- loading --------------------------------------------------------
+
+    def _load(self, order):
+        """Append an order to the columns; returns its row, or None if known"""
+        order_id = order.order_id
+        if order_id in self._rows:
+            return None
+        row = self._rows[order_id] = len(self._status)
+        self._status.append(self._code(order.status, self._statuses, self._status_codes))
+        self._first_line.append(len(self._line_day))
+        day = _day(order.order_date)
+        for item in order.items:
+            self._line_day.append(day)
+            self._line_product.append(self._code(item.product_id or 'unknown', self._products,
+                                                 self._product_codes))
+            self._line_units.append(item.quantity)
+            self._line_cents.append(item.total_cents)
+        self._line_count.append(len(order.items))
+        return row
+
+    def _aggregate(self):
+        """Recompute every total from the columns in one batched pass"""
+        counts = {}
+        for code in self._status:
+            if code != DELETED:
+                counts[code] = counts.get(code, 0) + 1
+        self._status_counts = counts
+        counted = bytes(self._counted(code) for code in self._status)
+        # Line -> counted flag, expanded from the per-order column
+        line_counted = bytearray()
+        for flag, n in zip(counted, self._line_count):
+            line_counted.extend(bytes((flag,)) * n)
+        for granularity in GRANULARITIES:
+            totals = {}
+            periods = {}
+            for day, product, units, cents, flag in zip(self._line_day, self._line_product, self._line_units,
+                                                        self._line_cents, line_counted):
+                if not flag or not day:
+                    continue
+                period = periods.get(day)
+                if period is None:
+                    period = periods[day] = period_key(day, granularity)
+                key = (period, product)
+                entry = totals.get(key)
+                if entry is None:
+                    totals[key] = [cents, units]
+                else:
+                    entry[0] += cents
+                    entry[1] += units
+            self._totals[granularity] = totals
+
+    def _contribute(self, row, sign):
+        """Add (sign=1) or remove (sign=-1) one order's lines from the totals"""
+        first = self._first_line[row]
+        for i in range(first, first + self._line_count[row]):
+            day = self._line_day[i]
+            if not day:
+                continue
+            for granularity in GRANULARITIES:
+                entry = self._totals[granularity].setdefault(
+                    (period_key(day, granularity), self._line_product[i]), [0, 0])
+                entry[0] += sign * self._line_cents[i]
+                entry[1] += sign * self._line_units[i]
+
+    def _set_status(self, row, code):
+        old = self._status[row]
+        if old == code:
+            return
+        if old != DELETED:
+            self._status_counts[old] -= 1
+        if code != DELETED:
+            self._status_counts[code] = self._status_counts.get(code, 0) + 1
+        was, now = self._counted(old), self._counted(code)
+        self._status[row] = code
+        if was != now:
+            self._contribute(row, 1 if now else -1)
+
+    # -- change feed ----------------------------------------------------
+
+    def _apply(self, change):
+        op = change['op']
+        row = self._rows.get(change['order_id'])
+        if op == 'add':
+            order = change.get('order')
+            if order is None:
+                return
+            if row is None:
+                row = self._load(order)
+                code = self._status[row]
+                self._status[row] = DELETED
+                self._set_status(row, code)
+            else:
+                self._set_status(row, self._code(order.status, self._statuses, self._status_codes))
+        elif row is not None and op == 'status':
+            self._set_status(row, self._code(change['status'], self._statuses, self._status_codes))
+        elif row is not None and op == 'delete':
+            self._set_status(row, DELETED)
+
+    def _rebuild(self):
+        self._reset()
+        cursor = self.store.change_cursor()
+        for order in self.store.iter_orders():
+            self._load(order)
+        self._aggregate()
+        # Changes that landed during the scan are applied on top; applying
+        # an already-loaded order again is a no-op
+        self._cursor = cursor
+
+    def refresh(self):
+        """Bring the snapshot up to date with the store"""
+        with self._lock:
+            if self._cursor is None:
+                self._rebuild()
+            while True:
+                changes, cursor, reset = self.store.changes(self._cursor, limit=CHANGE_BATCH)
+                if reset:
+                    self._rebuild()
+                    continue
+                for change in changes:
+                    self._apply(change)
+                self._cursor = cursor
+                if len(changes) < CHANGE_BATCH:
+                    return
+
+    # -- reporting ------------------------------------------------------
+
+    def report(self, granularity='day', date_from=None, date_to=None, periods=30):
+        """Revenue and units per product per period (newest first) plus the status funnel"""
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+        self.refresh()
+        with self._lock:
+            low = period_key(_day(date_from), granularity) if date_from and _day(date_from) else None
+            high = period_key(_day(date_to), granularity) if date_to and _day(date_to) else None
+            by_period = {}
+            for (key, product), (cents, units) in self._totals[granularity].items():
+                if (low is not None and key < low) or (high is not None and key > high):
+                    continue
+                if cents or units:
+                    by_period.setdefault(key, {})[self._products[product]] = (cents, units)
+            keys = sorted(by_period, reverse=True)
+            if periods and not (date_from or date_to):
+                keys = keys[:periods]
+            products = sorted({product for key in keys for product in by_period[key]})
+            rows = []
+            total_cents = total_units = 0
+            for key in keys:
+                cells = by_period[key]
+                cents = sum(cents for cents, _ in cells.values())
+                units = sum(units for _, units in cells.values())
+                total_cents += cents
+                total_units += units
+                rows.append({
+                    'period': period_label(key, granularity),
+                    'products': {product: {'revenue': c / 100, 'units': u} for product, (c, u) in cells.items()},
+                    'revenue': cents / 100,
+                    'units': units,
+                })
+            counts = {self._statuses[code]: n for code, n in self._status_counts.items() if n}
+            funnel = [(status, counts.pop(status, 0)) for status in FUNNEL_STATUSES]
+            funnel.extend(sorted(counts.items()))
+            return {
+                'granularity': granularity,
+                'products': products,
+                'rows': rows,
+                'funnel': funnel,
+                'revenue': total_cents / 100,
+                'units': total_units,
+            }
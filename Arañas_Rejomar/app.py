@@ -1,178 +1,192 @@
-from flask import Flask, render_template, request, redirect, url_for, session
-import json
+import click
+from flask import (Flask, Response, current_app, g, jsonify, render_template, request, redirect,
+                   stream_with_context, url_for, session)
+from flask.cli import with_appcontext
+from werkzeug.local import LocalProxy
+from werkzeug.middleware.proxy_fix import ProxyFix
+import logging
 import os
+import time
+from concurrent import futures
 from datetime import datetime
 from functools import wraps
 
-app = Flask(__name__)
-app.secret_key = 'your-secret-key-change-this-in-production'  # Change this in production!
-
-# Product data
-PRODUCTS = {
-    'malunggay': {
-        'id': 'malunggay',
-        'name': 'Malunggay Soap',
-        'price': 10.00,
-        'image': 'malunggay.jpg',
-        'description': 'Nourishing soap made with malunggay leaves, rich in vitamins and minerals. Perfect for healthy, glowing skin.',
-        'ingredients': 'Malunggay extract, Coconut oil, Olive oil, Glycerin',
-        'benefits': 'Rich in Vitamin C, promotes healthy skin, natural moisturizer'
-    },
-    'soapy': {
-        'id': 'soapy',
-        'name': 'Soapy Soap',
-        'price': 15.00,
-        'image': 'soapy.jpg',
-        'description': 'Classic handmade soap with a gentle formula suitable for all skin types.',
-        'ingredients': 'Coconut oil, Palm oil, Glycerin, Essential oils',
-        'benefits': 'Gentle cleansing, suitable for sensitive skin, moisturizing'
-    },
-    'lavender': {
-        'id': 'lavender',
-        'name': 'Lavender Bliss',
-        'price': 20.00,
-        'image': 'lavander.jpg',
-        'description': 'Calming lavender-infused soap that helps relax your mind and soothe your skin.',
-        'ingredients': 'Lavender essential oil, Coconut oil, Shea butter, Glycerin',
-        'benefits': 'Calming aroma, stress relief, skin soothing properties'
-    },
-    'honey': {
-        'id': 'honey',
-        'name': 'Honey Almond',
-        'price': 25.00,
-        'image': 'honey.jpg',
-        'description': 'Luxurious soap with honey and almond extracts for soft, smooth, and radiant skin.',
-        'ingredients': 'Honey, Almond oil, Coconut oil, Glycerin, Vitamin E',
-        'benefits': 'Deep moisturizing, anti-aging properties, natural glow'
-    }
-}
+import analytics
+import assets
+import carts
+import catalog
+import export
+import metrics
+import page_cache
+import passwords
+import pricing
+import ratelimit
+from storage import BACKENDS, Order, OrderWriter, WriteQueueFull, migrate, open_stores
+
+# Debug output is off unless SOOTHING_BAR_LOG_LEVEL=DEBUG; disabled debug
+# calls cost a level check and nothing else
+logging.basicConfig(level=os.environ.get('SOOTHING_BAR_LOG_LEVEL', 'WARNING').upper(),
+                    format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+logger = logging.getLogger('soothing_bar')
+
+SECRET_KEY = 'your-secret-key-change-this-in-production'  # Change this in production!
 
-# Orders storage file - use absolute path relative to this file
-# Get the directory where this script is located
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-ORDERS_FILE = os.path.join(BASE_DIR, 'orders.json')
-# Users storage file - use absolute path relative to this file
-USERS_FILE = os.path.join(BASE_DIR, 'users.json')
-
-# Print paths on startup for debugging
-print(f"BASE_DIR: {BASE_DIR}")
-print(f"ORDERS_FILE: {ORDERS_FILE}")
-print(f"ORDERS_FILE exists: {os.path.exists(ORDERS_FILE)}")
-print(f"USERS_FILE: {USERS_FILE}")
-print(f"USERS_FILE exists: {os.path.exists(USERS_FILE)}")
-
-def load_orders():
-    """Load orders from JSON file"""
-    try:
-        print(f"load_orders() called - ORDERS_FILE path: {ORDERS_FILE}")
-        print(f"Absolute path: {os.path.abspath(ORDERS_FILE)}")
-        print(f"File exists: {os.path.exists(ORDERS_FILE)}")
+ORDER_SAVE_TIMEOUT = 30
+CATALOG_PAGE_SIZE = 24
+FEATURED_PRODUCTS = 3
+
+
+def default_config():
+    """Settings read from the environment; create_app(config) overrides any of them"""
+    return {
+        'SECRET_KEY': SECRET_KEY,
+        # Product catalog; edits are picked up within CATALOG_CHECK_INTERVAL seconds
+        'CATALOG_FILE': os.environ.get('SOOTHING_BAR_CATALOG', os.path.join(BASE_DIR, 'products.json')),
+        'CATALOG_CHECK_INTERVAL': float(os.environ.get('SOOTHING_BAR_CATALOG_CHECK_INTERVAL', 1.0)),
+        # Data files live next to this file unless SOOTHING_BAR_DATA_DIR points elsewhere (benchmarks)
+        'DATA_DIR': os.environ.get('SOOTHING_BAR_DATA_DIR', BASE_DIR),
+        # 'json' (orders.jsonl journal + users.json) or 'sqlite' (soothing_bar.db)
+        'STORAGE_BACKEND': os.environ.get('SOOTHING_BAR_STORAGE', 'json'),
+        # Fallback: orders.json in the current working directory (legacy behaviour), imported once
+        'LEGACY_ORDERS_FILES': [os.path.join(os.getcwd(), 'orders.json')],
+        # 'session' keeps carts in the signed cookie; 'server' keeps only a
+        # token there and the cart in carts.db (see carts.py)
+        'CART_BACKEND': os.environ.get('SOOTHING_BAR_CARTS', 'session'),
+        'CART_CACHE_SIZE': int(os.environ.get('SOOTHING_BAR_CART_CACHE_SIZE', 10000)),
+        'CART_TTL': int(os.environ.get('SOOTHING_BAR_CART_TTL', carts.DEFAULT_TTL)),
+        'RENDER_CACHE_SIZE': int(os.environ.get('SOOTHING_BAR_RENDER_CACHE_SIZE', 512)),
+        # Build hashed, precompressed static files at startup unless a deploy
+        # step already ran `flask build-assets` (SOOTHING_BAR_BUILD_ASSETS=0)
+        'BUILD_ASSETS': os.environ.get('SOOTHING_BAR_BUILD_ASSETS', '1') != '0',
+        # Checkouts hand their order to a background writer that group-commits
+        # concurrent orders with one fsync; SOOTHING_BAR_WRITE_BEHIND=0 saves inline
+        'WRITE_BEHIND': os.environ.get('SOOTHING_BAR_WRITE_BEHIND', '1') != '0',
+        'ORDER_QUEUE': int(os.environ.get('SOOTHING_BAR_ORDER_QUEUE', 1000)),
+        # Per-client limits on login/signup/checkout submissions, and how many
+        # of them may run at once per process (0: no cap); see ratelimit.py
+        'RATE_LIMITS': ratelimit.parse_limits(os.environ.get('SOOTHING_BAR_RATE_LIMITS',
+                                                             ratelimit.DEFAULT_LIMITS)),
+        'STORAGE_CONCURRENCY': int(os.environ.get('SOOTHING_BAR_STORAGE_CONCURRENCY',
+                                                  ratelimit.DEFAULT_CONCURRENCY)),
+        # Reverse proxies in front of the app whose X-Forwarded-For/-Proto are
+        # trusted, so rate limits see the visitor's address rather than the
+        # proxy's.  Leave at 0 when clients connect directly: they could forge it.
+        'PROXY_HOPS': int(os.environ.get('SOOTHING_BAR_PROXY_HOPS', 0)),
+        # Password hash method and cost for new hashes (older ones are rehashed
+        # at login), and the pool that computes them; see passwords.py
+        'PASSWORD_HASH_METHOD': os.environ.get('SOOTHING_BAR_PASSWORD_HASH', passwords.DEFAULT_METHOD),
+        'PASSWORD_WORKERS': int(os.environ.get('SOOTHING_BAR_PASSWORD_WORKERS', os.cpu_count() or 1)),
+        'PASSWORD_QUEUE': int(os.environ.get('SOOTHING_BAR_PASSWORD_QUEUE', 32)),
+        # Load orders, users and reports in create_app() rather than on the first request
+        'WARM_UP': os.environ.get('SOOTHING_BAR_WARM_UP', '1') != '0',
+    }
 
-        data = []
-        primary_path = ORDERS_FILE
 
-        if os.path.exists(primary_path):
-            with open(primary_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                print(f"Loaded data type: {type(data)} from {primary_path}")
+class Services:
+    """The stores and caches create_app() opens once per app.
+
+    Under ``gunicorn --preload`` (see gunicorn.conf.py) they are opened and
+    warmed in the master, so forked workers share the loaded orders, users
+    and report snapshot copy-on-write instead of each rereading them.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.catalog = catalog.Catalog(config['CATALOG_FILE'], check_interval=config['CATALOG_CHECK_INTERVAL'])
+        # Every route goes through these two stores
+        self.order_store, self.user_store = open_stores(config['STORAGE_BACKEND'], config['DATA_DIR'],
+                                                        legacy_orders_paths=config['LEGACY_ORDERS_FILES'])
+        self.render_cache = page_cache.RenderCache(config['RENDER_CACHE_SIZE'])
+        # Sales reports from a columnar snapshot kept current by the store's change feed
+        self.sales_analytics = analytics.SalesAnalytics(self.order_store)
+        self.order_writer = (OrderWriter(self.order_store, max_queue=config['ORDER_QUEUE'])
+                             if config['WRITE_BEHIND'] else None)
+        if config['CART_BACKEND'] == 'server':
+            self.cart_store = carts.ServerCarts(os.path.join(config['DATA_DIR'], 'carts.db'),
+                                                max_entries=config['CART_CACHE_SIZE'], ttl=config['CART_TTL'])
         else:
-            print(f"Orders file not found at {primary_path}")
+            self.cart_store = carts.SessionCarts()
+        self.rate_limits = ratelimit.RateLimits(config['RATE_LIMITS'], config['STORAGE_CONCURRENCY'])
+        self.password_hasher = passwords.PasswordHasher(config['PASSWORD_HASH_METHOD'],
+                                                        workers=config['PASSWORD_WORKERS'],
+                                                        max_pending=config['PASSWORD_QUEUE'])
+        self.asset_pipeline = None
 
-        # Fallback: check for orders.json in current working directory (legacy behaviour)
-        if (not data) and os.getcwd() != BASE_DIR:
-            fallback_path = os.path.join(os.getcwd(), 'orders.json')
-            if os.path.exists(fallback_path):
-                try:
-                    with open(fallback_path, 'r', encoding='utf-8') as f:
-                        fallback_data = json.load(f)
-                        if isinstance(fallback_data, list) and fallback_data:
-                            print(f"Using fallback orders.json at {fallback_path} (found {len(fallback_data)} orders)")
-                            data = fallback_data
-                            # Optional: copy fallback contents into primary file so future reads succeed
-                            try:
-                                with open(primary_path, 'w', encoding='utf-8') as pf:
-                                    json.dump(fallback_data, pf, indent=2, ensure_ascii=False)
-                                print("Synced fallback orders into primary orders.json")
-                            except Exception as sync_error:
-                                print(f"Unable to sync fallback orders to primary file: {sync_error}")
-                except Exception as fb_err:
-                    print(f"Error reading fallback orders.json: {fb_err}")
-
-        if isinstance(data, list):
-            print(f"Returning {len(data)} orders")
-            return data
-        elif data:
-            # Data exists but is not a list – convert if possible
-            try:
-                converted = list(data)
-                print(f"Converted non-list data to list with length {len(converted)}")
-                return converted
-            except Exception as convert_error:
-                print(f"Warning: orders.json data is not iterable (type {type(data)}): {convert_error}")
-        else:
-            print("No orders data found; returning empty list")
+    def warm_up(self):
+        """Load orders, users and the sales snapshot now instead of on first use"""
+        self.order_store.stats()
+        self.user_store.all()
+        self.sales_analytics.refresh()
+        if self.config['STORAGE_BACKEND'] == 'sqlite':
+            # SQLite connections must not be carried across a fork
+            self.order_store.db.close()
+
+
+def get_services():
+    return current_app.extensions['soothing_bar']
 
-        return []
-    except Exception as e:
-        print(f"Error loading orders from {ORDERS_FILE}: {e}")
-        import traceback
-        traceback.print_exc()
-        return []
+
+def get_catalog():
+    """The catalog snapshot for this request; one request never sees two versions"""
+    snapshot = g.get('catalog')
+    if snapshot is None:
+        snapshot = g.catalog = get_services().catalog.current()
+    return snapshot
+
+
+# Routes use these like module globals; each resolves to the current app's Services
+order_store = LocalProxy(lambda: get_services().order_store)
+user_store = LocalProxy(lambda: get_services().user_store)
+cart_store = LocalProxy(lambda: get_services().cart_store)
+render_cache = LocalProxy(lambda: get_services().render_cache)
+sales_analytics = LocalProxy(lambda: get_services().sales_analytics)
+
+_views = []
+_context_processors = []
+
+
+def route(rule, **options):
+    """Like ``app.route``, but registered on every app create_app() builds"""
+    def decorator(view):
+        _views.append((rule, view, options))
+        return view
+    return decorator
+
+
+def context_processor(f):
+    _context_processors.append(f)
+    return f
 
 def save_order(order):
-    """Save a new order to JSON file"""
+    """Save a new order to the order store"""
     try:
-        print(f"Attempting to save order to: {ORDERS_FILE}")
-        print(f"File exists before save: {os.path.exists(ORDERS_FILE)}")
-        orders = load_orders()
-        print(f"Loaded {len(orders)} existing orders")
-        if not isinstance(orders, list):
-            print(f"Warning: orders is not a list, converting to list. Type: {type(orders)}")
-            orders = []
-        orders.append(order)
-        print(f"Total orders after append: {len(orders)}")
-        with open(ORDERS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(orders, f, indent=2, ensure_ascii=False)
-        print(f"Order saved successfully: {order.get('order_id', 'Unknown')} to {ORDERS_FILE}")
-        print(f"File exists after save: {os.path.exists(ORDERS_FILE)}")
-        # Verify the save worked
-        verify_orders = load_orders()
-        print(f"Verification: {len(verify_orders)} orders in file after save")
+        order_writer = get_services().order_writer
+        if order_writer is not None:
+            # Returns once the order is durably written by the group commit
+            order_writer.save(order, timeout=ORDER_SAVE_TIMEOUT)
+        else:
+            order_store.add(order)
+        logger.debug("Order saved successfully: %s to %s", order.order_id, order_store.path)
         return True
+    except WriteQueueFull as e:
+        logger.warning("Order not saved, write queue full: %s", e)
+        return False
+    except futures.TimeoutError:
+        # Withdrawn before the writer reached it, so it is definitely not saved
+        logger.warning("Order not saved, not written within %ds", ORDER_SAVE_TIMEOUT)
+        return False
     except Exception as e:
-        print(f"Error saving order: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error saving order: %s", e)
         return False
 
-def load_users():
-    """Load users from JSON file"""
-    try:
-        if os.path.exists(USERS_FILE):
-            with open(USERS_FILE, 'r') as f:
-                return json.load(f)
-    except (json.JSONDecodeError, IOError) as e:
-        print(f"Error loading users: {e}")
-        return []
-    return []
-
 def save_user(user_data):
-    """Save a new user to JSON file"""
+    """Save a new user to the user store"""
     try:
-        users = load_users()
-        # Check if username or email already exists
-        for user in users:
-            if user['username'] == user_data['username']:
-                return False, "Username already exists!"
-            if user['email'] == user_data['email']:
-                return False, "Email already registered!"
-        
-        users.append(user_data)
-        with open(USERS_FILE, 'w') as f:
-            json.dump(users, f, indent=2)
-        return True, "User registered successfully!"
+        # Username/email uniqueness is checked against the store's indexes
+        return user_store.add(user_data)
     except IOError as e:
-        print(f"Error saving user: {e}")
+        logger.error("Error saving user: %s", e)
         return False, "Error saving user. Please try again."
 
 def admin_required(f):
@@ -195,95 +209,141 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+BUSY_MESSAGE = "The shop is busy, please try again in a moment."
+
+def limited_response(message, status, retry_after):
+    return Response(message, status, {'Retry-After': str(retry_after)}, mimetype='text/plain')
+
+def busy_response():
+    return limited_response(BUSY_MESSAGE, 503, ratelimit.BUSY_RETRY_AFTER)
+
+def rate_limited(name):
+    """Decorator for the storage-heavy form posts: a per-client token bucket,
+    then a slot under the shared concurrency cap.  Turned-away requests get
+    an immediate 429/503 with Retry-After; GETs pass straight through."""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method != 'POST':
+                return f(*args, **kwargs)
+            limits = get_services().rate_limits
+            # Logged-in clients are told apart by account, everyone else by address
+            client = session.get('username') or request.remote_addr
+            retry_after = limits.retry_after(name, client)
+            if retry_after:
+                return limited_response("Too many requests, please try again later.", 429, retry_after)
+            if not limits.try_enter():
+                return busy_response()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                limits.leave()
+        return decorated_function
+    return decorator
+
 # Cart helper functions
 def get_cart():
-    """Get cart from session"""
-    return session.get('cart', {})
+    """Get cart from the cart store"""
+    return cart_store.get()
+
+def cart_changed():
+    """Drop this request's cached cart pricing after a change"""
+    g.pop('priced_cart', None)
 
 def add_to_cart(product_id, quantity=1):
     """Add product to cart"""
-    cart = get_cart()
-    if product_id in cart:
-        cart[product_id] += quantity
-    else:
-        cart[product_id] = quantity
-    session['cart'] = cart
+    cart_store.add(product_id, quantity)
+    cart_changed()
 
 def remove_from_cart(product_id):
     """Remove product from cart"""
-    cart = get_cart()
-    if product_id in cart:
-        del cart[product_id]
-        session['cart'] = cart
+    cart_store.remove(product_id)
+    cart_changed()
 
 def update_cart_item(product_id, quantity):
     """Update quantity of item in cart"""
-    cart = get_cart()
-    if product_id in cart:
-        if quantity > 0:
-            cart[product_id] = quantity
-        else:
-            del cart[product_id]
-        session['cart'] = cart
+    cart_store.set_quantity(product_id, quantity)
+    cart_changed()
 
 def clear_cart():
     """Clear entire cart"""
-    session['cart'] = {}
+    cart_store.clear()
+    cart_changed()
 
-def get_cart_total():
-    """Calculate total price of cart"""
-    cart = get_cart()
-    total = 0
-    for product_id, quantity in cart.items():
-        if product_id in PRODUCTS:
-            total += PRODUCTS[product_id]['price'] * quantity
-    return total
+def get_priced_cart():
+    """Line items, total and count of the cart, computed once per request"""
+    priced = g.get('priced_cart')
+    if priced is None:
+        priced = g.priced_cart = pricing.price_cart(get_cart(), get_catalog().products)
+    return priced
 
 def get_cart_count():
     """Get total number of items in cart"""
-    cart = get_cart()
-    return sum(cart.values())
+    return get_priced_cart().count
 
 # Context processor to make session and cart available in all templates
-@app.context_processor
+@context_processor
 def inject_session():
     return dict(session=session, cart_count=get_cart_count())
 
+def render_catalog_page(template, **context):
+    """Render a catalog page through the render cache.
+
+    Only the nav bar varies between visitors, so the key is the page (with its
+    query string) plus the catalog version and the values the nav bar shows.
+    """
+    key = (request.full_path, get_catalog().version, get_cart_count(), session.get('username'),
+           bool(session.get('user_logged_in')), bool(session.get('admin_logged_in')))
+    return page_cache.render_cached(render_cache, key, template, **context)
+
 # Home page route
-@app.route('/')
+@route('/')
 def home():
-    return render_template('index.html', products=PRODUCTS)
+    return render_catalog_page('index.html', products=get_catalog().featured(FEATURED_PRODUCTS))
 
 
 # Products page route
-@app.route('/products')
+@route('/products')
 def products():
-    return render_template('products.html', products=PRODUCTS)
+    snapshot = get_catalog()
+    category = request.args.get('category') or None
+    if category not in snapshot.categories:
+        category = None
+    sort = request.args.get('sort')
+    if sort not in catalog.SORTS:
+        sort = 'featured'
+    page = max(request.args.get('page', 1, type=int) or 1, 1)
+    items, total = snapshot.listing(category, sort, page, CATALOG_PAGE_SIZE)
+    pages = max((total + CATALOG_PAGE_SIZE - 1) // CATALOG_PAGE_SIZE, 1)
+    return render_catalog_page('products.html', products=items, categories=snapshot.categories,
+                               filters={'category': category, 'sort': sort, 'page': page},
+                               pages=pages, total=total)
 
 # Product detail page route
-@app.route('/product/<product_id>')
+@route('/product/<product_id>')
 def product_detail(product_id):
-    if product_id not in PRODUCTS:
+    product = get_catalog().get(product_id)
+    if product is None:
         return redirect(url_for('products'))
-    product = PRODUCTS[product_id]
-    return render_template('product_detail.html', product=product)
+    return render_catalog_page('product_detail.html', product=product)
 
 
 # Contact page route
-@app.route('/contact', methods=['GET', 'POST'])
+@route('/contact', methods=['GET', 'POST'])
 def contact():
     if request.method == 'POST':
         # Capture the form data (name, email, message)
         name = request.form['name']
         email = request.form['email']
         message = request.form['message']
-        print(f"Message from {name} ({email}): {message}")  # For testing, you can print the message here
+        logger.info("Message from %s (%s): %s", name, email, message)  # For testing, the message is only logged
         return render_template('contact.html', message_sent=True)
     return render_template('contact.html', message_sent=False)
 
 
 # Login page route
-@app.route('/login', methods=['GET', 'POST'])
+@route('/login', methods=['GET', 'POST'])
+@rate_limited('login')
 def login():
     if request.method == 'POST':
         # Capture the form data (username, password)
@@ -296,29 +356,36 @@ def login():
             session['username'] = 'admin'
             return redirect(url_for('admin_dashboard'))  # Redirect to admin dashboard
         
-        # Check for regular user login
-        users = load_users()
-        user_found = False
-        for user in users:
-            if user['username'] == username and user['password'] == password:
-                session['user_logged_in'] = True
-                session['username'] = username
-                session['user_email'] = user['email']
-                user_found = True
-                # Redirect to intended page or home
-                next_url = session.pop('next_url', None)
-                if next_url:
-                    return redirect(next_url)
-                return redirect(url_for('home'))  # Redirect to home after successful login
+        # Check for regular user login; the hash is checked on the password pool
+        user = user_store.get(username)
+        try:
+            valid, new_hash = get_services().password_hasher.verify(user, password)
+        except passwords.PasswordHasherBusy as e:
+            logger.warning("Login turned away: %s", e)
+            return busy_response()
+        if valid:
+            if new_hash is not None:
+                # A plaintext password or an old-cost hash: save the new hash
+                try:
+                    user_store.set_password_hash(username, new_hash)
+                except IOError as e:
+                    logger.error("Error upgrading password hash for %s: %s", username, e)
+            session['user_logged_in'] = True
+            session['username'] = username
+            session['user_email'] = user['email']
+            # Redirect to intended page or home
+            next_url = session.pop('next_url', None)
+            if next_url:
+                return redirect(next_url)
+            return redirect(url_for('home'))  # Redirect to home after successful login
         
-        if not user_found:
-            return render_template('login.html',
-                                   error="Invalid username or password")  # Show error message if login fails
+        return render_template('login.html',
+                               error="Invalid username or password")  # Show error message if login fails
     
     return render_template('login.html')
 
 # Logout route
-@app.route('/logout')
+@route('/logout')
 def logout():
     session.pop('admin_logged_in', None)
     session.pop('user_logged_in', None)
@@ -328,7 +395,8 @@ def logout():
 
 
 # Sign-up page route
-@app.route('/signup', methods=['GET', 'POST'])
+@route('/signup', methods=['GET', 'POST'])
+@rate_limited('signup')
 def signup():
     if request.method == 'POST':
         # Capture form data (username, email, password, confirm password)
@@ -345,11 +413,24 @@ def signup():
         if username.lower() == "admin":
             return render_template('signup.html', error="Username 'admin' is reserved. Please choose another username.")
 
+        # Turn duplicates away before paying for a hash; save_user() checks
+        # again under the store's lock for signups racing each other
+        if user_store.get(username) is not None:
+            return render_template('signup.html', error="Username already exists!")
+        if user_store.get_by_email(email) is not None:
+            return render_template('signup.html', error="Email already registered!")
+
+        try:
+            password_hash = get_services().password_hasher.hash(password)
+        except passwords.PasswordHasherBusy as e:
+            logger.warning("Signup turned away: %s", e)
+            return busy_response()
+
         # Save user details
         user_data = {
             'username': username,
             'email': email,
-            'password': password,  # In production, use password hashing!
+            'password_hash': password_hash,
             'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
         
@@ -362,257 +443,367 @@ def signup():
     return render_template('signup.html')
 
 # Cart routes
-@app.route('/cart/add/<product_id>', methods=['POST'])
+@route('/cart/add/<product_id>', methods=['POST'])
 def add_to_cart_route(product_id):
-    if product_id not in PRODUCTS:
+    if get_catalog().get(product_id) is None:
         return redirect(url_for('products'))
     
     quantity = int(request.form.get('quantity', 1))
     add_to_cart(product_id, quantity)
     return redirect(request.referrer or url_for('products'))
 
-@app.route('/cart')
+@route('/cart')
 def view_cart():
-    cart = get_cart()
-    cart_items = []
-    total = 0
-    
-    for product_id, quantity in cart.items():
-        if product_id in PRODUCTS:
-            product = PRODUCTS[product_id]
-            item_total = product['price'] * quantity
-            total += item_total
-            cart_items.append({
-                'product_id': product_id,
-                'product': product,
-                'quantity': quantity,
-                'item_total': item_total
-            })
-    
-    return render_template('cart.html', cart_items=cart_items, total=total)
+    priced = get_priced_cart()
+    return render_template('cart.html', cart_items=priced.lines, total=priced.total)
 
-@app.route('/cart/update/<product_id>', methods=['POST'])
+@route('/cart/update/<product_id>', methods=['POST'])
 def update_cart_route(product_id):
     quantity = int(request.form.get('quantity', 1))
     update_cart_item(product_id, quantity)
     return redirect(url_for('view_cart'))
 
-@app.route('/cart/remove/<product_id>', methods=['POST'])
+@route('/cart/remove/<product_id>', methods=['POST'])
 def remove_from_cart_route(product_id):
     remove_from_cart(product_id)
     return redirect(url_for('view_cart'))
 
-@app.route('/cart/clear', methods=['POST'])
+@route('/cart/clear', methods=['POST'])
 def clear_cart_route():
     clear_cart()
     return redirect(url_for('view_cart'))
 
 # Checkout page route
-@app.route('/checkout', methods=['GET', 'POST'])
+@route('/checkout', methods=['GET', 'POST'])
 @login_required
+@rate_limited('checkout')
 def checkout():
     cart = get_cart()
     
     if not cart:
         return redirect(url_for('view_cart'))
     
+    priced = get_priced_cart()
+    if priced.missing:
+        # Taken out of the catalog since they were added; say so rather than
+        # quietly placing an order without them
+        for product_id in priced.missing:
+            remove_from_cart(product_id)
+        priced = get_priced_cart()
+        if not priced.lines:
+            return redirect(url_for('view_cart'))
+        return checkout_page(priced, error="Some items in your cart are no longer available and were removed. "
+                                           "Please review your order.")
+
     if request.method == 'POST':
-        # Get cart items
-        cart_items = []
-        for product_id, quantity in cart.items():
-            if product_id in PRODUCTS:
-                product = PRODUCTS[product_id]
-                cart_items.append({
-                    'product_id': product_id,
-                    'product_name': product['name'],
-                    'quantity': quantity,
-                    'unit_price': product['price'],
-                    'total_price': product['price'] * quantity
-                })
-        
-        # Create order for each item (or combine into one order)
-        order_id = f"ORD-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        total_price = get_cart_total()
-        
-        # Save order with all items
-        order_data = {
-            'order_id': order_id,
-            'items': cart_items,
-            'total_price': total_price,
-            'customer_name': request.form['customer_name'],
-            'email': request.form['email'],
-            'phone': request.form['phone'],
-            'shipping_address': request.form['shipping_address'],
-            'city': request.form['city'],
-            'postal_code': request.form['postal_code'],
-            'payment_method': request.form['payment_method'],
-            'order_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'status': 'Pending'
-        }
+        # Save order with all items; the store assigns a collision-free
+        # order_id under its write lock
+        order_data = Order(
+            priced.order_items(),
+            total_cents=priced.total_cents,
+            customer_name=request.form['customer_name'],
+            email=request.form['email'],
+            phone=request.form['phone'],
+            shipping_address=request.form['shipping_address'],
+            city=request.form['city'],
+            postal_code=request.form['postal_code'],
+            payment_method=request.form['payment_method'],
+            order_date=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            status='Pending',
+        )
         
         # Save order
-        print(f"About to save order: {order_data.get('order_id', 'Unknown')}")
+        logger.debug("About to save order for: %s", order_data.customer_name)
         save_result = save_order(order_data)
-        print(f"Save result: {save_result}")
+        logger.debug("Save result: %s", save_result)
         if save_result:
             # Clear cart after successful order
             clear_cart()
             try:
                 return render_template('checkout_success.html', order=order_data)
             except Exception as e:
-                print(f"Template rendering error: {e}")
+                logger.exception("Template rendering error: %s", e)
                 # Fallback: redirect to home with success message
                 return redirect(url_for('home'))
         else:
             # Error saving order, reload checkout page with error
-            print("ERROR: Failed to save order!")
-            cart_items = []
-            total = 0
-            for product_id, quantity in cart.items():
-                if product_id in PRODUCTS:
-                    product = PRODUCTS[product_id]
-                    item_total = product['price'] * quantity
-                    total += item_total
-                    cart_items.append({
-                        'product_id': product_id,
-                        'product': product,
-                        'quantity': quantity,
-                        'item_total': item_total
-                    })
-            user_info = {}
-            if session.get('user_logged_in'):
-                users = load_users()
-                for user in users:
-                    if user['username'] == session.get('username'):
-                        user_info = {
-                            'name': user.get('username', ''),
-                            'email': user.get('email', '')
-                        }
-                        break
-            return render_template('checkout.html', cart_items=cart_items, total=total, user_info=user_info, error="Error saving order. Please try again.")
+            logger.error("Failed to save order!")
+            return checkout_page(priced, error="Error saving order. Please try again.")
     
     # GET request - show checkout form with cart items
-    cart_items = []
-    total = 0
-    
-    for product_id, quantity in cart.items():
-        if product_id in PRODUCTS:
-            product = PRODUCTS[product_id]
-            item_total = product['price'] * quantity
-            total += item_total
-            cart_items.append({
-                'product_id': product_id,
-                'product': product,
-                'quantity': quantity,
-                'item_total': item_total
-            })
-    
-    # Pre-fill user info if logged in
+    return checkout_page(priced)
+
+def checkout_page(priced, error=None):
+    """The checkout form for a priced cart, pre-filling user info if logged in"""
     user_info = {}
     if session.get('user_logged_in'):
-        users = load_users()
-        for user in users:
-            if user['username'] == session.get('username'):
-                user_info = {
-                    'name': user.get('username', ''),
-                    'email': user.get('email', '')
-                }
-                break
-    
-    return render_template('checkout.html', cart_items=cart_items, total=total, user_info=user_info)
+        user = user_store.get(session.get('username'))
+        if user:
+            user_info = {
+                'name': user.get('username', ''),
+                'email': user.get('email', '')
+            }
+    return render_template('checkout.html', cart_items=priced.lines, total=priced.total, user_info=user_info,
+                           error=error)
+
+ORDER_STATUSES = ['Pending', 'Processing', 'Shipped', 'Delivered', 'Cancelled']
+ADMIN_PAGE_SIZE = 25
+ADMIN_MAX_PAGE_SIZE = 200
+
+def parse_date_arg(name):
+    """Return a YYYY-MM-DD query argument, or None if missing or malformed"""
+    value = request.args.get(name, '').strip()
+    if not value:
+        return None
+    try:
+        datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        return None
+    return value
+
+def get_dashboard_filters():
+    """Read page/limit, search, status and date-range filters from the query string"""
+    page = request.args.get('page', 1, type=int) or 1
+    per_page = request.args.get('per_page', ADMIN_PAGE_SIZE, type=int) or ADMIN_PAGE_SIZE
+    status = request.args.get('status') or None
+    return {
+        'page': max(page, 1),
+        'per_page': min(max(per_page, 1), ADMIN_MAX_PAGE_SIZE),
+        'status': status if status in ORDER_STATUSES else None,
+        'date_from': parse_date_arg('date_from'),
+        'date_to': parse_date_arg('date_to'),
+        'q': request.args.get('q', '').strip()[:200] or None,
+    }
 
 # Admin dashboard route
-@app.route('/admin')
+@route('/admin')
 @admin_required
 def admin_dashboard():
     try:
-        print(f"\n=== ADMIN DASHBOARD LOADING ===")
-        print(f"ORDERS_FILE path: {ORDERS_FILE}")
-        print(f"Absolute path: {os.path.abspath(ORDERS_FILE)}")
-        print(f"File exists: {os.path.exists(ORDERS_FILE)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Admin dashboard loading; orders stored in %s (exists: %s)",
+                         order_store.path, os.path.exists(order_store.path))
         
-        orders = load_orders()
-        print(f"load_orders() returned: {type(orders)}, length: {len(orders) if isinstance(orders, list) else 'N/A'}")
-        
-        # Ensure orders is a list - NEVER return None
-        if orders is None:
-            print("ERROR: load_orders() returned None! Converting to empty list.")
-            orders = []
-        elif not isinstance(orders, list):
-            print(f"Warning: orders is not a list, type: {type(orders)}, converting to list")
-            orders = []
-        
-        print(f"After validation: orders type={type(orders)}, length={len(orders)}")
-        
-        # Sort orders by date (newest first) - handle missing order_date safely
-        try:
-            if orders:
-                orders.sort(key=lambda x: x.get('order_date', '') if isinstance(x, dict) and 'order_date' in x else '', reverse=True)
-                print(f"Sorted {len(orders)} orders")
-        except Exception as sort_error:
-            print(f"Error sorting orders: {sort_error}")
-            import traceback
-            traceback.print_exc()
-        
-        print(f"Returning {len(orders)} orders to template")
-        print(f"Orders variable type: {type(orders)}")
-        print(f"Orders is list: {isinstance(orders, list)}")
-        print(f"=== END ADMIN DASHBOARD LOADING ===\n")
+        filters = get_dashboard_filters()
+        page_filters = {key: value for key, value in filters.items() if key != 'q'}
+        # Taken before the page is read, so the live feed can't miss an order
+        # placed in between (one that shows up twice is skipped by the page)
+        feed_cursor = order_store.change_cursor()
+        if filters['q']:
+            # Inverted-index lookup by customer, email, phone, order ID or product
+            orders, total = order_store.search(filters['q'], **page_filters)
+        else:
+            # Only the requested page is pulled out of the store's date index,
+            # already newest first - no full load or sort per request
+            orders, total = order_store.page(**page_filters)
+        stats = order_store.stats()
+        pages = max((total + filters['per_page'] - 1) // filters['per_page'], 1)
         
-        # Double-check: ensure orders is definitely a list
-        if not isinstance(orders, list):
-            print("FINAL CHECK: orders is not a list! Converting...")
-            orders = []
+        logger.debug("Returning %d of %d orders to template (page %d/%d)",
+                     len(orders), total, filters['page'], pages)
         
         debug_info = {
-            'orders_file': ORDERS_FILE,
-            'orders_file_exists': os.path.exists(ORDERS_FILE),
+            'orders_file': order_store.path,
+            'orders_file_exists': os.path.exists(order_store.path),
             'cwd': os.getcwd(),
-            'orders_count': len(orders) if isinstance(orders, list) else 0
+            'orders_count': total
         }
-        return render_template('admin_dashboard.html', orders=orders or [], debug_info=debug_info)
+        return render_template('admin_dashboard.html', orders=orders, total=total, pages=pages,
+                               filters=filters, statuses=ORDER_STATUSES, stats=stats,
+                               quantities=order_store.quantities(orders), feed_cursor=feed_cursor,
+                               debug_info=debug_info)
     except Exception as e:
-        print(f"CRITICAL ERROR in admin_dashboard: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("CRITICAL ERROR in admin_dashboard: %s", e)
         # Always return a list, never None
-        return render_template('admin_dashboard.html', orders=[])
+        return render_template('admin_dashboard.html', orders=[], total=0, pages=1,
+                               filters=get_dashboard_filters(), statuses=ORDER_STATUSES,
+                               stats={'total_orders': 0, 'status_counts': {}, 'revenue': 0, 'units': 0},
+                               quantities={}, feed_cursor=None)
 
 # Update order status route
-@app.route('/admin/update_order/<order_id>', methods=['POST'])
+@route('/admin/update_order/<order_id>', methods=['POST'])
 @admin_required
 def update_order_status(order_id):
     try:
         new_status = request.form.get('status')
-        orders = load_orders()
-        
-        for order in orders:
-            if order['order_id'] == order_id:
-                order['status'] = new_status
-                break
-        
-        with open(ORDERS_FILE, 'w') as f:
-            json.dump(orders, f, indent=2)
+        if new_status in ORDER_STATUSES:
+            # Running status counts and revenue are adjusted by the store
+            order_store.update_status(order_id, new_status)
     except (IOError, KeyError) as e:
-        print(f"Error updating order status: {e}")
+        logger.error("Error updating order status: %s", e)
     
-    return redirect(url_for('admin_dashboard'))
+    # Go back to the page/filter the admin was looking at
+    return redirect(request.referrer or url_for('admin_dashboard'))
 
 # Delete order route
-@app.route('/admin/delete_order/<order_id>', methods=['POST'])
+@route('/admin/delete_order/<order_id>', methods=['POST'])
 @admin_required
 def delete_order(order_id):
     try:
-        orders = load_orders()
-        orders = [order for order in orders if order['order_id'] != order_id]
-        
-        with open(ORDERS_FILE, 'w') as f:
-            json.dump(orders, f, indent=2)
+        order_store.delete(order_id)
     except (IOError, KeyError) as e:
-        print(f"Error deleting order: {e}")
+        logger.error("Error deleting order: %s", e)
     
-    return redirect(url_for('admin_dashboard'))
+    # Go back to the page/filter the admin was looking at
+    return redirect(request.referrer or url_for('admin_dashboard'))
+
+# Incremental order feed for the live dashboard: only the changes after the
+# cursor the page was rendered at (or last polled at) are read and sent
+FEED_BATCH = 200
+FEED_MAX_WAIT = 25
+FEED_POLL_INTERVAL = 0.5
+
+def feed_change(change):
+    """One store change as JSON, with the rendered table rows of a new order"""
+    entry = {'seq': change['seq'], 'op': change['op'], 'order_id': change['order_id']}
+    if change['op'] == 'status':
+        entry['status'] = change['status']
+    elif change['op'] == 'add':
+        order = change['order']
+        # None when the order was deleted again after this change
+        entry['order'] = order.to_dict() if order is not None else None
+        if order is not None:
+            entry['html'] = render_template('_order_rows.html', order=order, statuses=ORDER_STATUSES,
+                                            quantities={})
+    return entry
+
+@route('/admin/orders/feed')
+@admin_required
+def admin_order_feed():
+    """Order changes after ?cursor=N, oldest first, with the cursor to poll from next.
+
+    With ?wait=S the request is held for up to S seconds until there is a
+    change (long polling), checking the store every FEED_POLL_INTERVAL; each
+    check is an in-memory lookup for the JSON store and one indexed query for
+    SQLite.  A held request occupies a worker thread, hence the FEED_MAX_WAIT
+    cap.  reset=true means the cursor is older than the kept history and the
+    page must be reloaded.  Without a cursor, returns the current one.
+    """
+    since = request.args.get('cursor', type=int)
+    if since is None or since < 0:
+        response = jsonify({'cursor': order_store.change_cursor(), 'reset': False, 'changes': []})
+    else:
+        wait = min(max(request.args.get('wait', 0, type=int), 0), FEED_MAX_WAIT)
+        deadline = time.monotonic() + wait
+        while True:
+            changes, cursor, reset = order_store.changes(since, limit=FEED_BATCH)
+            if changes or reset or time.monotonic() >= deadline:
+                break
+            time.sleep(FEED_POLL_INTERVAL)
+        body = {'cursor': cursor, 'reset': reset, 'changes': [feed_change(change) for change in changes]}
+        if changes:
+            body['stats'] = order_store.stats()
+        response = jsonify(body)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+# Sales analytics: revenue/units per product per day, week or month
+@route('/admin/analytics')
+@admin_required
+def admin_analytics():
+    granularity = request.args.get('period', 'day')
+    if granularity not in analytics.GRANULARITIES:
+        granularity = 'day'
+    date_from, date_to = parse_date_arg('date_from'), parse_date_arg('date_to')
+    report = sales_analytics.report(granularity, date_from=date_from, date_to=date_to)
+    if request.args.get('format') == 'json':
+        return jsonify(report)
+    return render_template('admin_analytics.html', report=report, products=get_catalog().products,
+                           granularities=analytics.GRANULARITIES,
+                           filters={'period': granularity, 'date_from': date_from, 'date_to': date_to})
+
+# Metrics endpoint (Prometheus text format)
+@route('/admin/metrics')
+@admin_required
+def admin_metrics():
+    return Response(metrics.render_metrics(), mimetype='text/plain; version=0.0.4')
+
+# Streaming order exports, filtered like the dashboard
+def export_response(lines, mimetype, extension):
+    filters = get_dashboard_filters()
+    orders = order_store.iter_orders(status=filters['status'], date_from=filters['date_from'],
+                                     date_to=filters['date_to'])
+    response = Response(stream_with_context(lines(orders)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=orders.{extension}'
+    return response
+
+@route('/admin/export.csv')
+@admin_required
+def export_orders_csv():
+    return export_response(export.csv_lines, 'text/csv', 'csv')
+
+@route('/admin/export.jsonl')
+@admin_required
+def export_orders_jsonl():
+    return export_response(export.jsonl_lines, 'application/x-ndjson', 'jsonl')
+
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets_command():
+    """Fingerprint and precompress static files into static/dist."""
+    asset_pipeline = get_services().asset_pipeline
+    manifest = asset_pipeline.build()
+    click.echo(f"Built {len(manifest['files'])} assets and {len(manifest['thumbnails'])} thumbnails "
+               f"into {asset_pipeline.build_dir}")
+
+@click.command('migrate-storage')
+@click.option('--from', 'source', type=click.Choice(BACKENDS), default='json', show_default=True)
+@click.option('--to', 'target', type=click.Choice(BACKENDS), default='sqlite', show_default=True)
+@with_appcontext
+def migrate_storage_command(source, target):
+    """Copy orders and users from one storage backend to another."""
+    if source == target:
+        raise click.UsageError("--from and --to must be different backends")
+    data_dir = current_app.config['DATA_DIR']
+    orders, users = migrate(open_stores(source, data_dir,
+                                        legacy_orders_paths=current_app.config['LEGACY_ORDERS_FILES']),
+                            open_stores(target, data_dir))
+    click.echo(f"Copied {orders} orders and {users} users from {source} to {target}.")
+    click.echo(f"Set SOOTHING_BAR_STORAGE={target} to start using it.")
+
+@click.command('upgrade-orders')
+@with_appcontext
+def upgrade_orders_command():
+    """Rewrite legacy single-item order records in the current schema."""
+    upgraded = order_store.upgrade_records()
+    click.echo(f"Upgraded {upgraded} order records in {order_store.path}.")
+
+COMMANDS = (build_assets_command, migrate_storage_command, upgrade_orders_command)
+
+
+def create_app(config=None):
+    """Build the app: open the stores, build or load the assets and, unless
+    WARM_UP is off, load orders, users and reports up front.
+
+    config overrides any key of default_config().
+    """
+    settings = default_config()
+    settings.update(config or {})
+    app = Flask(__name__)
+    app.config.update(settings)
+    if settings['PROXY_HOPS']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=settings['PROXY_HOPS'], x_proto=settings['PROXY_HOPS'])
+    services = app.extensions['soothing_bar'] = Services(settings)
+    for rule, view, options in _views:
+        app.add_url_rule(rule, view_func=view, **options)
+    for processor in _context_processors:
+        app.context_processor(processor)
+    for command in COMMANDS:
+        app.cli.add_command(command)
+    metrics.init_app(app, render_cache=services.render_cache)
+    services.asset_pipeline = assets.AssetPipeline(app.static_folder)
+    services.asset_pipeline.init_app(app, build=settings['BUILD_ASSETS'])
+
+    logger.info("DATA_DIR: %s", settings['DATA_DIR'])
+    logger.info("STORAGE_BACKEND: %s", settings['STORAGE_BACKEND'])
+    logger.info("Orders stored in: %s", services.order_store.path)
+    logger.info("Users stored in: %s", services.user_store.path)
+    logger.info("CART_BACKEND: %s", settings['CART_BACKEND'])
+    if settings['WARM_UP']:
+        services.warm_up()
+    return app
 
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    create_app().run(debug=True)
@@ -0,0 +1,183 @@
+"""Fingerprinted, precompressed static assets.
+
+``build()`` copies every file under ``static/`` into ``static/dist/`` with a
+content hash in its name (``css/styles.css`` -> ``css/styles.1a2b3c4d5e.css``),
+writes gzip (and brotli, when the ``brotli`` package is installed) variants of
+text assets, renders grid thumbnails of product images (when Pillow is
+installed) and records it all in ``static/dist/manifest.json``.
+
+Templates keep calling ``url_for('static', filename=...)``; a url_defaults hook
+swaps in the hashed name, and the hashed files are served with a one-year
+immutable Cache-Control since their URL changes whenever their content does.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+
+from flask import request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+BUILD_SUBDIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+COMPRESSIBLE = {'.css', '.js', '.svg', '.html', '.json', '.txt'}
+THUMBNAIL_SOURCES = {'.jpg', '.jpeg', '.png'}
+THUMBNAIL_WIDTH = 400
+ONE_YEAR = 365 * 24 * 3600
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def _hashed_name(relpath, digest):
+    root, ext = os.path.splitext(relpath)
+    return f"{root}.{digest}{ext}"
+
+
+def _write_atomic(path, data):
+    """Write via a temp file so concurrent builds never expose a partial file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class AssetPipeline:
+    def __init__(self, static_dir):
+        self.static_dir = static_dir
+        self.build_dir = os.path.join(static_dir, BUILD_SUBDIR)
+        self.files = {}
+        self.thumbnails = {}
+
+    def build(self):
+        """Fingerprint everything under static/ and write the manifest; returns it"""
+        if brotli is None:
+            logger.warning("brotli is not installed; serving gzip only (pip install -r requirements.txt)")
+        if Image is None:
+            logger.warning("Pillow is not installed; product grids get full-size images "
+                           "(pip install -r requirements.txt)")
+        files = {}
+        thumbnails = {}
+        for dirpath, dirnames, filenames in os.walk(self.static_dir):
+            if os.path.abspath(dirpath) == os.path.abspath(self.static_dir):
+                dirnames[:] = [d for d in dirnames if d != BUILD_SUBDIR]
+            for filename in sorted(filenames):
+                source = os.path.join(dirpath, filename)
+                relpath = os.path.relpath(source, self.static_dir).replace(os.sep, '/')
+                with open(source, 'rb') as f:
+                    data = f.read()
+                hashed = _hashed_name(relpath, _digest(data))
+                files[relpath] = hashed
+                self._emit(hashed, data)
+                thumbnail = self._thumbnail(relpath, source)
+                if thumbnail:
+                    thumbnails[relpath] = thumbnail
+        manifest = {'files': files, 'thumbnails': thumbnails}
+        _write_atomic(os.path.join(self.build_dir, MANIFEST_NAME),
+                      json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+        self.files, self.thumbnails = files, thumbnails
+        logger.info("Built %d static assets (%d thumbnails) into %s",
+                    len(files), len(thumbnails), self.build_dir)
+        return manifest
+
+    def _emit(self, hashed, data):
+        target = os.path.join(self.build_dir, hashed)
+        if os.path.exists(target):
+            # Same name means same content; earlier builds already wrote it
+            return
+        _write_atomic(target, data)
+        if os.path.splitext(hashed)[1].lower() in COMPRESSIBLE:
+            _write_atomic(target + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                _write_atomic(target + '.br', brotli.compress(data))
+
+    def _thumbnail(self, relpath, source):
+        if Image is None or not relpath.startswith('images/'):
+            return None
+        if os.path.splitext(relpath)[1].lower() not in THUMBNAIL_SOURCES:
+            return None
+        with Image.open(source) as image:
+            if image.width <= THUMBNAIL_WIDTH:
+                return None
+            height = round(image.height * THUMBNAIL_WIDTH / image.width)
+            thumb = image.convert('RGB').resize((THUMBNAIL_WIDTH, height), Image.LANCZOS)
+            root = os.path.splitext(relpath)[0]
+            thumb_relpath = f"thumbs/{root[len('images/'):]}-{THUMBNAIL_WIDTH}w.jpg"
+            target = os.path.join(self.build_dir, thumb_relpath)
+            tmp = f"{target}.{os.getpid()}.tmp"
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            thumb.save(tmp, 'JPEG', quality=82, optimize=True)
+        with open(tmp, 'rb') as f:
+            data = f.read()
+        hashed = _hashed_name(thumb_relpath, _digest(data))
+        os.replace(tmp, os.path.join(self.build_dir, hashed))
+        return hashed
+
+    def load(self):
+        """Read an existing manifest; returns False if there is none"""
+        try:
+            with open(os.path.join(self.build_dir, MANIFEST_NAME), encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return False
+        self.files = manifest.get('files', {})
+        self.thumbnails = manifest.get('thumbnails', {})
+        return True
+
+    def hashed_static(self, endpoint, values):
+        """url_defaults hook: point url_for('static', filename=...) at the hashed copy"""
+        if endpoint != 'static':
+            return
+        hashed = self.files.get(values.get('filename'))
+        if hashed:
+            values['filename'] = f"{BUILD_SUBDIR}/{hashed}"
+
+    def thumbnail_url(self, filename):
+        """URL of the grid thumbnail for a static image, or the image itself"""
+        thumb = self.thumbnails.get(filename)
+        if thumb:
+            return url_for('built_asset', filename=thumb)
+        return url_for('static', filename=filename)
+
+    def serve(self, filename):
+        """Serve a built file, preferring a precompressed variant the client accepts"""
+        mimetype = mimetypes.guess_type(filename)[0]
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if request.accept_encodings[encoding] and os.path.isfile(
+                    os.path.join(self.build_dir, filename + suffix)):
+                response = send_from_directory(self.build_dir, filename + suffix,
+                                               mimetype=mimetype, max_age=ONE_YEAR)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(self.build_dir, filename, mimetype=mimetype, max_age=ONE_YEAR)
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    def init_app(self, app, build=True):
+        """Build (or load) the manifest and hook hashed URLs into the app"""
+        if build:
+            self.build()
+        elif not self.load():
+            logger.warning("No asset manifest in %s; serving unhashed static files", self.build_dir)
+        static_url = app.static_url_path.rstrip('/')
+        app.add_url_rule(f"{static_url}/{BUILD_SUBDIR}/<path:filename>", 'built_asset', self.serve)
+        app.url_defaults(self.hashed_static)
+        app.jinja_env.globals['thumbnail_url'] = self.thumbnail_url
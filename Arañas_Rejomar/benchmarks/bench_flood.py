@@ -0,0 +1,191 @@
+"""Storefront browsing latency while login and signup are being flooded.
+
+Runs the app in a threaded HTTP server (a separate process, like a real
+deployment) and times product-page browsing, plus an occasional signup from
+another client, first alone and then while a bot sends --flood-rate
+requests per second to POST /signup and POST /login from --flooders
+connections.  This runs once with rate limiting and the storage concurrency
+cap off, and once with them on:
+
+    python benchmarks/bench_flood.py --users 20000 --seconds 15
+
+Signups rewrite users.json under a lock, so without limits the flood keeps
+the server busy rewriting it and a real visitor's signup queues behind the
+bot's.  With limits, flood requests past the bot's budget get a fast 429,
+and concurrent ones past the cap a 503.  The bot comes from 127.0.0.1 and
+the visitors from 127.0.0.2 (127.0.0.3 in the second phase), so each has
+its own budget.
+"""
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlencode
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(HERE)
+
+from bench_storefront import generate_data, summarize
+
+BROWSE_PATHS = ['/', '/products', '/products?sort=price', '/product/soapy']
+VISITOR_ADDRESSES = {'browsing': '127.0.0.2', 'flooded': '127.0.0.3'}
+# Well inside the default signup limit of 5 per 10 minutes
+VISITOR_SIGNUP_INTERVAL = 3.5
+SERVER = """
+import app
+from werkzeug.serving import make_server
+server = make_server('127.0.0.1', {port}, app.create_app(), threaded=True)
+print('ready', flush=True)
+server.serve_forever()
+"""
+CONFIGS = {
+    'unlimited': {'SOOTHING_BAR_RATE_LIMITS': '', 'SOOTHING_BAR_STORAGE_CONCURRENCY': '0'},
+    'limited': {},
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def serve(data_dir, backend, limits):
+    port = free_port()
+    env = dict(os.environ, SOOTHING_BAR_DATA_DIR=data_dir, SOOTHING_BAR_STORAGE=backend,
+               SOOTHING_BAR_BUILD_ASSETS='0', **limits)
+    server = subprocess.Popen([sys.executable, '-c', SERVER.format(port=port)], cwd=APP_DIR, env=env,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        if server.stdout.readline().strip() != 'ready':
+            raise RuntimeError("server failed to start")
+        yield port
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def send(conn, method, path, form=None):
+    headers = {'Content-Type': 'application/x-www-form-urlencoded'} if form else {}
+    conn.request(method, path, body=urlencode(form) if form else None, headers=headers)
+    response = conn.getresponse()
+    response.read()
+    if response.getheader('Connection', '').lower() == 'close':
+        conn.close()
+    return response.status
+
+
+def browse(port, stop, address, samples):
+    conn = http.client.HTTPConnection('127.0.0.1', port, source_address=(address, 0))
+    i = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        status = send(conn, 'GET', BROWSE_PATHS[i % len(BROWSE_PATHS)])
+        samples.append(time.perf_counter() - start)
+        if status != 200:
+            raise RuntimeError(f"HTTP {status} while browsing")
+        i += 1
+
+
+def sign_up(port, stop, address, samples):
+    """A real visitor signing up now and then"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, source_address=(address, 0))
+    i = 0
+    while not stop.wait(VISITOR_SIGNUP_INTERVAL):
+        username = f'visitor-{address}-{i}'
+        form = {'username': username, 'email': f'{username}@mail.com', 'password': 'pw', 'confirm_password': 'pw'}
+        start = time.perf_counter()
+        status = send(conn, 'POST', '/signup', form)
+        samples.append(time.perf_counter() - start)
+        if status != 302:
+            raise RuntimeError(f"HTTP {status} for a visitor's signup")
+        i += 1
+
+
+def flood(port, stop, name, codes, interval):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    i = 0
+    next_send = time.monotonic()
+    while not stop.is_set():
+        # Sends on a fixed schedule, like a bot; a slow response just delays the next one
+        next_send += interval
+        stop.wait(max(next_send - time.monotonic(), 0))
+        if i % 2:
+            form = {'username': 'user1', 'password': 'wrong'}
+            codes[send(conn, 'POST', '/login', form)] += 1
+        else:
+            username = f'{name}-{i}'
+            form = {'username': username, 'email': f'{username}@flood.test',
+                    'password': 'pw', 'confirm_password': 'pw'}
+            codes[send(conn, 'POST', '/signup', form)] += 1
+        i += 1
+
+
+def run_phase(port, seconds, browsers, phase, flooders=0, flood_rate=0):
+    stop = threading.Event()
+    samples = []
+    signups = []
+    codes = [Counter() for _ in range(flooders)]
+    address = VISITOR_ADDRESSES[phase]
+    threads = [threading.Thread(target=browse, args=(port, stop, address, samples)) for _ in range(browsers)]
+    threads.append(threading.Thread(target=sign_up, args=(port, stop, address, signups)))
+    threads += [threading.Thread(target=flood, args=(port, stop, f'flood{n}', codes[n], flooders / flood_rate))
+                for n in range(flooders)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    result = summarize(samples)
+    result['signup_ms'] = max(signups, default=0) * 1000
+    flood_codes = sum(codes, Counter())
+    result['flood_requests'] = sum(flood_codes.values())
+    result['flood_status'] = dict(sorted(flood_codes.items()))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--orders', type=int, default=1000)
+    parser.add_argument('--seconds', type=float, default=10, help='length of each phase')
+    parser.add_argument('--browsers', type=int, default=2, help='concurrent browsing clients')
+    parser.add_argument('--flooders', type=int, default=32, help='connections the flood is sent from')
+    parser.add_argument('--flood-rate', type=float, default=100, help='flood requests per second offered')
+    parser.add_argument('--backend', choices=('json', 'sqlite'), default='json')
+    args = parser.parse_args()
+
+    results = {}
+    for config, limits in CONFIGS.items():
+        data_dir = tempfile.mkdtemp(prefix='soothing-flood-')
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_data(data_dir, args.backend, args.orders, args.users)
+        with serve(data_dir, args.backend, limits) as port:
+            results[config] = {
+                'browsing': run_phase(port, args.seconds, args.browsers, 'browsing'),
+                'flooded': run_phase(port, args.seconds, args.browsers, 'flooded', args.flooders, args.flood_rate),
+            }
+
+    print(f"{'config':<10} {'phase':<9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max signup ms':>14} "
+          f"{'flood req':>10}  flood status")
+    for config, phases in results.items():
+        for phase, result in phases.items():
+            print(f"{config:<10} {phase:<9} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+                  f"{result['p99_ms']:>8.2f} {result['signup_ms']:>14.0f} {result['flood_requests']:>10}  "
+                  f"{result['flood_status']}")
+    print(json.dumps({'users': args.users, 'backend': args.backend, 'results': results}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Login latency with a large users.json, before and after the indexed UserStore.
+
+"before" replays the old login path (parse users.json, then scan the list),
+"after" goes through the real /login route backed by UserStore.  Users get a
+one-iteration password hash here, so this measures the lookup; see
+bench_passwords.py for the cost of real hashes.
+
+    python benchmarks/bench_login.py --users 100000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from werkzeug.security import generate_password_hash
+
+LOOKUP_ONLY_HASH = 'pbkdf2:sha256:1'
+
+
+def make_users(path, count):
+    users = [{
+        'username': f'user{i}',
+        'email': f'user{i}@mail.com',
+        'password': f'pw{i}',
+        'password_hash': generate_password_hash(f'pw{i}', method=LOOKUP_ONLY_HASH),
+        'created_at': '2025-11-07 15:34:21'
+    } for i in range(count)]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(users, f, indent=2)
+
+
+def legacy_login(users_file, username, password):
+    """The pre-UserStore login: reparse users.json and scan it"""
+    with open(users_file, 'r') as f:
+        users = json.load(f)
+    for user in users:
+        if user['username'] == username and user['password'] == password:
+            return user
+    return None
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        'mean_ms': statistics.mean(samples) * 1000,
+        'p50_ms': samples[len(samples) // 2] * 1000,
+        'p95_ms': samples[int(len(samples) * 0.95) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix='soothing-bench-')
+    os.environ['SOOTHING_BAR_DATA_DIR'] = data_dir
+    users_file = os.path.join(data_dir, 'users.json')
+    make_users(users_file, args.users)
+    names = [random.randrange(args.users) for _ in range(args.iterations)]
+
+    before = []
+    for i in names:
+        start = time.perf_counter()
+        assert legacy_login(users_file, f'user{i}', f'pw{i}')
+        before.append(time.perf_counter() - start)
+
+    import app as app_module
+    # create_app() loads users.json once up front; the login rate limit
+    # would turn the benchmark away after a few attempts
+    client = app_module.create_app({'RATE_LIMITS': {}, 'PASSWORD_HASH_METHOD': LOOKUP_ONLY_HASH}).test_client()
+
+    after = []
+    for i in names:
+        start = time.perf_counter()
+        response = client.post('/login', data={'username': f'user{i}', 'password': f'pw{i}'})
+        after.append(time.perf_counter() - start)
+        assert response.status_code == 302, response.status_code
+        client.get('/logout')
+
+    results = {'users': args.users, 'before': summarize(before), 'after': summarize(after)}
+    for label in ('before', 'after'):
+        stats = results[label]
+        print(f"{label:>6}: mean {stats['mean_ms']:.2f} ms  p50 {stats['p50_ms']:.2f} ms  p95 {stats['p95_ms']:.2f} ms")
+    print(json.dumps(results))
+
+
+if __name__ == '__main__':
+    main()
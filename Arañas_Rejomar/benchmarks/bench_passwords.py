@@ -0,0 +1,111 @@
+"""Login throughput under concurrency at a given password-hash cost.
+
+Drives POST /login from 1, 2, 4, ... concurrent threads against users with
+real password hashes.  It reports logins per second, latency and how many
+logins the bounded hashing pool turned away with 503.  It also times a
+plaintext user's first login, which upgrades them to a hash, against their
+second login:
+
+    python benchmarks/bench_passwords.py --method scrypt:16384:8:1
+    python benchmarks/bench_passwords.py --method pbkdf2:sha256:600000 --workers 4
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from werkzeug.security import generate_password_hash
+
+import passwords
+from bench_storefront import BENCH_PASSWORD, summarize, write_json_array
+
+
+def make_users(path, count, method):
+    password_hash = generate_password_hash(BENCH_PASSWORD, method=method)
+    users = [{'username': f'user{i}', 'email': f'user{i}@mail.com', 'password_hash': password_hash,
+              'created_at': '2025-11-07 15:34:21'} for i in range(count)]
+    # Saved before hashing existed
+    users.append({'username': 'legacy', 'email': 'legacy@mail.com', 'password': 'legacy-pw',
+                  'created_at': '2025-11-07 15:34:21'})
+    write_json_array(path, users)
+
+
+def log_in(flask_app, username, password, logins):
+    client = flask_app.test_client()
+    samples = []
+    busy = 0
+    for _ in range(logins):
+        start = time.perf_counter()
+        response = client.post('/login', data={'username': username, 'password': password})
+        samples.append(time.perf_counter() - start)
+        if response.status_code == 503:
+            busy += 1
+        elif response.status_code != 302:
+            raise RuntimeError(f"login failed with HTTP {response.status_code}")
+        client.get('/logout')
+    return samples, busy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--method', default=passwords.DEFAULT_METHOD, help='password hash method and cost')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='hashing pool threads')
+    parser.add_argument('--queue', type=int, default=32, help='hashes queued or running before 503s')
+    parser.add_argument('--threads', default='1,2,4,8,16', help='concurrent login threads to try')
+    parser.add_argument('--logins', type=int, default=20, help='logins per thread')
+    parser.add_argument('--users', type=int, default=1000)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix='soothing-passwords-')
+    os.environ['SOOTHING_BAR_DATA_DIR'] = data_dir
+    make_users(os.path.join(data_dir, 'users.json'), args.users, args.method)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app as app_module
+        flask_app = app_module.create_app({
+            'RATE_LIMITS': {}, 'STORAGE_CONCURRENCY': 0, 'BUILD_ASSETS': False,
+            'PASSWORD_HASH_METHOD': args.method, 'PASSWORD_WORKERS': args.workers,
+            'PASSWORD_QUEUE': args.queue,
+        })
+
+    start = time.perf_counter()
+    generate_password_hash(BENCH_PASSWORD, method=args.method)
+    hash_ms = (time.perf_counter() - start) * 1000
+    print(f"{args.method}: one hash {hash_ms:.1f} ms, pool of {args.workers}, queue {args.queue}")
+
+    results = {}
+    print(f"{'threads':>7} {'logins/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'503s':>5}")
+    for threads in (int(n) for n in args.threads.split(',')):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            runs = list(pool.map(log_in, [flask_app] * threads, [f'user{t % args.users}' for t in range(threads)],
+                                 [BENCH_PASSWORD] * threads, [args.logins] * threads))
+        elapsed = time.perf_counter() - start
+        result = summarize([sample for samples, _ in runs for sample in samples])
+        result['logins_per_second'] = threads * args.logins / elapsed
+        result['busy'] = sum(busy for _, busy in runs)
+        results[threads] = result
+        print(f"{threads:>7} {result['logins_per_second']:>9.1f} {result['p50_ms']:>8.2f} "
+              f"{result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['busy']:>5}")
+
+    # The first login of a plaintext user also hashes and saves their password
+    (first,), _ = log_in(flask_app, 'legacy', 'legacy-pw', 1)
+    (second,), _ = log_in(flask_app, 'legacy', 'legacy-pw', 1)
+    with flask_app.app_context():
+        upgraded = 'password' not in app_module.user_store.get('legacy')
+    print(f"plaintext user: first login {first * 1000:.1f} ms (upgraded: {upgraded}), "
+          f"next login {second * 1000:.1f} ms")
+    print(json.dumps({'method': args.method, 'workers': args.workers, 'hash_ms': hash_ms,
+                      'concurrency': results, 'upgrade': {'first_ms': first * 1000, 'next_ms': second * 1000}}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,318 @@
+"""Storefront benchmark suite driven through Flask's test client.
+
+Generates synthetic orders.json/users.json at a chosen size (imported into the
+selected backend the same way a legacy install would be), then drives the real
+routes (browse, cart, checkout, login, admin) and reports p50/p95/p99 latency
+and requests per second for each flow.  Results are written as JSON so runs
+can be compared across commits:
+
+    python benchmarks/bench_storefront.py --orders 100000 --output after.json
+    python benchmarks/bench_storefront.py --orders 100000 --compare before.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(HERE)
+sys.path.insert(0, APP_DIR)
+
+PRODUCT_IDS = ['malunggay', 'soapy', 'lavender', 'honey']
+PRICES = {'malunggay': 10.0, 'soapy': 15.0, 'lavender': 20.0, 'honey': 25.0}
+STATUSES = ['Pending', 'Processing', 'Shipped', 'Delivered', 'Cancelled']
+CATEGORIES = ['Herbal', 'Classic', 'Aromatherapy', 'Moisturizing', 'Exfoliating', 'Kids']
+SIZES = {'1k': 1000, '100k': 100000, '1m': 1000000}
+# Every synthetic user shares this password (and one hash of it), so
+# generating a million users doesn't mean hashing a million passwords
+BENCH_PASSWORD = 'bench-password'
+
+CHECKOUT_FORM = {
+    'customer_name': 'Bench Buyer',
+    'email': 'bench@mail.com',
+    'phone': '123',
+    'shipping_address': '1 Bench Rd',
+    'city': 'Benchville',
+    'postal_code': '1234',
+    'payment_method': 'Cash on Delivery',
+}
+
+
+def bench_password_hash():
+    """A hash of BENCH_PASSWORD at the cost the app will run with"""
+    import passwords
+    from werkzeug.security import generate_password_hash
+    method = os.environ.get('SOOTHING_BAR_PASSWORD_HASH', passwords.DEFAULT_METHOD)
+    return generate_password_hash(BENCH_PASSWORD, method=method)
+
+
+def synthetic_users(count, password_hash):
+    for i in range(count):
+        yield {
+            'username': f'user{i}',
+            'email': f'user{i}@mail.com',
+            'password_hash': password_hash,
+            'created_at': '2025-11-07 15:34:21',
+        }
+
+
+def synthetic_orders(count, seed=42):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    step = timedelta(days=365) / max(count, 1)
+    for i in range(count):
+        items = []
+        for product_id in rng.sample(PRODUCT_IDS, rng.randint(1, 3)):
+            quantity = rng.randint(1, 5)
+            items.append({
+                'product_id': product_id,
+                'product_name': product_id.title(),
+                'quantity': quantity,
+                'unit_price': PRICES[product_id],
+                'total_price': PRICES[product_id] * quantity,
+            })
+        yield {
+            'order_id': f'ORD-BENCH-{i:07d}',
+            'items': items,
+            'total_price': sum(item['total_price'] for item in items),
+            'customer_name': f'user{i % 5000}',
+            'email': f'user{i % 5000}@mail.com',
+            'phone': f'09{i:09d}',
+            'shipping_address': f'{i} Synthetic St',
+            'city': 'Benchville',
+            'postal_code': '1234',
+            'payment_method': 'Cash on Delivery',
+            'order_date': (start + step * i).strftime('%Y-%m-%d %H:%M:%S'),
+            'status': rng.choice(STATUSES),
+        }
+
+
+def synthetic_catalog(count, seed=42):
+    """The shipped products.json plus generated SKUs, up to count products"""
+    rng = random.Random(seed)
+    with open(os.path.join(APP_DIR, 'products.json'), encoding='utf-8') as f:
+        products = json.load(f)
+    template = products[0]
+    for i in range(len(products), count):
+        products.append(dict(template, id=f'sku{i:06d}', name=f'Soap No. {i}',
+                             category=rng.choice(CATEGORIES), price=rng.randint(5, 500) + 0.5))
+    return products
+
+
+def write_json_array(path, records):
+    """Stream records out as a JSON array without holding them all in memory"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[\n')
+        for i, record in enumerate(records):
+            if i:
+                f.write(',\n')
+            json.dump(record, f)
+        f.write('\n]\n')
+
+
+def generate_data(data_dir, backend, orders, users, products=0):
+    """Write legacy orders.json/users.json, then load them into the chosen backend"""
+    from storage import migrate, open_stores
+    if products:
+        catalog_file = os.path.join(data_dir, 'products.json')
+        write_json_array(catalog_file, synthetic_catalog(products))
+        os.environ['SOOTHING_BAR_CATALOG'] = catalog_file
+    write_json_array(os.path.join(data_dir, 'orders.json'), synthetic_orders(orders))
+    write_json_array(os.path.join(data_dir, 'users.json'), synthetic_users(users, bench_password_hash()))
+    json_stores = open_stores('json', data_dir)
+    # Importing orders.json into the journal happens on first read
+    json_stores[0].stats()
+    if backend == 'sqlite':
+        migrate(json_stores, open_stores('sqlite', data_dir))
+
+
+def percentile(sorted_samples, pct):
+    index = min(len(sorted_samples) - 1, max(0, int(round(pct / 100 * len(sorted_samples))) - 1))
+    return sorted_samples[index]
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    total = sum(ordered)
+    return {
+        'requests': len(ordered),
+        'p50_ms': percentile(ordered, 50) * 1000,
+        'p95_ms': percentile(ordered, 95) * 1000,
+        'p99_ms': percentile(ordered, 99) * 1000,
+        'mean_ms': total / len(ordered) * 1000,
+        'rps': len(ordered) / total if total else 0.0,
+    }
+
+
+def timed(samples, fn):
+    start = time.perf_counter()
+    response = fn()
+    samples.append(time.perf_counter() - start)
+    if response.status_code >= 400:
+        raise RuntimeError(f"HTTP {response.status_code} during benchmark")
+    return response
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=APP_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Run in a fresh interpreter, so nothing is imported or cached yet
+STARTUP_SCRIPT = '''
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+print(json.dumps([imported - start, time.perf_counter() - imported]))
+'''
+
+
+def cold_start(runs=3):
+    """Best of several (import seconds, create_app() seconds) in a new process"""
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=APP_DIR, env=os.environ,
+                                capture_output=True, text=True, check=True).stdout
+        timings.append(json.loads(output.strip().splitlines()[-1]))
+    return min(t[0] for t in timings), min(t[1] for t in timings)
+
+
+def run_scenarios(flask_app, order_ids, users, requests, products):
+    rng = random.Random(7)
+    client = flask_app.test_client()
+    results = {}
+
+    def scenario(name, fn):
+        samples = []
+        for _ in range(requests):
+            fn(samples)
+        results[name] = summarize(samples)
+
+    scenario('browse_products', lambda s: timed(s, lambda: client.get('/products')))
+    pages = max((products + 23) // 24, 1)
+    scenario('browse_products_sorted', lambda s: timed(
+        s, lambda: client.get(f'/products?sort=price_desc&page={rng.randint(1, pages)}')))
+    scenario('product_detail', lambda s: timed(
+        s, lambda: client.get(f'/product/{rng.choice(PRODUCT_IDS)}')))
+    scenario('cart_add', lambda s: timed(
+        s, lambda: client.post(f'/cart/add/{rng.choice(PRODUCT_IDS)}', data={'quantity': 1})))
+
+    def login(samples):
+        i = rng.randrange(users)
+        timed(samples, lambda: client.post('/login', data={'username': f'user{i}', 'password': BENCH_PASSWORD}))
+        client.get('/logout')
+    scenario('login', login)
+
+    def checkout(samples):
+        with client.session_transaction() as sess:
+            sess['user_logged_in'] = True
+            sess['username'] = 'user0'
+            sess['cart'] = {'soapy': 2, 'honey': 1}
+        timed(samples, lambda: client.post('/checkout', data=CHECKOUT_FORM))
+    scenario('checkout', checkout)
+
+    with client.session_transaction() as sess:
+        sess['admin_logged_in'] = True
+    scenario('admin_dashboard', lambda s: timed(s, lambda: client.get('/admin')))
+    scenario('admin_dashboard_filtered', lambda s: timed(
+        s, lambda: client.get('/admin?status=Pending&date_from=2024-03-01&date_to=2024-06-30&page=2')))
+    scenario('admin_update_order', lambda s: timed(s, lambda: client.post(
+        f'/admin/update_order/{rng.choice(order_ids)}', data={'status': rng.choice(STATUSES)})))
+    return results
+
+
+def print_table(results, baseline=None):
+    header = f"{'flow':<26}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}"
+    if baseline:
+        header += f"{'p95 vs base':>14}"
+    print(header)
+    for name, stats in results.items():
+        line = (f"{name:<26}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+                f"{stats['p99_ms']:>10.2f}{stats['rps']:>10.1f}")
+        base = (baseline or {}).get(name)
+        if base:
+            change = (stats['p95_ms'] - base['p95_ms']) / base['p95_ms'] * 100 if base['p95_ms'] else 0.0
+            line += f"{change:>+13.1f}%"
+        print(line)
+
+
+def parse_size(value):
+    return SIZES.get(value.lower()) or int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=parse_size, default=1000, help='order count or 1k/100k/1m')
+    parser.add_argument('--users', type=parse_size, default=1000, help='user count or 1k/100k/1m')
+    parser.add_argument('--requests', type=int, default=200, help='requests per flow')
+    parser.add_argument('--products', type=parse_size, default=0,
+                        help='catalog size (default: the shipped products.json)')
+    parser.add_argument('--backend', choices=('json', 'sqlite'), default='json')
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--compare', help='baseline results JSON to compare p95 against')
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix='soothing-bench-')
+    os.environ['SOOTHING_BAR_DATA_DIR'] = data_dir
+    os.environ['SOOTHING_BAR_STORAGE'] = args.backend
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        generate_data(data_dir, args.backend, args.orders, args.users, args.products)
+        generate_seconds = time.perf_counter() - start
+
+        # Startup: importing app.py should be cheap; create_app() opens and
+        # warms the stores once, which gunicorn --preload shares with workers
+        import_seconds, create_seconds = cold_start()
+        import app as app_module
+        # One client does every login and checkout, so no rate limits here
+        flask_app = app_module.create_app({'RATE_LIMITS': {}})
+
+        order_ids = [f'ORD-BENCH-{i:07d}' for i in range(args.orders)]
+        results = run_scenarios(flask_app, order_ids, args.users, args.requests,
+                                args.products or len(PRODUCT_IDS))
+
+    report = {
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'backend': args.backend,
+        'orders': args.orders,
+        'users': args.users,
+        'products': args.products or len(PRODUCT_IDS),
+        'requests_per_flow': args.requests,
+        'setup': {
+            'generate_seconds': generate_seconds,
+            'app_import_seconds': import_seconds,
+            'create_app_seconds': create_seconds,
+        },
+        'flows': results,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['flows']
+    print(f"backend={args.backend} orders={args.orders} users={args.users} revision={report['revision']}")
+    print(f"cold start: import {import_seconds * 1000:.1f} ms, create_app() {create_seconds * 1000:.1f} ms")
+    print_table(results, baseline)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
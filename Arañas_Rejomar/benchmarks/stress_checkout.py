@@ -0,0 +1,109 @@
+"""Hammer /checkout from many worker processes and check nothing is lost.
+
+Each process imports the app on its own (like a gunicorn worker) and places
+orders from --threads concurrent threads (like gthread workers) against one
+shared data directory.  Afterwards every order must be in the store exactly
+once with a unique order_id.
+
+    python benchmarks/stress_checkout.py --workers 8 --orders 50 --backend json
+    python benchmarks/stress_checkout.py --workers 4 --threads 16 --orders 25
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+CHECKOUT_FORM = {
+    'customer_name': 'Stress Tester',
+    'email': 'stress@mail.com',
+    'phone': '123',
+    'shipping_address': '123 Test St',
+    'city': 'Testville',
+    'postal_code': '1234',
+    'payment_method': 'Cash on Delivery',
+}
+
+
+def run_thread(flask_app, name, orders):
+    client = flask_app.test_client()
+    latencies = []
+    for i in range(orders):
+        with client.session_transaction() as sess:
+            sess['user_logged_in'] = True
+            sess['username'] = name
+            sess['cart'] = {'soapy': 1, 'honey': 2}
+        form = dict(CHECKOUT_FORM, customer_name=f'{name}-{i}')
+        start = time.perf_counter()
+        response = client.post('/checkout', data=form)
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200 or b'Error saving order' in response.data:
+            raise RuntimeError(f"checkout failed with HTTP {response.status_code}")
+    return latencies
+
+
+def run_worker(worker, threads, orders):
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app as app_module
+        # Measures the write path itself: no rate limits or concurrency cap
+        flask_app = app_module.create_app({'RATE_LIMITS': {}, 'STORAGE_CONCURRENCY': 0})
+        with ThreadPoolExecutor(threads) as pool:
+            results = pool.map(run_thread, [flask_app] * threads,
+                               [f'worker{worker}.{t}' for t in range(threads)], [orders] * threads)
+            return [latency for latencies in results for latency in latencies]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--threads', type=int, default=1, help='concurrent checkout threads per worker')
+    parser.add_argument('--orders', type=int, default=50, help='checkouts per thread')
+    parser.add_argument('--backend', choices=('json', 'sqlite'), default='json')
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix='soothing-stress-')
+    os.environ['SOOTHING_BAR_DATA_DIR'] = data_dir
+    os.environ['SOOTHING_BAR_STORAGE'] = args.backend
+
+    ctx = multiprocessing.get_context('spawn')
+    start = time.perf_counter()
+    with ctx.Pool(args.workers) as pool:
+        results = pool.starmap(run_worker, [(w, args.threads, args.orders) for w in range(args.workers)])
+    elapsed = time.perf_counter() - start
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from storage import open_stores
+        # Ignore anything imported from a legacy orders.json in the cwd
+        orders = [order for order in open_stores(args.backend, data_dir)[0].all()
+                  if order.email == CHECKOUT_FORM['email']]
+    expected = args.workers * args.threads * args.orders
+    ids = [order.order_id for order in orders]
+    names = {order.customer_name for order in orders}
+    latencies = sorted(l for worker in results for l in worker)
+    summary = {
+        'backend': args.backend,
+        'expected': expected,
+        'saved': len(orders),
+        'unique_ids': len(set(ids)),
+        'unique_customers': len(names),
+        'seconds': elapsed,
+        'orders_per_second': expected / elapsed,
+        'p99_ms': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+    print(json.dumps(summary))
+    if not (len(orders) == len(set(ids)) == len(names) == expected):
+        print("FAIL: orders were lost or duplicated")
+        sys.exit(1)
+    print(f"OK: {expected} parallel checkouts, no lost or duplicate orders")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""Where shopping carts live: the signed session cookie, or a server-side store.
+
+``SessionCarts`` keeps the whole {product_id: quantity} dict in the cookie,
+as the site always has.  ``ServerCarts`` keeps only a short random token in
+the cookie.  The cart itself lives in SQLite (so it survives restarts and is
+shared by every worker), and an in-process LRU caches recently used carts.
+Changes are single-row upserts such as ``quantity = quantity + ?``, so two
+concurrent "add to cart" requests can't overwrite each other.
+
+Both classes expose get/add/set_quantity/remove/clear and read the current
+request's session themselves.
+"""
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from flask import session
+
+from storage import SqliteDatabase
+
+CART_SCHEMA = """
+CREATE TABLE IF NOT EXISTS carts (
+    token TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    touched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS carts_touched_at ON carts (touched_at);
+CREATE TABLE IF NOT EXISTS cart_items (
+    token TEXT NOT NULL,
+    product_id TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    PRIMARY KEY (token, product_id)
+);
+"""
+
+DEFAULT_TTL = 30 * 24 * 3600
+# Expired carts are purged from SQLite once every this many writes per process
+PURGE_EVERY = 1000
+
+
+class SessionCarts:
+    """Carts stored in the signed session cookie"""
+
+    def get(self):
+        return session.get('cart', {})
+
+    def add(self, product_id, quantity):
+        cart = self.get()
+        cart[product_id] = cart.get(product_id, 0) + quantity
+        session['cart'] = cart
+
+    def set_quantity(self, product_id, quantity):
+        cart = self.get()
+        if product_id in cart:
+            if quantity > 0:
+                cart[product_id] = quantity
+            else:
+                del cart[product_id]
+            session['cart'] = cart
+
+    def remove(self, product_id):
+        cart = self.get()
+        if product_id in cart:
+            del cart[product_id]
+            session['cart'] = cart
+
+    def clear(self):
+        session['cart'] = {}
+
+
+class ServerCarts:
+    """Carts in SQLite behind a per-process LRU, keyed by a cookie token.
+
+    Each cart row carries a version bumped by every change; a cached cart is
+    reused only while its version still matches, so a change made by another
+    worker is never missed.  Carts untouched for ``ttl`` seconds expire.
+    """
+
+    def __init__(self, path, max_entries=10000, ttl=DEFAULT_TTL):
+        self.db = SqliteDatabase(path, schema=CART_SCHEMA)
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._writes = 0
+
+    def _token(self, create):
+        token = session.get('cart_token')
+        if token is None and create:
+            token = session['cart_token'] = secrets.token_urlsafe(16)
+        return token
+
+    def get(self):
+        # Carry over a cart started before the server-side store was enabled
+        legacy = session.pop('cart', None)
+        if legacy:
+            for product_id, quantity in legacy.items():
+                self.add(product_id, quantity)
+        token = self._token(create=False)
+        if token is None:
+            return {}
+        conn = self.db.connect()
+        row = conn.execute('SELECT version, touched_at FROM carts WHERE token = ?', (token,)).fetchone()
+        if row is None or row[1] < time.time() - self.ttl:
+            self._forget(token)
+            return {}
+        version = row[0]
+        with self._lock:
+            cached = self._cache.get(token)
+            if cached is not None and cached[0] == version:
+                self._cache.move_to_end(token)
+                return dict(cached[1])
+        cart = self._load(conn, token)
+        self._remember(token, version, cart)
+        return dict(cart)
+
+    def add(self, product_id, quantity):
+        self._write(
+            'INSERT INTO cart_items (token, product_id, quantity) VALUES (?, ?, ?) '
+            'ON CONFLICT (token, product_id) DO UPDATE SET quantity = quantity + excluded.quantity',
+            (product_id, quantity))
+
+    def set_quantity(self, product_id, quantity):
+        if quantity > 0:
+            self._write('UPDATE cart_items SET quantity = ? WHERE token = ? AND product_id = ?',
+                        (quantity, product_id), token_position=1)
+        else:
+            self.remove(product_id)
+
+    def remove(self, product_id):
+        self._write('DELETE FROM cart_items WHERE token = ? AND product_id = ?', (product_id,),
+                    token_position=0)
+
+    def clear(self):
+        if self._token(create=False) is None:
+            return
+        self._write('DELETE FROM cart_items WHERE token = ?', (), token_position=0)
+
+    def _write(self, sql, params, token_position=0):
+        token = self._token(create=True)
+        params = params[:token_position] + (token,) + params[token_position:]
+        with self.db.transaction() as conn:
+            # An expired cart starts over rather than resurrecting its old items
+            conn.execute('DELETE FROM cart_items WHERE token = ? AND token IN '
+                         '(SELECT token FROM carts WHERE touched_at < ?)', (token, time.time() - self.ttl))
+            conn.execute(sql, params)
+            conn.execute(
+                'INSERT INTO carts (token, version, touched_at) VALUES (?, 1, ?) '
+                'ON CONFLICT (token) DO UPDATE SET version = version + 1, touched_at = excluded.touched_at',
+                (token, time.time()))
+            version = conn.execute('SELECT version FROM carts WHERE token = ?', (token,)).fetchone()[0]
+            cart = self._load(conn, token)
+        self._remember(token, version, cart)
+        self._writes += 1
+        if self._writes % PURGE_EVERY == 0:
+            self.purge_expired()
+
+    def _load(self, conn, token):
+        return dict(conn.execute('SELECT product_id, quantity FROM cart_items WHERE token = ? ORDER BY rowid',
+                                 (token,)).fetchall())
+
+    def _remember(self, token, version, cart):
+        with self._lock:
+            self._cache[token] = (version, cart)
+            self._cache.move_to_end(token)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _forget(self, token):
+        with self._lock:
+            self._cache.pop(token, None)
+
+    def purge_expired(self):
+        """Delete carts untouched for longer than the TTL; returns how many"""
+        cutoff = time.time() - self.ttl
+        with self.db.transaction() as conn:
+            conn.execute('DELETE FROM cart_items WHERE token IN (SELECT token FROM carts WHERE touched_at < ?)',
+                         (cutoff,))
+            purged = conn.execute('DELETE FROM carts WHERE touched_at < ?', (cutoff,)).rowcount
+        return purged
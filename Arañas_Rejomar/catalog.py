@@ -0,0 +1,132 @@
+"""Product catalog loaded from products.json, reloaded when the file changes.
+
+The file is a JSON list of products (id, name, category, price, image, ...).
+Each load builds an immutable ``CatalogSnapshot`` with an id index and the
+listing orders precomputed (file order and by price, overall and per
+category), so a listing page is a slice rather than a sort.  ``Catalog``
+checks the file's mtime at most once per ``check_interval`` seconds and
+swaps in a new snapshot when it changed; a request keeps using the snapshot
+it started with.  A file that fails to load is logged and the previous
+snapshot stays in service.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from page_cache import content_version
+from pricing import to_cents
+
+logger = logging.getLogger(__name__)
+
+SORTS = ('featured', 'price', 'price_desc')
+
+
+class CatalogError(ValueError):
+    """products.json is unreadable or malformed"""
+
+
+class CatalogSnapshot:
+    """One loaded version of the catalog"""
+
+    def __init__(self, products, version):
+        # id -> product dict, in file order
+        self.products = products
+        self.version = version
+        self.categories = sorted({product['category'] for product in products.values()})
+        ordered = list(products.values())
+        by_price = sorted(ordered, key=lambda product: (product['price_cents'], product['name']))
+        self._views = {None: (ordered, by_price)}
+        for category in self.categories:
+            self._views[category] = ([p for p in ordered if p['category'] == category],
+                                     [p for p in by_price if p['category'] == category])
+
+    def __len__(self):
+        return len(self.products)
+
+    def get(self, product_id):
+        return self.products.get(product_id)
+
+    def featured(self, count):
+        return self._views[None][0][:count]
+
+    def listing(self, category=None, sort='featured', page=1, per_page=24):
+        """Return (products, total) for one page of a category (None for all)"""
+        ordered, by_price = self._views.get(category, ([], []))
+        total = len(ordered)
+        start = (page - 1) * per_page
+        if sort == 'price_desc':
+            # The ascending view read from the end: no second sorted copy
+            stop = max(total - start, 0)
+            return by_price[max(stop - per_page, 0):stop][::-1], total
+        view = by_price if sort == 'price' else ordered
+        return view[start:start + per_page], total
+
+
+def load_snapshot(path):
+    """Parse and index products.json, raising CatalogError if it is malformed"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise CatalogError(f"Can't read catalog {path}: {e}") from e
+    if not isinstance(data, list):
+        raise CatalogError(f"Catalog {path} must be a JSON list of products")
+    products = {}
+    for entry in data:
+        if not isinstance(entry, dict) or not entry.get('id') or 'price' not in entry:
+            raise CatalogError(f"Catalog entry without an id or price: {entry!r}")
+        product = dict(entry)
+        product.setdefault('name', product['id'])
+        product.setdefault('category', 'Other')
+        # Integer-cent prices for the cart pricing engine
+        product['price_cents'] = to_cents(product['price'])
+        products[product['id']] = product
+    return CatalogSnapshot(products, content_version(data))
+
+
+class Catalog:
+    """products.json behind an mtime check; see the module docstring"""
+
+    def __init__(self, path, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._signature = None
+        self._checked_at = 0.0
+        self._snapshot = CatalogSnapshot({}, content_version([]))
+        self.reloads = 0
+        self.reload()
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def reload(self):
+        """Load the file now if it changed since the last load"""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            signature = self._file_signature()
+            if signature == self._signature:
+                return self._snapshot
+            try:
+                self._snapshot = load_snapshot(self.path)
+            except CatalogError as e:
+                logger.error("%s; keeping the %d products already loaded", e, len(self._snapshot))
+            else:
+                self.reloads += 1
+                logger.info("Loaded %d products from %s (version %s)",
+                            len(self._snapshot), self.path, self._snapshot.version)
+            # Remember a broken file too, so it isn't reparsed until it changes again
+            self._signature = signature
+            return self._snapshot
+
+    def current(self):
+        """The latest snapshot, checking the file at most every check_interval seconds"""
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            return self.reload()
+        return self._snapshot
@@ -0,0 +1,64 @@
+"""Streaming order exports, one line-item row at a time.
+
+Every order becomes one row per line item (legacy single-item orders have
+one, see storage.models); an order without items gets a single row with the
+item columns left empty, so every order is in the export.  Both writers are generators, so a response can
+start sending before the last order is read and memory use doesn't grow
+with the number of orders.
+"""
+import csv
+import io
+import json
+
+from storage.models import ORDER_FIELDS
+
+LINE_FIELDS = ['product_id', 'product_name', 'quantity', 'unit_price', 'line_total', 'order_total']
+CSV_FIELDS = list(ORDER_FIELDS) + LINE_FIELDS
+# Spreadsheets run a cell starting with one of these as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def line_items(order):
+    """Flatten one order into a row dict per line item"""
+    base = {field: getattr(order, field) for field in ORDER_FIELDS}
+    base['order_total'] = order.total_price
+    if not order.items:
+        yield dict(base, **{field: None for field in LINE_FIELDS if field != 'order_total'})
+        return
+    for item in order.items:
+        row = dict(base)
+        row['product_id'] = item.product_id
+        row['product_name'] = item.product_name
+        row['quantity'] = item.quantity
+        row['unit_price'] = item.unit_price
+        row['line_total'] = item.total_price
+        yield row
+
+
+def csv_cell(value):
+    """Quote customer-entered text that a spreadsheet would run as a formula"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_lines(orders):
+    """Yield a CSV header, then one CSV line per line item"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for order in orders:
+        for row in line_items(order):
+            writer.writerow({field: csv_cell(value) for field, value in row.items()})
+        # Flush once per order: lines stay small without a write per field
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def jsonl_lines(orders):
+    """Yield one JSON object per line item"""
+    for order in orders:
+        for row in line_items(order):
+            yield json.dumps(row, ensure_ascii=False) + '\n'
@@ -0,0 +1,44 @@
+"""gunicorn settings: ``gunicorn -c gunicorn.conf.py``
+
+The app is built once in the master (preload_app) and workers are forked
+from it, so the stores, indexes and report snapshot create_app() loads are
+shared copy-on-write instead of being reread by every worker.
+"""
+import gc
+import ipaddress
+import multiprocessing
+import os
+
+
+def is_loopback(address):
+    """True for a unix socket or a localhost host:port, which only a local proxy can reach"""
+    if address.startswith('unix:'):
+        return True
+    host = address.rsplit(':', 1)[0].strip('[]')
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+wsgi_app = 'app:create_app()'
+bind = os.environ.get('SOOTHING_BAR_BIND', '127.0.0.1:8000')
+# On localhost, requests can only arrive through a reverse proxy, so trust its
+# X-Forwarded-For (see PROXY_HOPS in app.py).  On any other address clients
+# could forge the header; set SOOTHING_BAR_PROXY_HOPS yourself when a proxy
+# does sit in front.
+if is_loopback(bind):
+    os.environ.setdefault('SOOTHING_BAR_PROXY_HOPS', '1')
+workers = int(os.environ.get('SOOTHING_BAR_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+# Threads let concurrent checkouts in one worker share a group commit
+threads = int(os.environ.get('SOOTHING_BAR_THREADS', 4))
+preload_app = True
+
+
+def when_ready(server):
+    # The preloaded app is fully built by now.  Freezing moves everything it
+    # allocated out of the garbage collector's reach, so collections in the
+    # workers don't write to (and so copy) the shared pages.
+    gc.freeze()
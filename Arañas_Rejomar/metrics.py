@@ -0,0 +1,148 @@
+"""Request, template and storage metrics in Prometheus text format.
+
+Metrics are kept per process: with several gunicorn workers each worker
+reports its own numbers, so scrape every worker (or sum them) as usual.
+"""
+import threading
+import time
+
+from flask import g, request
+from flask.signals import before_render_template, template_rendered
+
+from storage import io_stats
+
+# Set by init_app when the app has a page_cache.RenderCache
+_render_cache = None
+
+# Seconds; chosen around the latencies this site actually sees
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values"""
+
+    def __init__(self, name, help_text, label_names, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: (list(s[0]), s[1], s[2]) for labels, s in self._series.items()}
+        for labels, (counts, total, count) in sorted(series.items()):
+            base = _format_labels(self.label_names, labels)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{base}}} {total}")
+            lines.append(f"{self.name}_count{{{base}}} {count}")
+        return lines
+
+
+def _format_labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+request_duration = Histogram('soothing_http_request_duration_seconds',
+                             'Time spent handling a request, by route.',
+                             ('endpoint', 'method', 'status'))
+template_duration = Histogram('soothing_template_render_duration_seconds',
+                              'Time spent rendering a Jinja template.',
+                              ('template',))
+
+_render_starts = threading.local()
+
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+
+
+def _after_request(response):
+    start = g.pop('metrics_start', None)
+    if start is not None:
+        endpoint = request.endpoint or 'unmatched'
+        request_duration.observe((endpoint, request.method, str(response.status_code)),
+                                 time.perf_counter() - start)
+    return response
+
+
+def _template_started(sender, template, context, **extra):
+    stack = getattr(_render_starts, 'stack', None)
+    if stack is None:
+        stack = _render_starts.stack = []
+    stack.append(time.perf_counter())
+
+
+def _template_finished(sender, template, context, **extra):
+    stack = getattr(_render_starts, 'stack', None)
+    if stack:
+        template_duration.observe((template.name or 'unknown',), time.perf_counter() - stack.pop())
+
+
+def render_storage_metrics():
+    lines = []
+    snapshot = io_stats.snapshot()
+    for key, metric, help_text in (
+            ('reads', 'soothing_storage_reads_total', 'Storage read operations.'),
+            ('writes', 'soothing_storage_writes_total', 'Storage write operations.'),
+            ('bytes_read', 'soothing_storage_read_bytes_total', 'Bytes read from storage.'),
+            ('bytes_written', 'soothing_storage_written_bytes_total', 'Bytes written to storage.')):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        for backend, counters in sorted(snapshot.items()):
+            lines.append(f'{metric}{{backend="{backend}"}} {counters[key]}')
+    return lines
+
+
+def render_cache_metrics():
+    if _render_cache is None:
+        return []
+    lines = []
+    for metric, help_text, value in (
+            ('soothing_render_cache_hits_total', 'Catalog pages served from the render cache.', _render_cache.hits),
+            ('soothing_render_cache_misses_total', 'Catalog pages rendered and cached.', _render_cache.misses)):
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter", f"{metric} {value}"]
+    lines += ["# HELP soothing_render_cache_entries Rendered pages currently cached.",
+              "# TYPE soothing_render_cache_entries gauge",
+              f"soothing_render_cache_entries {len(_render_cache)}"]
+    return lines
+
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format"""
+    lines = (request_duration.render() + template_duration.render() + render_storage_metrics()
+             + render_cache_metrics())
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(app, render_cache=None):
+    """Install the timing hooks on a Flask app"""
+    global _render_cache
+    _render_cache = render_cache
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
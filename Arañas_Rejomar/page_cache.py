@@ -0,0 +1,72 @@
+"""Rendered-page cache with strong ETags for the catalog pages.
+
+The catalog pages only differ between visitors by the nav bar (cart count and
+who is logged in), so a rendered body is cached under a key made of the page,
+the product data version and those few per-visitor values.  Repeat hits skip
+the Jinja render entirely, and a matching If-None-Match gets a bodyless 304.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from flask import Response, render_template, request
+
+
+def content_version(data):
+    """Short digest of JSON-serialisable data; changes whenever the data does"""
+    encoded = json.dumps(data, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()[:12]
+
+
+class RenderCache:
+    """Bounded LRU of rendered pages: key -> (body bytes, etag)"""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body):
+        entry = (body, hashlib.sha1(body).hexdigest())
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def render_cached(cache, key, template, **context):
+    """render_template() through the cache, answering If-None-Match with 304"""
+    entry = cache.get(key)
+    if entry is None:
+        entry = cache.put(key, render_template(template, **context).encode('utf-8'))
+    body, etag = entry
+    response = Response(body, mimetype='text/html')
+    response.set_etag(etag)
+    # The page embeds the visitor's nav bar: browsers may keep it but must
+    # revalidate, and shared caches must not serve it to anyone else
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    return response.make_conditional(request)
@@ -0,0 +1,95 @@
+"""Salted, deliberately slow password hashes, computed on a bounded pool.
+
+Users are saved with a ``password_hash`` in werkzeug's format (which uses
+the stdlib's hashlib.scrypt or pbkdf2_hmac), e.g.
+``scrypt:16384:8:1$<salt>$<hash>``.  The method string carries the cost, so
+raising ``method`` makes every new hash more expensive, and older hashes are
+rehashed at the new cost on the user's next successful login.  Accounts
+saved before hashing still have a plaintext ``password``; they are checked
+as before and get a hash on their next successful login.
+
+A hash takes tens of milliseconds of CPU (and scrypt 16 MB of memory), so
+hashing runs on a pool of ``workers`` threads (hashlib releases the GIL
+while it works).  At most ``max_pending`` hashes may be queued or running.
+Past that, ``PasswordHasherBusy`` is raised at once rather than letting a
+burst of logins queue up unboundedly.
+"""
+import hmac
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# About 50 ms per hash on one core of a typical server
+DEFAULT_METHOD = 'scrypt:16384:8:1'
+DEFAULT_TIMEOUT = 10
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Too many hashes are queued, or one took longer than the timeout"""
+
+
+def hash_method(password_hash):
+    return password_hash.split('$', 1)[0]
+
+
+class PasswordHasher:
+    """hash() and verify() on a bounded thread pool; see the module docstring"""
+
+    def __init__(self, method=DEFAULT_METHOD, workers=2, max_pending=32, timeout=DEFAULT_TIMEOUT):
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pool = None
+        # Checked against for unknown users, so response times don't reveal
+        # which usernames exist.  werkzeug expands short methods ('scrypt' is
+        # saved as 'scrypt:32768:8:1'), so stored hashes are compared with the
+        # method as it appears in this hash, not as configured.
+        self._dummy_hash = generate_password_hash('', method=method)
+        self.stored_method = hash_method(self._dummy_hash)
+
+    def _run(self, fn, *args):
+        if not self._pending.acquire(blocking=False):
+            raise PasswordHasherBusy("Too many password checks in progress")
+        with self._lock:
+            # Started on first use, so a preloaded app forks before any threads exist
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix='password')
+            future = self._pool.submit(fn, *args)
+        future.add_done_callback(lambda _: self._pending.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise PasswordHasherBusy("Password check timed out") from None
+
+    def _hash(self, password):
+        return generate_password_hash(password, method=self.method)
+
+    def hash(self, password):
+        """A new salted hash of password at the current cost"""
+        return self._run(self._hash, password)
+
+    def _verify(self, user, password):
+        if user is None:
+            check_password_hash(self._dummy_hash, password)
+            return False, None
+        stored = user.get('password_hash')
+        if stored is None:
+            plaintext = user.get('password') or ''
+            if not hmac.compare_digest(plaintext.encode('utf-8'), password.encode('utf-8')):
+                return False, None
+            return True, self._hash(password)
+        if not check_password_hash(stored, password):
+            return False, None
+        return True, self._hash(password) if hash_method(stored) != self.stored_method else None
+
+    def verify(self, user, password):
+        """Check password against a user record (None for an unknown user).
+
+        Returns (valid, new_hash).  new_hash is set when the user's stored
+        credentials should be replaced: a plaintext password, or a hash made
+        at an old cost.
+        """
+        return self._run(self._verify, user, password)
@@ -0,0 +1,67 @@
+"""Cart pricing in integer cents.
+
+Every page that shows or saves the cart goes through ``price_cart()``, so
+line totals, the cart total and the item count are computed the same way
+everywhere and summed without float rounding drift.  Amounts are converted
+back to pesos only for display; order line items keep the cents.
+"""
+from storage.models import LineItem
+
+
+def to_cents(amount):
+    """Convert a price in pesos (int, float or numeric string) to integer cents"""
+    return int(round(float(amount) * 100))
+
+
+def to_amount(cents):
+    return cents / 100
+
+
+class CartLine:
+    __slots__ = ('product_id', 'product', 'quantity', 'unit_cents', 'total_cents')
+
+    def __init__(self, product_id, product, quantity):
+        self.product_id = product_id
+        self.product = product
+        self.quantity = quantity
+        self.unit_cents = product['price_cents']
+        self.total_cents = self.unit_cents * quantity
+
+    @property
+    def item_total(self):
+        return to_amount(self.total_cents)
+
+    def as_order_item(self):
+        return LineItem(self.product_id, self.product['name'], self.quantity, self.unit_cents, self.total_cents)
+
+
+class PricedCart:
+    """Line items, total and item count of one cart, and the product_ids no longer sold"""
+
+    __slots__ = ('lines', 'total_cents', 'count', 'missing')
+
+    def __init__(self, lines, count, missing=()):
+        self.lines = lines
+        self.total_cents = sum(line.total_cents for line in lines)
+        self.count = count
+        self.missing = list(missing)
+
+    @property
+    def total(self):
+        return to_amount(self.total_cents)
+
+    def order_items(self):
+        return [line.as_order_item() for line in self.lines]
+
+
+def price_cart(cart, products):
+    """Price a {product_id: quantity} cart against the catalog.
+
+    Products no longer in the catalog are left out of the lines and total,
+    but still counted, as the nav-bar count always has, and listed in
+    ``missing``.
+    """
+    lines = [CartLine(product_id, products[product_id], quantity)
+             for product_id, quantity in cart.items() if product_id in products]
+    missing = [product_id for product_id in cart if product_id not in products]
+    return PricedCart(lines, sum(cart.values()), missing)
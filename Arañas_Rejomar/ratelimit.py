@@ -0,0 +1,117 @@
+"""Per-client rate limits and a concurrency cap for the expensive routes.
+
+Login, signup and checkout read or rewrite the stores, so a client
+hammering them can starve everyone else.  Each of those routes gets a token
+bucket per client: ``count`` requests per ``seconds``, refilled continuously,
+with bursts up to ``count``.  A client whose bucket is empty is turned away
+with 429 and a Retry-After of when its next token arrives.
+
+The routes also share a ``ConcurrencyLimit``: at most that many of them run
+at once in a process.  A request arriving when every slot is taken gets an
+immediate 503 instead of queuing behind the others, so browsing threads
+are never all tied up in storage work.
+
+State is kept in memory per process, so with several gunicorn workers a
+client gets up to ``count`` requests per worker.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+# route=count/seconds, comma separated; SOOTHING_BAR_RATE_LIMITS overrides it
+DEFAULT_LIMITS = 'login=10/60,signup=5/600,checkout=10/60'
+DEFAULT_CONCURRENCY = 8
+# Seconds a 503 tells the client to wait; slots free up as requests finish
+BUSY_RETRY_AFTER = 1
+
+
+def parse_limits(spec):
+    """Parse 'login=10/60,signup=5/600' into {'login': (10, 60.0), ...}"""
+    limits = {}
+    for entry in filter(None, (part.strip() for part in spec.split(','))):
+        try:
+            name, rate = entry.split('=')
+            count, seconds = rate.split('/')
+            limits[name.strip()] = (int(count), float(seconds))
+        except ValueError:
+            raise ValueError(f"Bad rate limit {entry!r}; expected route=count/seconds") from None
+    return limits
+
+
+class TokenBuckets:
+    """One token bucket per client key, for a single route.
+
+    Buckets live in a bounded LRU: a client evicted after ``max_clients``
+    others were seen comes back with a full bucket, which is what it would
+    have refilled to anyway unless it was very busy.
+    """
+
+    def __init__(self, count, seconds, max_clients=10000):
+        self.capacity = count
+        self.rate = count / seconds
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        # key -> [tokens, last refill time]
+        self._buckets = OrderedDict()
+
+    def acquire(self, key):
+        """Take a token for key; returns 0 if allowed, else seconds until the next one"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.capacity, now]
+                while len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0
+            return (1 - bucket[0]) / self.rate
+
+
+class ConcurrencyLimit:
+    """A semaphore that refuses instead of waiting when it's full"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._slots = threading.BoundedSemaphore(limit)
+
+    def try_acquire(self):
+        return self._slots.acquire(blocking=False)
+
+    def release(self):
+        self._slots.release()
+
+
+class RateLimits:
+    """The buckets for every limited route plus the shared concurrency cap.
+
+    Routes missing from ``limits`` aren't rate limited; a concurrency of 0
+    turns the cap off.
+    """
+
+    def __init__(self, limits, concurrency=DEFAULT_CONCURRENCY, max_clients=10000):
+        self.buckets = {name: TokenBuckets(count, seconds, max_clients)
+                        for name, (count, seconds) in limits.items()}
+        self.concurrency = ConcurrencyLimit(concurrency) if concurrency > 0 else None
+
+    def retry_after(self, name, client):
+        """0 if client may call route ``name`` now, else whole seconds to wait"""
+        buckets = self.buckets.get(name)
+        if buckets is None:
+            return 0
+        wait = buckets.acquire(client)
+        return math.ceil(wait) if wait else 0
+
+    def try_enter(self):
+        """Take a concurrency slot; False if none is free.  Pair with leave()."""
+        return self.concurrency is None or self.concurrency.try_acquire()
+
+    def leave(self):
+        if self.concurrency is not None:
+            self.concurrency.release()
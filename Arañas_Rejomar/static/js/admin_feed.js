@@ -0,0 +1,125 @@
+// Live admin dashboard: long-polls /admin/orders/feed from the cursor the
+// page was rendered at and patches in new orders, status changes, deletes
+// and the stat cards, instead of reloading the whole page.
+(function () {
+    var feed = document.getElementById('order-feed');
+    if (!feed || !window.fetch) {
+        return;
+    }
+    var WAIT = 25;
+    var RETRY_DELAY = 5000;
+    var cursor = Number(feed.dataset.cursor);
+    // New orders are only inserted on the unfiltered first page, where they belong at the top
+    var live = feed.dataset.live === 'true';
+    var statusFilter = feed.dataset.status;
+    var perPage = Number(feed.dataset.perPage);
+    var missed = 0;
+    var paused = false;
+
+    function rowsFor(orderId) {
+        var selector = 'tbody.order-rows[data-order-id="' + CSS.escape(orderId) + '"]';
+        return document.querySelector(selector);
+    }
+
+    function notice(html) {
+        feed.innerHTML = html;
+        feed.hidden = false;
+    }
+
+    function addOrder(change) {
+        var order = change.order;
+        if (!order || rowsFor(change.order_id) || (statusFilter && order.status !== statusFilter)) {
+            return;
+        }
+        var table = document.querySelector('.orders-table table');
+        if (!live || !table) {
+            missed += 1;
+            notice(missed + (missed === 1 ? ' new order' : ' new orders') + ' since this page loaded. <a href="">Refresh</a>');
+            return;
+        }
+        var template = document.createElement('template');
+        template.innerHTML = change.html.trim();
+        table.querySelector('thead').after(template.content.firstElementChild);
+        var rows = table.querySelectorAll('tbody.order-rows');
+        for (var i = perPage; i < rows.length; i++) {
+            rows[i].remove();
+        }
+    }
+
+    function setStatus(change) {
+        var rows = rowsFor(change.order_id);
+        if (!rows) {
+            return;
+        }
+        var badge = rows.querySelector('.status-badge');
+        badge.textContent = change.status;
+        badge.className = 'status-badge status-' + change.status.toLowerCase().replace(/ /g, '-');
+        rows.querySelector('select[name="status"]').value = change.status;
+    }
+
+    function removeOrder(change) {
+        var rows = rowsFor(change.order_id);
+        if (rows) {
+            rows.remove();
+        }
+    }
+
+    var handlers = {add: addOrder, status: setStatus, delete: removeOrder};
+
+    function setStats(stats) {
+        var values = {
+            total_orders: stats.total_orders,
+            revenue: '₱' + stats.revenue.toFixed(2),
+            units: stats.units
+        };
+        document.querySelectorAll('[data-stat]').forEach(function (element) {
+            var key = element.dataset.stat;
+            element.textContent = key in values ? values[key] : (stats.status_counts[key] || 0);
+        });
+    }
+
+    function next() {
+        // A hidden tab stops polling, so it doesn't hold a server thread
+        if (document.hidden) {
+            paused = true;
+        } else {
+            poll();
+        }
+    }
+
+    function poll() {
+        fetch(feed.dataset.url + '?cursor=' + cursor + '&wait=' + WAIT, {
+            credentials: 'same-origin',
+            headers: {Accept: 'application/json'}
+        }).then(function (response) {
+            var type = response.headers.get('Content-Type') || '';
+            if (!response.ok || type.indexOf('application/json') !== 0) {
+                throw new Error('Order feed unavailable: ' + response.status);
+            }
+            return response.json();
+        }).then(function (data) {
+            if (data.reset) {
+                notice('Orders changed too much to update in place. <a href="">Refresh</a>');
+                return;
+            }
+            data.changes.forEach(function (change) {
+                handlers[change.op](change);
+            });
+            if (data.stats) {
+                setStats(data.stats);
+            }
+            cursor = data.cursor;
+            next();
+        }).catch(function () {
+            setTimeout(next, RETRY_DELAY);
+        });
+    }
+
+    document.addEventListener('visibilitychange', function () {
+        if (!document.hidden && paused) {
+            paused = false;
+            poll();
+        }
+    });
+    next();
+})();
@@ -0,0 +1,48 @@
+"""Order and user persistence behind pluggable backends.
+
+    order_store, user_store = open_stores('sqlite', DATA_DIR)
+"""
+import os
+
+from .base import OrderStore, UserStore, make_order_id
+from .iostats import io_stats
+from .json_store import JsonOrderStore, JsonUserStore
+from .models import SCHEMA_VERSION, LineItem, Order
+from .sqlite_store import SqliteDatabase, SqliteOrderStore, SqliteUserStore
+from .writebehind import OrderWriter, WriteQueueFull
+
+BACKENDS = ('json', 'sqlite')
+
+__all__ = [
+    'BACKENDS', 'OrderStore', 'UserStore', 'JsonOrderStore', 'JsonUserStore',
+    'SqliteDatabase', 'SqliteOrderStore', 'SqliteUserStore', 'make_order_id', 'migrate', 'open_stores',
+    'io_stats', 'LineItem', 'Order', 'SCHEMA_VERSION', 'OrderWriter', 'WriteQueueFull',
+]
+
+
+def open_stores(backend, data_dir, legacy_orders_paths=()):
+    """Return (order_store, user_store) for the named backend"""
+    if backend == 'json':
+        orders_file = os.path.join(data_dir, 'orders.jsonl')
+        legacy = [os.path.join(data_dir, 'orders.json')] + list(legacy_orders_paths)
+        return (JsonOrderStore(orders_file, legacy_paths=legacy),
+                JsonUserStore(os.path.join(data_dir, 'users.json')))
+    if backend == 'sqlite':
+        db = SqliteDatabase(os.path.join(data_dir, 'soothing_bar.db'))
+        return SqliteOrderStore(db), SqliteUserStore(db)
+    raise ValueError(f"Unknown storage backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+
+
+def migrate(source, target):
+    """Copy every order and user from one (order_store, user_store) pair to another.
+
+    Returns (orders, users) copied.  Orders or users already present in the
+    target are skipped, so the migration can be re-run safely.
+    """
+    source_orders, source_users = source
+    target_orders, target_users = target
+    orders = source_orders.all()
+    users = source_users.all()
+    target_orders.import_orders(orders)
+    target_users.import_users(users)
+    return len(orders), len(users)
@@ -0,0 +1,171 @@
+"""Storage interfaces every backend implements.
+
+Routes only talk to an OrderStore and a UserStore, so swapping the JSON files
+for SQLite (or anything else) never touches app.py.
+"""
+from datetime import datetime
+
+from .search import order_terms, query_terms
+
+
+def make_order_id(seq, now=None):
+    """Build an order ID from a store-assigned sequence number.
+
+    The timestamp keeps IDs readable and sortable; the sequence number,
+    handed out under the store's write lock, makes them unique even when
+    many checkouts land in the same second on different workers.
+    """
+    now = now or datetime.now()
+    return f"ORD-{now.strftime('%Y%m%d%H%M%S')}-{seq:06d}"
+
+
+def end_of_day(date):
+    """Upper bound for order_dates on 'YYYY-MM-DD' date, for inclusive date_to filters.
+
+    '~' sorts after any time suffix, so every order on that day compares below it.
+    """
+    return date + '~'
+
+
+class OrderStore:
+    """Interface for order persistence.
+
+    Orders come back as ``storage.models.Order``; add() and friends take an
+    Order or a plain dict in any schema version.
+    """
+
+    def all(self):
+        """Return every order, oldest first"""
+        raise NotImplementedError
+
+    def get(self, order_id):
+        """Return one order, or None"""
+        raise NotImplementedError
+
+    def add(self, order):
+        """Durably save a new order, assigning an order_id if it has none.
+
+        Returns the order_id.
+        """
+        raise NotImplementedError
+
+    def add_many(self, orders):
+        """Durably save several new orders at once (one commit where the
+        backend allows), assigning order_ids as add() does.
+
+        Returns the order_ids in order.
+        """
+        return [self.add(order) for order in orders]
+
+    def update_status(self, order_id, status):
+        """Change an order's status, returning False if it doesn't exist"""
+        raise NotImplementedError
+
+    def delete(self, order_id):
+        """Remove an order, returning False if it doesn't exist"""
+        raise NotImplementedError
+
+    def page(self, page=1, per_page=50, status=None, date_from=None, date_to=None):
+        """Return (orders, total) for one newest-first page of matching orders.
+
+        date_from/date_to are inclusive 'YYYY-MM-DD' bounds on order_date.
+        """
+        raise NotImplementedError
+
+    def iter_orders(self, status=None, date_from=None, date_to=None):
+        """Yield matching orders oldest first, a batch at a time.
+
+        Meant for exports: memory use doesn't grow with the number of orders.
+        """
+        for order in self.all():
+            date = order.order_date
+            if status is not None and order.status != status:
+                continue
+            if (date_from and date < date_from) or (date_to and date > end_of_day(date_to)):
+                continue
+            yield order
+
+    def search(self, query, page=1, per_page=50, status=None, date_from=None, date_to=None):
+        """Return (orders, total) for one newest-first page of orders matching
+        every word of query as a prefix (see storage.search), within the
+        same filters as page().
+        """
+        prefixes = query_terms(query)
+        matches = []
+        for order in self.iter_orders(status, date_from, date_to):
+            terms = order_terms(order)
+            if prefixes and all(any(term.startswith(p) for term in terms) for p in prefixes):
+                matches.append(order)
+        matches.reverse()
+        start = (page - 1) * per_page
+        return matches[start:start + per_page], len(matches)
+
+    def stats(self):
+        """Return total_orders, status_counts, revenue and units aggregates.
+
+        status_counts only has statuses with at least one order.
+        """
+        raise NotImplementedError
+
+    def changes(self, since, limit=1000):
+        """Return (changes, cursor, reset): order changes after cursor ``since``.
+
+        Each change is a dict with seq, op ('add', 'status' or 'delete') and
+        order_id; 'add' changes carry the order (None if since deleted) and
+        'status' changes the new status.  Pass the returned cursor back in to
+        continue.  reset is True when history that old is no longer kept
+        (e.g. after a compaction): the caller must reload everything, then
+        continue from the returned cursor.
+        """
+        raise NotImplementedError
+
+    def change_cursor(self):
+        """The cursor of the latest change, for starting to follow changes()"""
+        raise NotImplementedError
+
+    def quantities(self, orders):
+        """Map order_id -> total units for the given orders"""
+        return {order.order_id: order.quantity for order in orders}
+
+    def import_orders(self, orders):
+        """Bulk-load orders, e.g. when migrating between backends"""
+        for order in orders:
+            self.add(order)
+
+    def upgrade_records(self):
+        """Rewrite saved records older than models.SCHEMA_VERSION in the
+        current schema, so they load without normalizing.
+
+        Returns the number of records rewritten; running it again is a no-op.
+        """
+        raise NotImplementedError
+
+
+class UserStore:
+    """Interface for user account persistence"""
+
+    def all(self):
+        """Return every registered user"""
+        raise NotImplementedError
+
+    def get(self, username):
+        """Look up a user by username"""
+        raise NotImplementedError
+
+    def get_by_email(self, email):
+        """Look up a user by email address"""
+        raise NotImplementedError
+
+    def add(self, user_data):
+        """Register a new user, returning (success, message)"""
+        raise NotImplementedError
+
+    def set_password_hash(self, username, password_hash):
+        """Replace a user's stored credentials (dropping any plaintext
+        password); returns False if there is no such user"""
+        raise NotImplementedError
+
+    def import_users(self, users):
+        """Bulk-load users, e.g. when migrating between backends"""
+        for user in users:
+            self.add(user)
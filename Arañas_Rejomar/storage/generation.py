@@ -0,0 +1,48 @@
+"""Shared generation counters so workers can trust their in-memory caches.
+
+Each JSON file gets a sidecar ``.gen`` file holding one 64-bit counter,
+memory-mapped by every process that uses the store.  A writer bumps it
+after its change is durably on disk; a reader compares it with the value it
+last synced at, which is a read from shared memory rather than a stat() or
+a reparse.  Only when the counter moved does the reader go back to the file.
+"""
+import mmap
+import os
+import struct
+
+_COUNTER = struct.Struct('<Q')
+
+
+class GenerationCounter:
+    """A counter in a small memory-mapped file, shared by every process.
+
+    bump() is a read-modify-write, so callers must hold a lock that
+    serialises writers across processes (the stores' FileLock).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._map = None
+
+    def _mapping(self):
+        # Mapped lazily, so opening a store doesn't create files; a mapping
+        # made before fork() stays shared with the children
+        if self._map is None:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+            try:
+                if os.fstat(fd).st_size < _COUNTER.size:
+                    os.ftruncate(fd, _COUNTER.size)
+                self._map = mmap.mmap(fd, _COUNTER.size)
+            finally:
+                os.close(fd)
+        return self._map
+
+    def value(self):
+        return _COUNTER.unpack_from(self._mapping())[0]
+
+    def bump(self):
+        """Advance the counter and return the new value"""
+        mapping = self._mapping()
+        value = _COUNTER.unpack_from(mapping)[0] + 1
+        _COUNTER.pack_into(mapping, 0, value)
+        return value
@@ -0,0 +1,29 @@
+"""Process-wide counters of storage reads, writes and bytes, per backend"""
+import threading
+
+
+class IOStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def record_read(self, backend, nbytes=0):
+        self._add(backend, 'reads', 'bytes_read', nbytes)
+
+    def record_write(self, backend, nbytes=0):
+        self._add(backend, 'writes', 'bytes_written', nbytes)
+
+    def _add(self, backend, op, bytes_key, nbytes):
+        with self._lock:
+            counters = self._counters.setdefault(
+                backend, {'reads': 0, 'writes': 0, 'bytes_read': 0, 'bytes_written': 0})
+            counters[op] += 1
+            counters[bytes_key] += nbytes
+
+    def snapshot(self):
+        """Return {backend: {reads, writes, bytes_read, bytes_written}}"""
+        with self._lock:
+            return {backend: dict(counters) for backend, counters in self._counters.items()}
+
+
+io_stats = IOStats()
@@ -0,0 +1,683 @@
+"""JSON-file storage backend: an append-only orders.jsonl plus users.json"""
+import bisect
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+
+from .base import OrderStore, UserStore, end_of_day, make_order_id
+from .generation import GenerationCounter
+from .iostats import io_stats
+from .locking import FileLock
+from .models import Order, is_current
+from .search import TermIndex, order_terms
+
+logger = logging.getLogger(__name__)
+
+
+class JsonOrderStore(OrderStore):
+    """Append-only journal of 'add', 'status' and 'delete' records, one JSON per line.
+
+    Orders are kept parsed in memory with date and status indexes, and only
+    bytes appended since the last read are parsed.  Writers append under
+    ``orders.jsonl.lock`` and bump ``orders.jsonl.gen`` (storage.generation)
+    so other processes know to catch up; compact() rewrites the journal once
+    superseded records outnumber live orders.
+    """
+
+    # Don't bother compacting small journals
+    COMPACT_MIN_DEAD = 1000
+    # Journal records kept in memory for changes(); older cursors get a reset
+    CHANGE_HISTORY = 100000
+    # Fallback stat of the journal even when the generation hasn't moved
+    RECHECK_INTERVAL = 5.0
+
+    def __init__(self, path, legacy_paths=()):
+        self.path = path
+        self.legacy_paths = list(legacy_paths)
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(path + '.lock')
+        self._offset = 0
+        self._file_id = None
+        self._epoch = None
+        self._next_seq = 1
+        self._generation = GenerationCounter(path + '.gen')
+        self._synced_generation = None
+        self._recheck_at = 0.0
+        self._reset_index()
+
+    # -- import ---------------------------------------------------------
+
+    def _ensure_journal(self):
+        """Create the journal, importing the legacy orders.json once"""
+        if os.path.exists(self.path):
+            return
+        with self._file_lock:
+            # Another worker may have imported while we waited for the lock
+            if not os.path.exists(self.path):
+                self._import_legacy()
+
+    def _sync(self):
+        """Catch up with other writers, skipping the file when nothing was written"""
+        generation = self._generation.value()
+        if generation == self._synced_generation and time.monotonic() < self._recheck_at:
+            return
+        self._ensure_journal()
+        self._catch_up()
+        # Read before catching up: a write landing meanwhile moves it again
+        self._synced_generation = generation
+        self._recheck_at = time.monotonic() + self.RECHECK_INTERVAL
+
+    def _written(self):
+        """Tell other processes the journal changed; call under the file lock"""
+        # Holding the file lock, this process has seen every earlier write
+        self._synced_generation = self._generation.bump()
+
+    def _import_legacy(self):
+        orders = []
+        for legacy_path in self.legacy_paths:
+            orders = _read_legacy_orders(legacy_path)
+            if orders:
+                logger.info("Importing %d orders from %s into %s", len(orders), legacy_path, self.path)
+                break
+        # Legacy records are normalized into the current schema on the way in
+        self._write_all(0, ({'seq': seq, 'op': 'add', 'order': Order.from_dict(order).to_dict()}
+                            for seq, order in enumerate(orders, start=1)))
+        self._written()
+
+    def _write_all(self, last_seq, records):
+        """Atomically replace the journal with a meta header and the given records.
+
+        The header carries a new random epoch, which is how readers tell the
+        new file from the one it replaced, even if the filesystem reuses its
+        inode and it grows past a reader's offset.  Returns the epoch.
+        """
+        epoch = secrets.token_hex(8)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8', newline='\n') as f:
+            # The header's seq keeps the sequence counter from going backwards
+            f.write(_encode_record({'seq': last_seq, 'op': 'meta', 'epoch': epoch}))
+            for record in records:
+                f.write(_encode_record(record))
+            f.flush()
+            os.fsync(f.fileno())
+            io_stats.record_write('json', f.tell())
+        os.replace(tmp_path, self.path)
+        return epoch
+
+    # -- reading --------------------------------------------------------
+
+    def all(self):
+        """Return every order in the journal, oldest first"""
+        with self._lock:
+            self._sync()
+            return list(self._orders.values())
+
+    def _catch_up(self):
+        """Parse whatever was appended to the journal since the last read"""
+        with open(self.path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            file_id = (st.st_dev, st.st_ino)
+            epoch = _journal_epoch(f.readline())
+            if file_id != self._file_id or epoch != self._epoch or st.st_size < self._offset:
+                # The journal was replaced (rewrite/import); start over
+                self._reset_index()
+                self._offset = 0
+                self._file_id = file_id
+                self._epoch = epoch
+            if st.st_size == self._offset:
+                return
+            f.seek(self._offset)
+            chunk = f.read(st.st_size - self._offset)
+        io_stats.record_read('json', len(chunk))
+        # Only consume complete lines; a torn final line (crash mid-write)
+        # is left for a later read or ignored forever if never completed.
+        end = chunk.rfind(b'\n')
+        if end < 0:
+            return
+        for line in chunk[:end].split(b'\n'):
+            record = _decode_record(line)
+            if record is None:
+                continue
+            self._apply(record)
+        self._offset += end + 1
+
+    def _apply(self, record):
+        """Replay one journal record into the in-memory index"""
+        self._next_seq = max(self._next_seq, record.get('seq', 0) + 1)
+        op = record.get('op')
+        if op == 'add':
+            if not is_current(record['order']):
+                self._legacy += 1
+            record['order'] = Order.from_dict(record['order'])
+        self._record_change(record)
+        if op == 'add':
+            self._index_order(record['seq'], record['order'])
+        elif op == 'status':
+            seq = self._by_id.get(record.get('order_id'))
+            if seq is not None:
+                order = self._orders[seq]
+                self._remove_from_status(seq, order, order.status)
+                order.status = record['status']
+                self._add_to_status(seq, order, record['status'])
+            self._dead += 1
+        elif op == 'delete':
+            seq = self._by_id.get(record.get('order_id'))
+            if seq is not None:
+                self._unindex_order(seq)
+                self._dead += 1
+            self._dead += 1
+
+    def _record_change(self, record):
+        op = record.get('op')
+        seq = record.get('seq', 0)
+        if op == 'meta':
+            # A compacted journal folds everything up to here into its adds
+            self._history_floor = max(self._history_floor, seq)
+            return
+        if op not in ('add', 'status', 'delete') or seq <= self._history_floor:
+            return
+        if op == 'add':
+            order = record['order']
+            self._changes.append((seq, op, order.order_id, order.status))
+        else:
+            self._changes.append((seq, op, record.get('order_id'), record.get('status')))
+        if len(self._changes) > 2 * self.CHANGE_HISTORY:
+            drop = len(self._changes) - self.CHANGE_HISTORY
+            self._history_floor = self._changes[drop - 1][0]
+            del self._changes[:drop]
+
+    # -- indexes --------------------------------------------------------
+
+    def _reset_index(self):
+        self._orders = {}       # seq -> order, journal order
+        self._by_id = {}        # order_id -> seq
+        self._by_date = []      # sorted (order_date, seq) keys
+        self._by_status = {}    # status -> sorted (order_date, seq) keys
+        self._quantities = {}   # seq -> total units in the order
+        self._revenue_cents = {}  # status -> summed total_price in cents
+        self._units = {}        # status -> summed units
+        self._dead = 0          # journal records superseded by later ones
+        self._legacy = 0        # 'add' records older than the current schema
+        self._terms = None      # search TermIndex over seq, built on first search
+        self._changes = []      # (seq, op, order_id, status) of recent records
+        self._history_floor = 0  # changes() can't answer cursors below this
+
+    def _index_order(self, seq, order):
+        key = (order.order_date, seq)
+        self._orders[seq] = order
+        self._by_id.setdefault(order.order_id, seq)
+        _insort(self._by_date, key)
+        self._quantities[seq] = order.quantity
+        self._add_to_status(seq, order, order.status)
+        if self._terms is not None:
+            self._terms.add(seq, order_terms(order))
+
+    def _unindex_order(self, seq):
+        order = self._orders.pop(seq)
+        key = (order.order_date, seq)
+        if self._by_id.get(order.order_id) == seq:
+            del self._by_id[order.order_id]
+        _remove_key(self._by_date, key)
+        self._remove_from_status(seq, order, order.status)
+        del self._quantities[seq]
+        if self._terms is not None:
+            self._terms.remove(seq, order_terms(order))
+        return order
+
+    def _add_to_status(self, seq, order, status):
+        key = (order.order_date, seq)
+        _insort(self._by_status.setdefault(status, []), key)
+        self._revenue_cents[status] = self._revenue_cents.get(status, 0) + order.total_cents
+        self._units[status] = self._units.get(status, 0) + self._quantities[seq]
+
+    def _remove_from_status(self, seq, order, status):
+        key = (order.order_date, seq)
+        _remove_key(self._by_status[status], key)
+        self._revenue_cents[status] -= order.total_cents
+        self._units[status] -= self._quantities[seq]
+
+    def stats(self):
+        """Dashboard aggregates, read from the running totals in O(statuses)"""
+        with self._lock:
+            self._sync()
+            # Statuses whose last order moved on keep an empty index; leave them out
+            counts = {status: len(keys) for status, keys in self._by_status.items() if keys}
+            # Cancelled orders stay countable but don't earn revenue
+            revenue_cents = sum(cents for status, cents in self._revenue_cents.items()
+                                if status != 'Cancelled')
+            units = sum(units for status, units in self._units.items() if status != 'Cancelled')
+            return {
+                'total_orders': len(self._orders),
+                'status_counts': counts,
+                'revenue': revenue_cents / 100,
+                'units': units,
+            }
+
+    def quantities(self, orders):
+        """Map order_id -> total units for the given (indexed) orders"""
+        with self._lock:
+            result = {}
+            for order in orders:
+                seq = self._by_id.get(order.order_id)
+                if seq is not None:
+                    result[order.order_id] = self._quantities[seq]
+            return result
+
+    def page(self, page=1, per_page=50, status=None, date_from=None, date_to=None):
+        """Return (orders, total) for one newest-first page of matching orders"""
+        with self._lock:
+            self._sync()
+            keys = self._by_date if status is None else self._by_status.get(status, [])
+            lo = bisect.bisect_left(keys, (date_from,)) if date_from else 0
+            hi = bisect.bisect_right(keys, (end_of_day(date_to),)) if date_to else len(keys)
+            total = max(hi - lo, 0)
+            start = hi - (page - 1) * per_page
+            stop = max(start - per_page, lo)
+            orders = [self._orders[keys[i][1]] for i in range(start - 1, stop - 1, -1)]
+            return orders, total
+
+    def iter_orders(self, status=None, date_from=None, date_to=None, batch_size=1000):
+        """Yield matching orders oldest first, taking the lock once per batch"""
+        last = (date_from,) if date_from else None
+        end = (end_of_day(date_to),) if date_to else None
+        while True:
+            with self._lock:
+                self._sync()
+                keys = self._by_date if status is None else self._by_status.get(status, [])
+                # Resume after the last key yielded, so orders written or
+                # deleted between batches never shift the position
+                lo = bisect.bisect_right(keys, last) if last else 0
+                hi = bisect.bisect_right(keys, end) if end else len(keys)
+                batch = keys[lo:min(lo + batch_size, hi)]
+                orders = [self._orders[seq] for _, seq in batch]
+            if not orders:
+                return
+            yield from orders
+            last = batch[-1]
+
+    def search(self, query, page=1, per_page=50, status=None, date_from=None, date_to=None):
+        """Return (orders, total) for one newest-first page of search matches"""
+        with self._lock:
+            self._sync()
+            if self._terms is None:
+                # Built once per process, then kept current by _index_order()
+                # and _unindex_order() as journal records are applied
+                self._terms = TermIndex()
+                self._terms.build((seq, order_terms(order)) for seq, order in self._orders.items())
+            keys = []
+            for seq in self._terms.search(query):
+                order = self._orders[seq]
+                key = (order.order_date, seq)
+                if status is not None and order.status != status:
+                    continue
+                if (date_from and key < (date_from,)) or (date_to and key > (end_of_day(date_to),)):
+                    continue
+                keys.append(key)
+            keys.sort(reverse=True)
+            start = (page - 1) * per_page
+            return [self._orders[seq] for _, seq in keys[start:start + per_page]], len(keys)
+
+    def changes(self, since, limit=1000):
+        """Order changes after cursor ``since``, from the in-memory history"""
+        with self._lock:
+            self._sync()
+            latest = self._next_seq - 1
+            if since < self._history_floor:
+                return [], latest, True
+            start = bisect.bisect_left(self._changes, (since + 1,))
+            batch = self._changes[start:start + limit]
+            changes = []
+            for seq, op, order_id, status in batch:
+                change = {'seq': seq, 'op': op, 'order_id': order_id}
+                if op == 'add':
+                    live = self._by_id.get(order_id) == seq
+                    change['order'] = self._orders[seq] if live else None
+                elif op == 'status':
+                    change['status'] = status
+                changes.append(change)
+            cursor = batch[-1][0] if len(batch) == limit else latest
+            return changes, cursor, False
+
+    def change_cursor(self):
+        with self._lock:
+            self._sync()
+            return self._next_seq - 1
+
+    # -- writing --------------------------------------------------------
+
+    def get(self, order_id):
+        """Return one order, or None"""
+        with self._lock:
+            self._sync()
+            seq = self._by_id.get(order_id)
+            return None if seq is None else self._orders[seq]
+
+    def add(self, order):
+        """Durably append one order to the journal, returning its order_id.
+
+        Orders without an order_id get one derived from their journal
+        sequence number, which is unique across workers because it is
+        assigned under the journal lock.
+        """
+        order = Order.coerce(order)
+        with self._lock, self._file_lock:
+            self._ensure_journal()
+            self._catch_up()
+            if not order.order_id:
+                order.order_id = make_order_id(self._next_seq)
+            self._append_record({'seq': self._next_seq, 'op': 'add', 'order': order.to_dict()})
+            return order.order_id
+
+    def add_many(self, orders):
+        """Append several orders with a single write and fsync (group commit)"""
+        orders = [Order.coerce(order) for order in orders]
+        with self._lock, self._file_lock:
+            self._ensure_journal()
+            self._catch_up()
+            records = []
+            for order in orders:
+                seq = self._next_seq + len(records)
+                if not order.order_id:
+                    order.order_id = make_order_id(seq)
+                records.append({'seq': seq, 'op': 'add', 'order': order.to_dict()})
+            if records:
+                self._append_records(records)
+            return [order.order_id for order in orders]
+
+    def update_status(self, order_id, status):
+        """Change an order's status, returning False if it doesn't exist"""
+        with self._lock, self._file_lock:
+            self._ensure_journal()
+            self._catch_up()
+            if order_id not in self._by_id:
+                return False
+            self._append_record({'seq': self._next_seq, 'op': 'status',
+                                 'order_id': order_id, 'status': status})
+            self._maybe_compact()
+            return True
+
+    def delete(self, order_id):
+        """Remove an order with a tombstone, returning False if it doesn't exist"""
+        with self._lock, self._file_lock:
+            self._ensure_journal()
+            self._catch_up()
+            if order_id not in self._by_id:
+                return False
+            self._append_record({'seq': self._next_seq, 'op': 'delete', 'order_id': order_id})
+            self._maybe_compact()
+            return True
+
+    def import_orders(self, orders):
+        """Append many orders with a single write and fsync, skipping known ids"""
+        with self._lock, self._file_lock:
+            self._ensure_journal()
+            self._catch_up()
+            records = []
+            seen = set(self._by_id)
+            for order in map(Order.coerce, orders):
+                if order.order_id in seen:
+                    continue
+                seen.add(order.order_id)
+                records.append({'seq': self._next_seq + len(records), 'op': 'add', 'order': order.to_dict()})
+            if records:
+                self._append_records(records)
+
+    def _append_record(self, record):
+        self._append_records([record])
+
+    def _append_records(self, records):
+        """Append and fsync records, then replay them into the index"""
+        data = ''.join(_encode_record(record) for record in records).encode('utf-8')
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | getattr(os, 'O_BINARY', 0))
+        try:
+            if os.fstat(fd).st_size > 0 and not _ends_with_newline(self.path):
+                # Terminate a torn record left by an earlier crash so it
+                # cannot swallow this one.
+                data = b'\n' + data
+            os.write(fd, data)
+            os.fsync(fd)
+            io_stats.record_write('json', len(data))
+        finally:
+            os.close(fd)
+        # Read our own record back like any other writer's, so the index
+        # never diverges from what is on disk
+        self._catch_up()
+        self._written()
+
+    # -- compaction -----------------------------------------------------
+
+    def _maybe_compact(self):
+        if self._dead >= self.COMPACT_MIN_DEAD and self._dead > len(self._orders):
+            self.compact()
+
+    def compact(self):
+        """Rewrite the journal with one 'add' record per live order"""
+        with self._lock, self._file_lock:
+            self._ensure_journal()
+            self._catch_up()
+            self._epoch = self._write_all(self._next_seq - 1, (
+                {'seq': seq, 'op': 'add', 'order': order.to_dict()} for seq, order in self._orders.items()))
+            st = os.stat(self.path)
+            self._file_id = (st.st_dev, st.st_ino)
+            self._offset = st.st_size
+            self._dead = 0
+            self._legacy = 0
+            self._written()
+
+    def upgrade_records(self):
+        """Compact the journal if any 'add' record predates the current schema"""
+        with self._lock, self._file_lock:
+            self._ensure_journal()
+            self._catch_up()
+            legacy = self._legacy
+            if legacy:
+                # Compaction writes every live order back with to_dict()
+                self.compact()
+            return legacy
+
+
+def _encode_record(record):
+    return json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def _remove_key(keys, key):
+    i = bisect.bisect_left(keys, key)
+    if i < len(keys) and keys[i] == key:
+        del keys[i]
+
+
+def _insort(keys, key):
+    # Orders almost always arrive newest, so appending is the common case
+    if not keys or keys[-1] <= key:
+        keys.append(key)
+    else:
+        bisect.insort(keys, key)
+
+
+def _decode_record(line):
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        logger.warning("Skipping unreadable journal record: %s", e)
+        return None
+    if not isinstance(record, dict):
+        return None
+    return record
+
+
+def _journal_epoch(first_line):
+    """The epoch in a journal's meta header; None for journals written without one"""
+    record = _decode_record(first_line) if first_line.endswith(b'\n') else None
+    if record is None or record.get('op') != 'meta':
+        return None
+    return record.get('epoch')
+
+
+def _ends_with_newline(path):
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+
+def _read_legacy_orders(path):
+    """Read a legacy orders.json list, returning [] if missing or unreadable"""
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (ValueError, IOError) as e:
+        logger.error("Error reading legacy orders from %s: %s", path, e)
+        return []
+    if isinstance(data, list):
+        return data
+    try:
+        return list(data)
+    except TypeError:
+        return []
+
+
+class JsonUserStore(UserStore):
+    """users.json cached in memory and indexed by username and email.
+
+    Signups rewrite the file under ``users.json.lock`` and bump
+    ``users.json.gen``; the file is reparsed only when it changed.
+    """
+
+    RECHECK_INTERVAL = 5.0
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._users = []
+        self._by_username = {}
+        self._by_email = {}
+        self._signature = None
+        self._file_lock = FileLock(path + '.lock')
+        self._generation = GenerationCounter(path + '.gen')
+        self._synced_generation = None
+        self._recheck_at = 0.0
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _refresh(self):
+        """Reload users.json if it changed on disk since the last load"""
+        signature = self._file_signature()
+        if signature == self._signature:
+            return
+        users = []
+        if signature is not None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    users = json.load(f)
+                io_stats.record_read('json', signature[1])
+            except (ValueError, IOError) as e:
+                logger.error("Error loading users: %s", e)
+                users = []
+        if not isinstance(users, list):
+            users = []
+        self._users = users
+        self._by_username = {}
+        self._by_email = {}
+        for user in users:
+            self._index(user)
+        self._signature = signature
+
+    def _sync(self):
+        """Reload users.json if another process (or editor) may have changed it"""
+        generation = self._generation.value()
+        if generation == self._synced_generation and time.monotonic() < self._recheck_at:
+            return
+        self._refresh()
+        self._synced_generation = generation
+        self._recheck_at = time.monotonic() + self.RECHECK_INTERVAL
+
+    def _index(self, user):
+        # First entry wins, matching the old linear scan
+        self._by_username.setdefault(user.get('username'), user)
+        self._by_email.setdefault(user.get('email'), user)
+
+    def all(self):
+        """Return every registered user"""
+        with self._lock:
+            self._sync()
+            return list(self._users)
+
+    def get(self, username):
+        """Look up a user by username"""
+        with self._lock:
+            self._sync()
+            return self._by_username.get(username)
+
+    def get_by_email(self, email):
+        """Look up a user by email address"""
+        with self._lock:
+            self._sync()
+            return self._by_email.get(email)
+
+    def add(self, user_data):
+        """Register a new user, returning (success, message)"""
+        with self._lock, self._file_lock:
+            self._refresh()
+            if user_data['username'] in self._by_username:
+                return False, "Username already exists!"
+            if user_data['email'] in self._by_email:
+                return False, "Email already registered!"
+            self._write(self._users + [user_data])
+            return True, "User registered successfully!"
+
+    def set_password_hash(self, username, password_hash):
+        with self._lock, self._file_lock:
+            self._refresh()
+            user = self._by_username.get(username)
+            if user is None:
+                return False
+            # A new dict, so a record another thread already looked up doesn't change under it
+            updated = {key: value for key, value in user.items() if key != 'password'}
+            updated['password_hash'] = password_hash
+            self._write([updated if entry is user else entry for entry in self._users])
+            self._by_username[username] = updated
+            if self._by_email.get(user.get('email')) is user:
+                self._by_email[user.get('email')] = updated
+            return True
+
+    def _write(self, users):
+        """Atomically rewrite users.json and index the new entries in place"""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(users, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+            io_stats.record_write('json', f.tell())
+        os.replace(tmp_path, self.path)
+        for user in users[len(self._users):]:
+            self._index(user)
+        self._users = users
+        self._signature = self._file_signature()
+        self._synced_generation = self._generation.bump()
+
+    def import_users(self, users):
+        """Add many users with a single rewrite of users.json"""
+        with self._lock, self._file_lock:
+            self._refresh()
+            new_users = []
+            usernames, emails = set(self._by_username), set(self._by_email)
+            for user in users:
+                if user['username'] in usernames or user['email'] in emails:
+                    continue
+                usernames.add(user['username'])
+                emails.add(user['email'])
+                new_users.append(user)
+            if new_users:
+                self._write(self._users + new_users)
@@ -0,0 +1,151 @@
+"""Compact in-memory order records.
+
+Orders used to be kept as the dicts they were saved as, in one of two
+schemas: old single-item records with top-level ``product_id``/``quantity``/
+``unit_price``, and newer ones with an ``items`` list.  ``Order.from_dict()``
+normalizes either into an ``Order`` holding a tuple of ``LineItem``s, so the
+rest of the app reads ``order.items`` and ``order.total_cents`` without
+caring which schema a record was saved in.
+
+Both types use ``__slots__`` and keep amounts as integer cents; repeated
+strings (status, product, payment method) are interned, so a million orders
+share one copy of 'Pending' instead of a million.  Records are saved back
+with ``to_dict()``, which always writes the current ``SCHEMA_VERSION``.
+"""
+import sys
+
+SCHEMA_VERSION = 2
+
+ORDER_FIELDS = ('order_id', 'order_date', 'status', 'customer_name', 'email', 'phone',
+                'shipping_address', 'city', 'postal_code', 'payment_method')
+_LEGACY_ITEM_FIELDS = ('product_id', 'product_name', 'quantity', 'unit_price', 'price')
+_KNOWN_FIELDS = frozenset(ORDER_FIELDS + _LEGACY_ITEM_FIELDS + ('schema_version', 'items', 'total_price'))
+
+
+def _cents(amount):
+    return int(round(float(amount or 0) * 100))
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class LineItem:
+    __slots__ = ('product_id', 'product_name', 'quantity', 'unit_cents', 'total_cents')
+
+    def __init__(self, product_id, product_name, quantity, unit_cents, total_cents=None):
+        self.product_id = _intern(product_id)
+        self.product_name = _intern(product_name)
+        self.quantity = quantity
+        self.unit_cents = unit_cents
+        self.total_cents = unit_cents * quantity if total_cents is None else total_cents
+
+    @property
+    def unit_price(self):
+        return self.unit_cents / 100
+
+    @property
+    def total_price(self):
+        return self.total_cents / 100
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a line item from an ``items`` entry (or a legacy order's top level)"""
+        quantity = int(data.get('quantity', 0) or 0)
+        unit_cents = _cents(data.get('unit_price', data.get('price', 0)))
+        total = data.get('total_price')
+        return cls(data.get('product_id') or '', data.get('product_name') or '', quantity, unit_cents,
+                   None if total is None else _cents(total))
+
+    def to_dict(self):
+        return {
+            'product_id': self.product_id,
+            'product_name': self.product_name,
+            'quantity': self.quantity,
+            'unit_price': self.unit_price,
+            'total_price': self.total_price,
+        }
+
+
+class Order:
+    __slots__ = ORDER_FIELDS + ('items', 'total_cents', 'extra')
+
+    def __init__(self, items, total_cents=None, order_id=None, order_date='', status='Pending',
+                 customer_name='', email='', phone='', shipping_address='', city='', postal_code='',
+                 payment_method='', extra=None):
+        self.items = tuple(items)
+        self.total_cents = sum(item.total_cents for item in self.items) if total_cents is None else total_cents
+        self.order_id = order_id
+        self.order_date = order_date
+        self.status = _intern(status)
+        self.customer_name = customer_name
+        self.email = email
+        self.phone = phone
+        self.shipping_address = shipping_address
+        self.city = _intern(city)
+        self.postal_code = postal_code
+        self.payment_method = _intern(payment_method)
+        # Fields this version doesn't know about, kept so saving doesn't drop them
+        self.extra = extra
+
+    @property
+    def total_price(self):
+        return self.total_cents / 100
+
+    @property
+    def quantity(self):
+        """Total units across all line items"""
+        return sum(item.quantity for item in self.items)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build an order from a saved record in any schema version"""
+        if data.get('items') or is_current(data):
+            items = [LineItem.from_dict(item) for item in data.get('items') or ()]
+        else:
+            # Legacy single-item order: the item fields sit at the top level
+            items = [LineItem.from_dict(data)] if data.get('product_id') or data.get('quantity') else []
+        total = data.get('total_price')
+        extra = {key: value for key, value in data.items() if key not in _KNOWN_FIELDS} or None
+        return cls(
+            items,
+            total_cents=None if total is None else _cents(total),
+            order_id=data.get('order_id'),
+            order_date=data.get('order_date') or '',
+            status=data.get('status') or 'Pending',
+            customer_name=data.get('customer_name') or '',
+            email=data.get('email') or '',
+            phone=data.get('phone') or '',
+            shipping_address=data.get('shipping_address') or '',
+            city=data.get('city') or '',
+            postal_code=data.get('postal_code') or '',
+            payment_method=data.get('payment_method') or '',
+            extra=extra,
+        )
+
+    @classmethod
+    def coerce(cls, order):
+        """Pass Orders through; build one from a plain dict"""
+        return order if isinstance(order, cls) else cls.from_dict(order)
+
+    def to_dict(self):
+        """The record to save, in the current schema version"""
+        data = {'schema_version': SCHEMA_VERSION}
+        if self.extra:
+            data.update(self.extra)
+        data.update({
+            'order_id': self.order_id,
+            'items': [item.to_dict() for item in self.items],
+            'total_price': self.total_price,
+        })
+        for field in ORDER_FIELDS[1:]:
+            data[field] = getattr(self, field)
+        return data
+
+    def __repr__(self):
+        return f"<Order {self.order_id} {self.status} {len(self.items)} items>"
+
+
+def is_current(data):
+    """Whether a saved record is already in the current schema version"""
+    return data.get('schema_version') == SCHEMA_VERSION
@@ -0,0 +1,129 @@
+"""Order search terms and an in-memory inverted index with prefix matching.
+
+Orders are indexed by the words of customer_name, email, order_id and product
+names, plus the digits of the phone number.  A query matches the orders that
+have, for every query word, some term starting with that word; a pasted email
+or order ID splits into the same words it was indexed under.
+"""
+import bisect
+import re
+
+_WORD = re.compile(r'[^\W_]+')
+_PHONE = re.compile(r'^[\d\s()+.-]+$')
+
+
+def _words(text):
+    return _WORD.findall(str(text or '').casefold())
+
+
+def order_terms(order):
+    """Set of search terms for one order"""
+    terms = set()
+    for text in (order.customer_name, order.email, order.order_id):
+        terms.update(_words(text))
+    phone = re.sub(r'\D', '', str(order.phone or ''))
+    if phone:
+        terms.add(phone)
+    for item in order.items:
+        terms.update(_words(item.product_name))
+    return terms
+
+
+def query_terms(query):
+    """Prefixes to look up for a search box query, e.g. 'ana 0917-555'"""
+    prefixes = []
+    for chunk in str(query or '').casefold().split():
+        if _PHONE.match(chunk) and any(c.isdigit() for c in chunk):
+            # Phone numbers are indexed as bare digits
+            prefixes.append(re.sub(r'\D', '', chunk))
+        else:
+            prefixes.extend(_words(chunk))
+    return prefixes
+
+
+class TermIndex:
+    """term -> set of keys, with prefix lookups over a sorted vocabulary.
+
+    New terms go to a small unsorted overflow first and are merged into the
+    sorted vocabulary in bulk, so indexing one order never shifts a
+    million-entry list.  Build the initial index with ``build()``, which sorts
+    the vocabulary once.
+    """
+
+    MERGE_AT = 1024
+
+    def __init__(self):
+        self._postings = {}
+        self._vocabulary = []
+        self._new_terms = set()
+
+    def build(self, entries):
+        """Index many (key, terms) pairs, sorting the vocabulary once at the end"""
+        for key, terms in entries:
+            for term in terms:
+                keys = self._postings.get(term)
+                if keys is None:
+                    self._postings[term] = {key}
+                else:
+                    keys.add(key)
+        self._vocabulary = sorted(self._postings)
+        self._new_terms.clear()
+
+    def add(self, key, terms):
+        for term in terms:
+            keys = self._postings.get(term)
+            if keys is None:
+                self._postings[term] = {key}
+                self._new_terms.add(term)
+            else:
+                keys.add(key)
+        if len(self._new_terms) >= self.MERGE_AT:
+            self._merge()
+
+    def remove(self, key, terms):
+        # Emptied terms stay in the vocabulary; lookups skip them
+        for term in terms:
+            keys = self._postings.get(term)
+            if keys is not None:
+                keys.discard(key)
+
+    def _merge(self):
+        # Two sorted runs: Timsort merges them in linear time
+        self._vocabulary += sorted(self._new_terms)
+        self._vocabulary.sort()
+        self._new_terms.clear()
+
+    def _prefix_postings(self, prefix):
+        """Key sets of every term starting with prefix"""
+        i = bisect.bisect_left(self._vocabulary, prefix)
+        while i < len(self._vocabulary) and self._vocabulary[i].startswith(prefix):
+            yield self._postings[self._vocabulary[i]]
+            i += 1
+        for term in self._new_terms:
+            if term.startswith(prefix):
+                yield self._postings[term]
+
+    def prefix_keys(self, prefix):
+        """Union of the keys of every term starting with prefix"""
+        result = set()
+        for keys in self._prefix_postings(prefix):
+            result.update(keys)
+        return result
+
+    def search(self, query):
+        """Keys matching every prefix in the query (empty for an empty query)"""
+        prefixes = sorted(query_terms(query), key=len, reverse=True)
+        if not prefixes:
+            return set()
+        # Longest prefix first: it usually narrows the result the most.  Later
+        # prefixes only intersect with what is left, so a common word such as
+        # 'com' or 'ord' never builds its full union.
+        result = self.prefix_keys(prefixes[0])
+        for prefix in prefixes[1:]:
+            if not result:
+                break
+            narrowed = set()
+            for keys in self._prefix_postings(prefix):
+                narrowed |= result & keys
+            result = narrowed
+        return result
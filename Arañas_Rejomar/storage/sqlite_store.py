@@ -0,0 +1,457 @@
+"""SQLite storage backend (WAL mode, one connection per thread)"""
+import json
+import os
+import sqlite3
+import threading
+
+from .base import OrderStore, UserStore, end_of_day, make_order_id
+from .iostats import io_stats
+from .models import Order, is_current
+from .search import order_terms, query_terms
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id TEXT NOT NULL UNIQUE,
+    order_date TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL,
+    total_cents INTEGER NOT NULL DEFAULT 0,
+    units INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS orders_order_date ON orders (order_date, seq);
+CREATE INDEX IF NOT EXISTS orders_status ON orders (status, order_date, seq);
+
+-- Running per-status aggregates, kept current by the triggers below
+CREATE TABLE IF NOT EXISTS order_stats (
+    status TEXT PRIMARY KEY,
+    orders INTEGER NOT NULL DEFAULT 0,
+    revenue_cents INTEGER NOT NULL DEFAULT 0,
+    units INTEGER NOT NULL DEFAULT 0
+);
+CREATE TRIGGER IF NOT EXISTS orders_stats_insert AFTER INSERT ON orders BEGIN
+    INSERT OR IGNORE INTO order_stats (status) VALUES (NEW.status);
+    UPDATE order_stats SET orders = orders + 1, revenue_cents = revenue_cents + NEW.total_cents,
+        units = units + NEW.units WHERE status = NEW.status;
+END;
+CREATE TRIGGER IF NOT EXISTS orders_stats_delete AFTER DELETE ON orders BEGIN
+    UPDATE order_stats SET orders = orders - 1, revenue_cents = revenue_cents - OLD.total_cents,
+        units = units - OLD.units WHERE status = OLD.status;
+END;
+CREATE TRIGGER IF NOT EXISTS orders_stats_update AFTER UPDATE OF status ON orders BEGIN
+    UPDATE order_stats SET orders = orders - 1, revenue_cents = revenue_cents - OLD.total_cents,
+        units = units - OLD.units WHERE status = OLD.status;
+    INSERT OR IGNORE INTO order_stats (status) VALUES (NEW.status);
+    UPDATE order_stats SET orders = orders + 1, revenue_cents = revenue_cents + NEW.total_cents,
+        units = units + NEW.units WHERE status = NEW.status;
+END;
+
+-- Search terms per order (see storage/search.py); rows go with their order
+CREATE TABLE IF NOT EXISTS order_terms (
+    term TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (term, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS order_terms_seq ON order_terms (seq);
+CREATE TRIGGER IF NOT EXISTS orders_terms_delete AFTER DELETE ON orders BEGIN
+    DELETE FROM order_terms WHERE seq = OLD.seq;
+END;
+
+-- Change log for changes(): one row per insert, status change and delete
+CREATE TABLE IF NOT EXISTS order_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    op TEXT NOT NULL,
+    order_id TEXT NOT NULL,
+    status TEXT
+);
+CREATE TRIGGER IF NOT EXISTS orders_changes_insert AFTER INSERT ON orders BEGIN
+    INSERT INTO order_changes (op, order_id, status) VALUES ('add', NEW.order_id, NEW.status);
+END;
+CREATE TRIGGER IF NOT EXISTS orders_changes_update AFTER UPDATE OF status ON orders BEGIN
+    INSERT INTO order_changes (op, order_id, status) VALUES ('status', NEW.order_id, NEW.status);
+END;
+CREATE TRIGGER IF NOT EXISTS orders_changes_delete AFTER DELETE ON orders BEGIN
+    INSERT INTO order_changes (op, order_id) VALUES ('delete', OLD.order_id);
+END;
+
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+-- Orders get their terms as they're added, so only a database that already
+-- held orders before order_terms existed needs the backfill in search()
+INSERT OR IGNORE INTO store_meta (key, value)
+    SELECT 'order_terms', '1' WHERE NOT EXISTS (SELECT 1 FROM orders);
+-- Orders saved before the change log existed aren't in it, so only cursors
+-- from its creation on can be answered
+INSERT OR IGNORE INTO store_meta (key, value)
+    SELECT 'changes_floor', COALESCE(MAX(seq), 0) FROM order_changes;
+
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    email TEXT NOT NULL UNIQUE,
+    data TEXT NOT NULL
+);
+"""
+
+
+class SqliteDatabase:
+    """Opens one connection per thread (and per process, after a fork)"""
+
+    def __init__(self, path, schema=SCHEMA):
+        self.path = path
+        self.schema = schema
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=FULL')
+        with self._schema_lock:
+            if not self._schema_ready:
+                conn.executescript(self.schema)
+                self._schema_ready = True
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def transaction(self):
+        return _Transaction(self.connect())
+
+    def close(self):
+        """Close this thread's connection; the next connect() opens a fresh one"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, so concurrent writers queue on the lock"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+
+def _order_row(order):
+    return (order.order_id, order.order_date, order.status, order.total_cents, order.quantity,
+            json.dumps(order.to_dict(), ensure_ascii=False))
+
+
+def _insert_terms(conn, orders):
+    conn.executemany('INSERT OR IGNORE INTO order_terms (term, seq) SELECT ?, seq FROM orders WHERE order_id = ?',
+                     [(term, order.order_id) for order in orders for term in order_terms(order)])
+
+
+def _load_order(data, status):
+    io_stats.record_read('sqlite', len(data))
+    order = Order.from_dict(json.loads(data))
+    # The status column is authoritative; the JSON copy isn't rewritten on updates
+    order.status = status
+    return order
+
+
+def _load_user(data):
+    io_stats.record_read('sqlite', len(data))
+    return json.loads(data)
+
+
+def _date_filters(status, date_from, date_to):
+    clauses, params = [], []
+    if status is not None:
+        clauses.append('status = ?')
+        params.append(status)
+    if date_from:
+        clauses.append('order_date >= ?')
+        params.append(date_from)
+    if date_to:
+        clauses.append('order_date <= ?')
+        params.append(end_of_day(date_to))
+    where = ' WHERE ' + ' AND '.join(clauses) if clauses else ''
+    return where, params
+
+
+class SqliteOrderStore(OrderStore):
+    """Orders in an indexed SQLite table with trigger-maintained aggregates"""
+
+    # Change-log rows kept for changes(); older cursors get a reset
+    CHANGE_HISTORY = 100000
+
+    def __init__(self, db):
+        self.db = db
+        self.path = db.path
+        self._terms_ready = False
+
+    def all(self):
+        rows = self.db.connect().execute('SELECT data, status FROM orders ORDER BY seq')
+        return [_load_order(data, status) for data, status in rows]
+
+    def get(self, order_id):
+        row = self.db.connect().execute(
+            'SELECT data, status FROM orders WHERE order_id = ?', (order_id,)).fetchone()
+        return _load_order(*row) if row else None
+
+    def add(self, order):
+        order = Order.coerce(order)
+        with self.db.transaction() as conn:
+            if not order.order_id:
+                # AUTOINCREMENT never reuses a seq, and BEGIN IMMEDIATE makes
+                # this read-then-insert atomic across workers
+                row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'orders'").fetchone()
+                order.order_id = make_order_id((row[0] if row else 0) + 1)
+            row = _order_row(order)
+            conn.execute('INSERT INTO orders (order_id, order_date, status, total_cents, units, data) '
+                         'VALUES (?, ?, ?, ?, ?, ?)', row)
+            _insert_terms(conn, [order])
+        io_stats.record_write('sqlite', len(row[-1]))
+        return order.order_id
+
+    def add_many(self, orders):
+        orders = [Order.coerce(order) for order in orders]
+        rows = []
+        with self.db.transaction() as conn:
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'orders'").fetchone()
+            last_seq = row[0] if row else 0
+            for i, order in enumerate(orders, 1):
+                # Each insert takes the next AUTOINCREMENT value in turn
+                if not order.order_id:
+                    order.order_id = make_order_id(last_seq + i)
+                rows.append(_order_row(order))
+            conn.executemany('INSERT INTO orders (order_id, order_date, status, total_cents, units, data) '
+                             'VALUES (?, ?, ?, ?, ?, ?)', rows)
+            _insert_terms(conn, orders)
+        io_stats.record_write('sqlite', sum(len(row[-1]) for row in rows))
+        return [order.order_id for order in orders]
+
+    def import_orders(self, orders):
+        orders = [Order.coerce(order) for order in orders]
+        rows = [_order_row(o) for o in orders]
+        with self.db.transaction() as conn:
+            conn.executemany('INSERT OR IGNORE INTO orders (order_id, order_date, status, total_cents, '
+                             'units, data) VALUES (?, ?, ?, ?, ?, ?)', rows)
+            _insert_terms(conn, orders)
+        io_stats.record_write('sqlite', sum(len(row[-1]) for row in rows))
+
+    def update_status(self, order_id, status):
+        with self.db.transaction() as conn:
+            cur = conn.execute('UPDATE orders SET status = ? WHERE order_id = ?', (status, order_id))
+        io_stats.record_write('sqlite')
+        return cur.rowcount > 0
+
+    def delete(self, order_id):
+        with self.db.transaction() as conn:
+            cur = conn.execute('DELETE FROM orders WHERE order_id = ?', (order_id,))
+        io_stats.record_write('sqlite')
+        return cur.rowcount > 0
+
+    def page(self, page=1, per_page=50, status=None, date_from=None, date_to=None):
+        conn = self.db.connect()
+        where, params = _date_filters(status, date_from, date_to)
+        if date_from or date_to:
+            total = conn.execute('SELECT COUNT(*) FROM orders' + where, params).fetchone()[0]
+        elif status is not None:
+            row = conn.execute('SELECT orders FROM order_stats WHERE status = ?', (status,)).fetchone()
+            total = row[0] if row else 0
+        else:
+            total = conn.execute('SELECT COALESCE(SUM(orders), 0) FROM order_stats').fetchone()[0]
+        rows = conn.execute('SELECT data, status FROM orders' + where +
+                            ' ORDER BY order_date DESC, seq DESC LIMIT ? OFFSET ?',
+                            params + [per_page, (page - 1) * per_page])
+        return [_load_order(data, status) for data, status in rows], total
+
+    def iter_orders(self, status=None, date_from=None, date_to=None, batch_size=1000):
+        conn = self.db.connect()
+        where, params = _date_filters(status, date_from, date_to)
+        # Keyset pagination: each batch is a short read, never one long
+        # transaction holding back WAL checkpoints
+        after = where + (' AND ' if where else ' WHERE ') + '(order_date, seq) > (?, ?)'
+        last = ('', 0)
+        while True:
+            rows = conn.execute('SELECT data, status, order_date, seq FROM orders' + after +
+                                ' ORDER BY order_date, seq LIMIT ?', params + list(last) + [batch_size]).fetchall()
+            if not rows:
+                return
+            for data, status_value, _, _ in rows:
+                yield _load_order(data, status_value)
+            last = rows[-1][2:]
+
+    def upgrade_records(self, batch_size=1000):
+        """Rewrite the JSON of rows saved before the current schema, a batch per transaction"""
+        conn = self.db.connect()
+        upgraded = 0
+        last = 0
+        while True:
+            rows = conn.execute('SELECT seq, data, status FROM orders WHERE seq > ? ORDER BY seq LIMIT ?',
+                                (last, batch_size)).fetchall()
+            if not rows:
+                return upgraded
+            updates = []
+            for seq, data, status in rows:
+                if not is_current(json.loads(data)):
+                    updates.append((json.dumps(_load_order(data, status).to_dict(), ensure_ascii=False), seq))
+            if updates:
+                # Only the data column changes, so no trigger fires
+                with self.db.transaction() as tx:
+                    tx.executemany('UPDATE orders SET data = ? WHERE seq = ?', updates)
+                io_stats.record_write('sqlite', sum(len(data) for data, _ in updates))
+                upgraded += len(updates)
+            last = rows[-1][0]
+
+    def _ensure_search_terms(self):
+        """Backfill order_terms for databases created before search existed"""
+        if self._terms_ready:
+            return
+        with self.db.transaction() as conn:
+            if not conn.execute("SELECT 1 FROM store_meta WHERE key = 'order_terms'").fetchone():
+                conn.execute('DELETE FROM order_terms')
+                for seq, data in conn.execute('SELECT seq, data FROM orders').fetchall():
+                    conn.executemany('INSERT OR IGNORE INTO order_terms (term, seq) VALUES (?, ?)',
+                                     [(term, seq) for term in order_terms(Order.from_dict(json.loads(data)))])
+                conn.execute("INSERT INTO store_meta (key, value) VALUES ('order_terms', '1')")
+        self._terms_ready = True
+
+    def search(self, query, page=1, per_page=50, status=None, date_from=None, date_to=None):
+        prefixes = query_terms(query)
+        if not prefixes:
+            return [], 0
+        self._ensure_search_terms()
+        where, params = _date_filters(status, date_from, date_to)
+        for prefix in prefixes:
+            where += (' AND ' if where else ' WHERE ') + \
+                'seq IN (SELECT seq FROM order_terms WHERE term >= ? AND term < ?)'
+            params += [prefix, prefix + '\U0010ffff']
+        conn = self.db.connect()
+        total = conn.execute('SELECT COUNT(*) FROM orders' + where, params).fetchone()[0]
+        rows = conn.execute('SELECT data, status FROM orders' + where +
+                            ' ORDER BY order_date DESC, seq DESC LIMIT ? OFFSET ?',
+                            params + [per_page, (page - 1) * per_page])
+        return [_load_order(data, status) for data, status in rows], total
+
+    def _changes_floor(self, conn):
+        # Seeded by SCHEMA when the change log is created
+        return int(conn.execute("SELECT value FROM store_meta WHERE key = 'changes_floor'").fetchone()[0])
+
+    def _prune_changes(self, conn, latest):
+        floor = latest - self.CHANGE_HISTORY
+        with self.db.transaction():
+            conn.execute('DELETE FROM order_changes WHERE seq <= ?', (floor,))
+            conn.execute("UPDATE store_meta SET value = ? WHERE key = 'changes_floor' AND CAST(value AS INTEGER) < ?",
+                         (floor, floor))
+
+    def change_cursor(self):
+        row = self.db.connect().execute("SELECT seq FROM sqlite_sequence WHERE name = 'order_changes'").fetchone()
+        return row[0] if row else 0
+
+    def changes(self, since, limit=1000):
+        conn = self.db.connect()
+        floor = self._changes_floor(conn)
+        latest = self.change_cursor()
+        if latest - floor > 2 * self.CHANGE_HISTORY:
+            self._prune_changes(conn, latest)
+            floor = latest - self.CHANGE_HISTORY
+        if since < floor:
+            return [], latest, True
+        rows = conn.execute(
+            'SELECT c.seq, c.op, c.order_id, c.status, o.data, o.status FROM order_changes c '
+            "LEFT JOIN orders o ON c.op = 'add' AND o.order_id = c.order_id "
+            'WHERE c.seq > ? ORDER BY c.seq LIMIT ?', (since, limit)).fetchall()
+        changes = []
+        for seq, op, order_id, status, data, current_status in rows:
+            change = {'seq': seq, 'op': op, 'order_id': order_id}
+            if op == 'add':
+                change['order'] = _load_order(data, current_status) if data is not None else None
+            elif op == 'status':
+                change['status'] = status
+            changes.append(change)
+        if len(rows) == limit:
+            cursor = rows[-1][0]
+        else:
+            cursor = max(latest, rows[-1][0] if rows else since)
+        return changes, cursor, False
+
+    def stats(self):
+        io_stats.record_read('sqlite')
+        rows = self.db.connect().execute(
+            'SELECT status, orders, revenue_cents, units FROM order_stats WHERE orders > 0').fetchall()
+        # Cancelled orders stay countable but don't earn revenue
+        return {
+            'total_orders': sum(row[1] for row in rows),
+            'status_counts': {row[0]: row[1] for row in rows},
+            'revenue': sum(row[2] for row in rows if row[0] != 'Cancelled') / 100,
+            'units': sum(row[3] for row in rows if row[0] != 'Cancelled'),
+        }
+
+    def quantities(self, orders):
+        order_ids = [order.order_id for order in orders]
+        if not order_ids:
+            return {}
+        io_stats.record_read('sqlite')
+        rows = self.db.connect().execute(
+            'SELECT order_id, units FROM orders WHERE order_id IN (%s)' % ','.join('?' * len(order_ids)),
+            order_ids)
+        return dict(rows)
+
+
+class SqliteUserStore(UserStore):
+    """Users keyed by username with a unique index on email"""
+
+    def __init__(self, db):
+        self.db = db
+        self.path = db.path
+
+    def all(self):
+        rows = self.db.connect().execute('SELECT data FROM users ORDER BY rowid')
+        return [_load_user(data) for (data,) in rows]
+
+    def get(self, username):
+        row = self.db.connect().execute('SELECT data FROM users WHERE username = ?', (username,)).fetchone()
+        return _load_user(row[0]) if row else None
+
+    def get_by_email(self, email):
+        row = self.db.connect().execute('SELECT data FROM users WHERE email = ?', (email,)).fetchone()
+        return _load_user(row[0]) if row else None
+
+    def add(self, user_data):
+        with self.db.transaction() as conn:
+            # Same messages and precedence as the JSON backend
+            if conn.execute('SELECT 1 FROM users WHERE username = ?', (user_data['username'],)).fetchone():
+                return False, "Username already exists!"
+            if conn.execute('SELECT 1 FROM users WHERE email = ?', (user_data['email'],)).fetchone():
+                return False, "Email already registered!"
+            data = json.dumps(user_data)
+            conn.execute('INSERT INTO users (username, email, data) VALUES (?, ?, ?)',
+                         (user_data['username'], user_data['email'], data))
+        io_stats.record_write('sqlite', len(data))
+        return True, "User registered successfully!"
+
+    def set_password_hash(self, username, password_hash):
+        with self.db.transaction() as conn:
+            row = conn.execute('SELECT data FROM users WHERE username = ?', (username,)).fetchone()
+            if row is None:
+                return False
+            user = _load_user(row[0])
+            user.pop('password', None)
+            user['password_hash'] = password_hash
+            data = json.dumps(user)
+            conn.execute('UPDATE users SET data = ? WHERE username = ?', (data, username))
+        io_stats.record_write('sqlite', len(data))
+        return True
+
+    def import_users(self, users):
+        rows = [(u['username'], u['email'], json.dumps(u)) for u in users]
+        with self.db.transaction() as conn:
+            conn.executemany('INSERT OR IGNORE INTO users (username, email, data) VALUES (?, ?, ?)', rows)
+        io_stats.record_write('sqlite', sum(len(row[2]) for row in rows))
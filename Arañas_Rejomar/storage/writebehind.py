@@ -0,0 +1,126 @@
+"""Write-behind queue that group-commits orders from concurrent checkouts.
+
+Each checkout submits its order and waits on the returned future.  A single
+writer thread per process drains whatever is queued (up to ``max_batch``)
+and saves it with one ``add_many()`` call, so a burst of N checkouts costs a
+handful of fsyncs instead of N.  A checkout still only returns after its
+order is durably on disk.
+
+A checkout that gives up waiting withdraws its order if the writer hasn't
+picked it up yet.  If the writer has, the order will be saved, so the
+checkout waits for the write instead of reporting a failure that a retry
+would turn into a duplicate order.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class WriteQueueFull(Exception):
+    """The write-behind queue is at capacity; the caller should shed load"""
+
+
+class OrderWriter:
+    def __init__(self, store, max_queue=1000, max_batch=256):
+        self.store = store
+        self.max_batch = max_batch
+        self._queue = queue.Queue(max_queue)
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        atexit.register(self.close)
+
+    def _ensure_started(self):
+        # Started lazily, and again after a fork: threads don't survive
+        # into gunicorn workers forked from a preloaded app
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='order-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, order):
+        """Queue an order for saving; returns a Future resolving to its order_id"""
+        self._ensure_started()
+        future = Future()
+        try:
+            self._queue.put_nowait((order, future))
+        except queue.Full:
+            raise WriteQueueFull(f"{self._queue.maxsize} orders already waiting to be written") from None
+        return future
+
+    def save(self, order, timeout=None):
+        """Submit an order and wait until it is durably saved; returns its order_id.
+
+        Raises TimeoutError if the order was withdrawn unsaved after timeout.
+        """
+        future = self.submit(order)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            if future.cancel():
+                raise
+            # The writer already has it: it is being saved, so wait for that
+            return future.result()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = []
+            stop = False
+            while item is not _STOP:
+                batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            else:
+                stop = True
+            if batch:
+                self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch):
+        # Claim each order; ones whose checkout gave up waiting are dropped
+        batch = [(order, future) for order, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        unnumbered = [order for order, _ in batch if not getattr(order, 'order_id', None)]
+        try:
+            order_ids = self.store.add_many([order for order, _ in batch])
+        except Exception:
+            logger.exception("Group commit of %d orders failed; retrying one by one", len(batch))
+            # The failed batch numbered these from seqs the retries won't
+            # necessarily get; keeping them could hand a later order the same ID
+            for order in unnumbered:
+                order.order_id = None
+            # Isolate the bad order so the rest of the batch still gets saved
+            for order, future in batch:
+                try:
+                    future.set_result(self.store.add(order))
+                except Exception as e:
+                    future.set_exception(e)
+            return
+        logger.debug("Group-committed %d orders", len(batch))
+        for (_, future), order_id in zip(batch, order_ids):
+            future.set_result(order_id)
+
+    def close(self, timeout=30):
+        """Write everything still queued, then stop the writer thread"""
+        thread = self._thread
+        if thread is None or self._pid != os.getpid() or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
@@ -0,0 +1,34 @@
+import json
+import os
+import sys
+
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    return str(tmp_path)
+
+
+@pytest.fixture
+def write_users(data_dir):
+    def write(users):
+        with open(os.path.join(data_dir, 'users.json'), 'w', encoding='utf-8') as f:
+            json.dump(users, f)
+    return write
+
+
+@pytest.fixture
+def make_app(data_dir):
+    """create_app() on an empty data directory, with config overrides"""
+    import app as app_module
+
+    def make(**config):
+        settings = {'DATA_DIR': data_dir, 'LEGACY_ORDERS_FILES': [], 'BUILD_ASSETS': False,
+                    'WRITE_BEHIND': False, 'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000'}
+        settings.update(config)
+        return app_module.create_app(settings)
+    return make
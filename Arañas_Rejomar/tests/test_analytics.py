@@ -0,0 +1,77 @@
+import pytest
+
+from analytics import SalesAnalytics
+from storage import LineItem, Order, open_stores
+
+
+def make_order(date, *lines, status='Pending'):
+    items = [LineItem(product_id, product_id.title(), quantity, unit_cents)
+             for product_id, quantity, unit_cents in lines]
+    return Order(items, order_date=f'{date} 10:00:00', status=status)
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def store(request, data_dir):
+    return open_stores(request.param, data_dir)[0]
+
+
+def counting_rebuilds(analytics):
+    rebuilds = []
+    rebuild = analytics._rebuild
+    analytics._rebuild = lambda: (rebuilds.append(1), rebuild())
+    return rebuilds
+
+
+def test_report_totals_per_period(store):
+    store.add_many([
+        make_order('2026-03-02', ('soapy', 2, 1500), ('lemon', 1, 1200)),  # a Monday
+        make_order('2026-03-04', ('soapy', 1, 1500)),
+        make_order('2026-03-04', ('soapy', 5, 1500), status='Cancelled'),
+        make_order('2026-04-01', ('lemon', 2, 1200), status='Shipped'),
+    ])
+    analytics = SalesAnalytics(store)
+    day = analytics.report('day')
+    assert [(row['period'], row['revenue'], row['units']) for row in day['rows']] == [
+        ('2026-04-01', 24.0, 2), ('2026-03-04', 15.0, 1), ('2026-03-02', 42.0, 3)]
+    week = analytics.report('week', date_to='2026-03-29')
+    assert [(row['period'], row['products']['soapy']) for row in week['rows']] == [
+        ('2026-03-02', {'revenue': 45.0, 'units': 3})]
+    assert [(row['period'], row['revenue']) for row in analytics.report('month')['rows']] == [
+        ('2026-04', 24.0), ('2026-03', 57.0)]
+    assert day['funnel'][:4] == [('Pending', 2), ('Processing', 0), ('Shipped', 1), ('Delivered', 0)]
+    assert (day['revenue'], day['units']) == (81.0, 6)
+
+
+def test_changes_are_applied_without_a_rebuild(store):
+    first = store.add(make_order('2026-03-02', ('soapy', 2, 1500)))
+    analytics = SalesAnalytics(store)
+    analytics.refresh()
+    rebuilds = counting_rebuilds(analytics)
+
+    second = store.add(make_order('2026-03-02', ('lemon', 1, 1200)))
+    store.update_status(first, 'Cancelled')
+    store.add(make_order('2026-03-03', ('soapy', 1, 1500)))
+    store.delete(second)
+    store.update_status(first, 'Delivered')
+    report = analytics.report('day')
+    assert rebuilds == []
+    assert report == SalesAnalytics(store).report('day')
+    assert [(row['period'], row['revenue']) for row in report['rows']] == [
+        ('2026-03-03', 15.0), ('2026-03-02', 30.0)]
+    assert dict(report['funnel'])['Delivered'] == 1 and dict(report['funnel'])['Pending'] == 1
+
+
+def test_rebuilds_when_the_change_history_is_gone(data_dir):
+    store = open_stores('json', data_dir)[0]
+    first = store.add(make_order('2026-03-02', ('soapy', 2, 1500)))
+    analytics = SalesAnalytics(store)
+    analytics.refresh()
+    # A compaction by another instance drops the history the cursor points into
+    other = open_stores('json', data_dir)[0]
+    other.delete(first)
+    other.add(make_order('2026-03-05', ('lemon', 1, 1200)))
+    other.compact()
+    rebuilds = counting_rebuilds(analytics)
+    report = analytics.report('day')
+    assert rebuilds == [1]
+    assert [(row['period'], row['revenue']) for row in report['rows']] == [('2026-03-05', 12.0)]
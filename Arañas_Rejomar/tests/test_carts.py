@@ -0,0 +1,69 @@
+import os
+
+import pytest
+from flask import Flask, session
+
+from carts import ServerCarts
+
+
+@pytest.fixture
+def request_context():
+    flask_app = Flask(__name__)
+    flask_app.secret_key = 'test'
+    with flask_app.test_request_context():
+        yield
+
+
+@pytest.fixture
+def cart_path(data_dir):
+    return os.path.join(data_dir, 'carts.db')
+
+
+def test_cart_lives_on_the_server_under_a_token(request_context, cart_path):
+    carts = ServerCarts(cart_path)
+    assert carts.get() == {}
+    carts.add('soapy', 2)
+    carts.add('soapy', 1)
+    carts.add('malunggay', 1)
+    assert set(session) == {'cart_token'}
+    assert carts.get() == {'soapy': 3, 'malunggay': 1}
+    carts.set_quantity('soapy', 5)
+    carts.set_quantity('malunggay', 0)
+    assert carts.get() == {'soapy': 5}
+    carts.clear()
+    assert carts.get() == {}
+
+
+def test_change_by_another_worker_is_not_hidden_by_the_cache(request_context, cart_path):
+    mine, other = ServerCarts(cart_path), ServerCarts(cart_path)
+    mine.add('soapy', 1)
+    assert mine.get() == {'soapy': 1}
+    other.add('soapy', 2)
+    other.remove('missing')
+    assert mine.get() == {'soapy': 3}
+
+
+def test_session_cart_is_carried_over(request_context, cart_path):
+    session['cart'] = {'soapy': 2}
+    carts = ServerCarts(cart_path)
+    assert carts.get() == {'soapy': 2}
+    assert 'cart' not in session
+
+
+def test_expired_cart_starts_over_and_is_purged(request_context, cart_path):
+    carts = ServerCarts(cart_path, ttl=60)
+    carts.add('soapy', 2)
+    with carts.db.transaction() as conn:
+        conn.execute('UPDATE carts SET touched_at = touched_at - 120')
+    assert carts.get() == {}
+    assert carts.purge_expired() == 1
+    carts.add('malunggay', 1)
+    assert carts.get() == {'malunggay': 1}
+
+
+def test_app_keeps_only_the_token_in_the_cookie(make_app):
+    client = make_app(CART_BACKEND='server').test_client()
+    client.post('/cart/add/soapy', data={'quantity': 2})
+    with client.session_transaction() as state:
+        assert 'cart' not in state and state['cart_token']
+    assert b'Soapy Soap' in client.get('/cart').data
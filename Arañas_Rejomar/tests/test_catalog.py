@@ -0,0 +1,62 @@
+import json
+import os
+
+import catalog
+
+PRODUCTS = [
+    {'id': 'soapy', 'name': 'Soapy Soap', 'category': 'Classic', 'price': 15.0, 'image': 'soapy.jpg'},
+    {'id': 'malunggay', 'name': 'Malunggay Soap', 'category': 'Herbal', 'price': 10.0, 'image': 'malunggay.jpg'},
+]
+CHECKOUT_FORM = {'customer_name': 'Rey', 'email': 'rey@mail.com', 'phone': '0917', 'shipping_address': 'Street',
+                 'city': 'Manila', 'postal_code': '1000', 'payment_method': 'cod'}
+
+
+def write_catalog(path, products, mtime=None):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(products, f)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def test_catalog_reloads_when_the_file_changes(data_dir):
+    path = os.path.join(data_dir, 'products.json')
+    write_catalog(path, PRODUCTS, mtime=1000)
+    products = catalog.Catalog(path, check_interval=0)
+    first = products.current()
+    assert [p['id'] for p in first.listing(sort='price')[0]] == ['malunggay', 'soapy']
+    assert products.current() is first
+
+    write_catalog(path, PRODUCTS + [{'id': 'lemon', 'price': 12.5}], mtime=2000)
+    second = products.current()
+    assert second.get('lemon')['price_cents'] == 1250
+    assert second.version != first.version
+    # The snapshot a request started with doesn't change under it
+    assert first.get('lemon') is None
+
+    write_catalog(path, 'not a list', mtime=3000)
+    assert products.current() is second
+
+
+def test_checkout_refuses_items_dropped_from_the_catalog(make_app, data_dir):
+    path = os.path.join(data_dir, 'products.json')
+    write_catalog(path, PRODUCTS, mtime=1000)
+    flask_app = make_app(CATALOG_FILE=path, CATALOG_CHECK_INTERVAL=0)
+    client = flask_app.test_client()
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+    client.post('/cart/add/soapy')
+    client.post('/cart/add/malunggay')
+    write_catalog(path, PRODUCTS[1:], mtime=2000)
+
+    response = client.post('/checkout', data=CHECKOUT_FORM)
+    assert b'no longer available' in response.data
+    assert flask_app.extensions['soothing_bar'].order_store.all() == []
+    # The cart now only holds what is still sold, and checks out normally
+    client.post('/checkout', data=CHECKOUT_FORM)
+    (order,) = flask_app.extensions['soothing_bar'].order_store.all()
+    assert [item.product_id for item in order.items] == ['malunggay'] and order.total_cents == 1000
+
+    write_catalog(path, [], mtime=3000)
+    client.post('/cart/add/malunggay')
+    write_catalog(path, PRODUCTS[:1], mtime=4000)
+    assert client.post('/checkout', data=CHECKOUT_FORM).headers['Location'].endswith('/cart')
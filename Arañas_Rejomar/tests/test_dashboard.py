@@ -0,0 +1,58 @@
+import re
+
+import pytest
+
+from storage import LineItem, Order, open_stores
+
+
+def make_order(name, date, status='Pending'):
+    return Order([LineItem('soapy', 'Soapy', 1, 1500)], customer_name=name, order_date=date, status=status)
+
+
+def fill(store):
+    # Saved out of date order, as imports and clock changes can leave them
+    store.add_many([
+        make_order('mar2', '2026-03-02 09:00:00', 'Shipped'),
+        make_order('jan1', '2026-01-01 08:00:00'),
+        make_order('feb1-late', '2026-02-01 23:59:59', 'Shipped'),
+        make_order('feb1', '2026-02-01 10:00:00'),
+        make_order('feb2', '2026-02-02 00:00:00'),
+    ])
+
+
+def names(orders):
+    return [order.customer_name for order in orders]
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def store(request, data_dir):
+    store = open_stores(request.param, data_dir)[0]
+    fill(store)
+    return store
+
+
+def test_pages_are_newest_first(store):
+    assert names(store.page(page=1, per_page=2)[0]) == ['mar2', 'feb2']
+    assert names(store.page(page=2, per_page=2)[0]) == ['feb1-late', 'feb1']
+    assert names(store.page(page=3, per_page=2)[0]) == ['jan1']
+    assert store.page(page=4, per_page=2) == ([], 5)
+
+
+def test_filters_by_status_and_inclusive_dates(store):
+    assert names(store.page(status='Shipped')[0]) == ['mar2', 'feb1-late']
+    orders, total = store.page(date_from='2026-02-01', date_to='2026-02-01')
+    assert names(orders) == ['feb1-late', 'feb1'] and total == 2
+    orders, total = store.page(status='Pending', date_from='2026-01-15', per_page=1)
+    assert names(orders) == ['feb2'] and total == 2
+
+
+def test_dashboard_shows_the_requested_page(make_app):
+    flask_app = make_app()
+    store = flask_app.extensions['soothing_bar'].order_store
+    fill(store)
+    client = flask_app.test_client()
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+    page = client.get('/admin?status=Pending&per_page=2&page=1&date_to=bad').get_data(as_text=True)
+    shown = re.findall(r'<tbody class="order-rows" data-order-id="([^"]+)"', page)
+    assert [store.get(order_id).customer_name for order_id in shown] == ['feb2', 'feb1']
@@ -0,0 +1,37 @@
+import csv
+import io
+import json
+
+from export import csv_lines, jsonl_lines
+from storage import LineItem, Order
+
+
+def order(**fields):
+    return Order([LineItem('soapy', '=HYPERLINK("http://x")', 2, 1500)], order_id='ORD-1', **fields)
+
+
+def test_csv_neutralizes_formulas():
+    orders = [order(customer_name='=1+1', shipping_address='@SUM(A1)', phone='+639171234567', city='Manila')]
+    rows = list(csv.DictReader(io.StringIO(''.join(csv_lines(orders)))))
+    assert rows[0]['customer_name'] == "'=1+1"
+    assert rows[0]['shipping_address'] == "'@SUM(A1)"
+    assert rows[0]['phone'] == "'+639171234567"
+    assert rows[0]['product_name'] == '\'=HYPERLINK("http://x")'
+    assert rows[0]['city'] == 'Manila'
+    assert rows[0]['quantity'] == '2'
+
+
+def test_jsonl_stays_raw():
+    line = json.loads(''.join(jsonl_lines([order(customer_name='=1+1')])))
+    assert line['customer_name'] == '=1+1'
+    assert line['line_total'] == 30.0
+
+
+def test_orders_without_items_get_one_row():
+    orders = [Order([], order_id='ORD-0', customer_name='Empty'), order(customer_name='Full')]
+    rows = list(csv.DictReader(io.StringIO(''.join(csv_lines(orders)))))
+    assert [(row['order_id'], row['customer_name'], row['product_id']) for row in rows] == \
+        [('ORD-0', 'Empty', ''), ('ORD-1', 'Full', 'soapy')]
+    assert rows[0]['order_total'] == '0.0'
+    first = json.loads(next(jsonl_lines(orders)))
+    assert first['order_id'] == 'ORD-0' and first['product_id'] is None and first['quantity'] is None
@@ -0,0 +1,43 @@
+import re
+
+import pytest
+
+from storage import LineItem, Order
+
+
+def make_order(name):
+    return Order([LineItem('soapy', 'Soapy', 1, 1500)], customer_name=name, order_date='2026-01-01 10:00:00')
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def admin(request, make_app):
+    flask_app = make_app(STORAGE_BACKEND=request.param)
+    client = flask_app.test_client()
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+    return client, flask_app.extensions['soothing_bar'].order_store
+
+
+def test_feed_continues_from_the_rendered_cursor(admin):
+    client, store = admin
+    store.add(make_order('Before'))
+    page = client.get('/admin').get_data(as_text=True)
+    cursor = int(re.search(r'data-cursor="(\d+)"', page).group(1))
+    order_id = store.add(make_order('After'))
+    store.update_status(order_id, 'Shipped')
+
+    body = client.get(f'/admin/orders/feed?cursor={cursor}').get_json()
+    assert not body['reset']
+    assert [(c['op'], c['order_id']) for c in body['changes']] == [('add', order_id), ('status', order_id)]
+    assert body['changes'][0]['order']['customer_name'] == 'After'
+    assert body['stats']['total_orders'] == 2
+
+    again = client.get(f"/admin/orders/feed?cursor={body['cursor']}").get_json()
+    assert again == {'cursor': body['cursor'], 'reset': False, 'changes': []}
+
+
+def test_feed_without_cursor_returns_the_current_one(admin):
+    client, store = admin
+    store.add(make_order('Only'))
+    body = client.get('/admin/orders/feed').get_json()
+    assert body == {'cursor': store.change_cursor(), 'reset': False, 'changes': []}
@@ -0,0 +1,50 @@
+import os
+
+from storage import JsonOrderStore, JsonUserStore, LineItem, Order
+from storage.generation import GenerationCounter
+
+
+def make_order(name):
+    return Order([LineItem('soapy', 'Soapy', 1, 1500)], customer_name=name)
+
+
+def test_counter_is_shared_between_mappings(data_dir):
+    path = os.path.join(data_dir, 'orders.jsonl.gen')
+    first, second = GenerationCounter(path), GenerationCounter(path)
+    assert second.value() == 0
+    first.bump()
+    first.bump()
+    assert second.value() == 2
+
+
+def test_reader_sees_another_workers_write_via_generation(data_dir):
+    path = os.path.join(data_dir, 'orders.jsonl')
+    writer, reader = JsonOrderStore(path), JsonOrderStore(path)
+    writer.add(make_order('first'))
+    assert len(reader.all()) == 1
+    # Within RECHECK_INTERVAL, so only the generation counter can tell it to look
+    reader._recheck_at = float('inf')
+    writer.add(make_order('second'))
+    assert [o.customer_name for o in reader.all()] == ['first', 'second']
+
+
+def test_write_without_generation_bump_is_found_on_recheck(data_dir, monkeypatch):
+    path = os.path.join(data_dir, 'orders.jsonl')
+    writer, reader = JsonOrderStore(path), JsonOrderStore(path)
+    writer.add(make_order('first'))
+    assert len(reader.all()) == 1
+    # A writer that doesn't bump the counter (an older version, say)
+    monkeypatch.setattr(writer, '_written', lambda: None)
+    writer.add(make_order('second'))
+    assert len(reader.all()) == 1
+    reader._recheck_at = 0
+    assert len(reader.all()) == 2
+
+
+def test_user_store_sees_signup_from_another_instance(data_dir):
+    path = os.path.join(data_dir, 'users.json')
+    writer, reader = JsonUserStore(path), JsonUserStore(path)
+    assert reader.get('rey') is None
+    reader._recheck_at = float('inf')
+    writer.add({'username': 'rey', 'email': 'rey@mail.com'})
+    assert reader.get('rey')['email'] == 'rey@mail.com'
@@ -0,0 +1,126 @@
+import json
+import os
+
+from storage import JsonOrderStore, LineItem, Order
+
+LEGACY_ORDERS = [
+    {'order_id': 'ORD-20251107144512', 'product_id': 'soapy', 'product_name': 'Soapy Soap', 'quantity': 5,
+     'unit_price': 15.0, 'total_price': 75.0, 'customer_name': 'rey', 'order_date': '2025-11-07 14:45:12',
+     'status': 'Processing'},
+    {'order_id': 'ORD-20251107151538', 'total_price': 30.0, 'customer_name': 'ana',
+     'order_date': '2025-11-07 15:15:38', 'status': 'Pending',
+     'items': [{'product_id': 'soapy', 'product_name': 'Soapy Soap', 'quantity': 2, 'unit_price': 15.0,
+                'total_price': 30.0}]},
+]
+
+
+def make_order(name, date='2026-01-01 10:00:00', quantity=1):
+    return Order([LineItem('soapy', 'Soapy', quantity, 1500)], customer_name=name, order_date=date)
+
+
+def open_store(data_dir):
+    return JsonOrderStore(os.path.join(data_dir, 'orders.jsonl'))
+
+
+def names(store):
+    return [order.customer_name for order in store.all()]
+
+
+def test_legacy_orders_imported_once(data_dir):
+    legacy_path = os.path.join(data_dir, 'orders.json')
+    with open(legacy_path, 'w', encoding='utf-8') as f:
+        json.dump(LEGACY_ORDERS, f)
+    store = JsonOrderStore(os.path.join(data_dir, 'orders.jsonl'), legacy_paths=[legacy_path])
+    assert [(o.order_id, o.status, o.total_cents, o.quantity) for o in store.all()] == [
+        ('ORD-20251107144512', 'Processing', 7500, 5), ('ORD-20251107151538', 'Pending', 3000, 2)]
+    store.add(make_order('new'))
+    # orders.json is left alone, and a restart reads the journal, not it again
+    restarted = JsonOrderStore(store.path, legacy_paths=[legacy_path])
+    assert names(restarted) == ['rey', 'ana', 'new']
+
+
+def test_add_appends_one_line_and_rewrites_nothing(data_dir):
+    store = open_store(data_dir)
+    store.add_many([make_order(f'o{i}') for i in range(3)])
+    with open(store.path, 'rb') as f:
+        before = f.read()
+    order_id = store.add(make_order('next'))
+    with open(store.path, 'rb') as f:
+        after = f.read()
+    assert after.startswith(before)
+    record = json.loads(after[len(before):])
+    assert record['op'] == 'add' and record['order']['order_id'] == order_id
+    assert open_store(data_dir).get(order_id).customer_name == 'next'
+
+
+def test_replaced_journal_detected_even_with_reused_inode(data_dir):
+    writer, reader = open_store(data_dir), open_store(data_dir)
+    writer.add_many([make_order(f'old{i}') for i in range(20)])
+    assert len(reader.all()) == 20
+    for order in writer.all()[:15]:
+        writer.delete(order.order_id)
+    writer.compact()
+    writer.add_many([make_order(f'new{i}') for i in range(40)])
+    assert os.path.getsize(writer.path) > reader._offset
+    # Pretend the filesystem gave the compacted journal the old inode back
+    st = os.stat(writer.path)
+    reader._file_id = (st.st_dev, st.st_ino)
+    reader._recheck_at = 0
+    assert names(reader) == names(writer)
+    assert len(names(reader)) == 45
+
+
+def test_torn_last_line_is_skipped_and_later_appends_survive(data_dir):
+    store = open_store(data_dir)
+    store.add_many([make_order(f'o{i}') for i in range(3)])
+    with open(store.path, 'ab') as f:
+        f.write(b'{"seq": 4, "op": "add", "order": {"customer_na')
+    restarted = open_store(data_dir)
+    assert names(restarted) == ['o0', 'o1', 'o2']
+    restarted.add(make_order('after'))
+    assert names(open_store(data_dir)) == ['o0', 'o1', 'o2', 'after']
+
+
+def test_compaction_keeps_order_and_status(data_dir):
+    store = open_store(data_dir)
+    store.add_many([make_order(f'o{i}', date=f'2026-01-{i + 1:02d} 10:00:00') for i in range(6)])
+    orders = store.all()
+    store.update_status(orders[1].order_id, 'Shipped')
+    store.update_status(orders[4].order_id, 'Delivered')
+    store.delete(orders[2].order_id)
+    before = [(o.order_id, o.customer_name, o.status) for o in store.all()]
+    store.compact()
+    for compacted in (store, open_store(data_dir)):
+        assert [(o.order_id, o.customer_name, o.status) for o in compacted.all()] == before
+        assert [o.customer_name for o in compacted.page()[0]] == ['o5', 'o4', 'o3', 'o1', 'o0']
+        assert [o.customer_name for o in compacted.page(status='Shipped')[0]] == ['o1']
+    with open(store.path, encoding='utf-8') as f:
+        assert len(f.readlines()) == 1 + len(before)
+
+
+def test_reader_catches_up_after_another_instance_compacts(data_dir):
+    writer, reader = open_store(data_dir), open_store(data_dir)
+    writer.add_many([make_order(f'old{i}') for i in range(5)])
+    assert len(reader.all()) == 5
+    cursor = reader.change_cursor()
+    writer.delete(writer.all()[0].order_id)
+    writer.compact()
+    writer.add(make_order('new'))
+    # The generation counter tells the reader to look, no recheck needed
+    assert names(reader) == ['old1', 'old2', 'old3', 'old4', 'new']
+    # History before the compaction is gone, so the old cursor can't be served
+    changes, latest, reset = reader.changes(cursor)
+    assert reset and changes == [] and latest == reader.change_cursor()
+
+
+def test_changes_continue_from_cursor_taken_after_compaction(data_dir):
+    store = open_store(data_dir)
+    store.add_many([make_order(f'o{i}') for i in range(3)])
+    store.compact()
+    reader = open_store(data_dir)
+    assert reader.changes(0)[2] is True
+    cursor = reader.change_cursor()
+    store.add(make_order('later'))
+    changes, _, reset = reader.changes(cursor)
+    assert not reset
+    assert [(c['op'], c['order'].customer_name) for c in changes] == [('add', 'later')]
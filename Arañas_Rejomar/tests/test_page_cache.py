@@ -0,0 +1,53 @@
+import json
+import os
+
+from page_cache import RenderCache
+
+
+def test_repeat_request_is_served_from_cache_and_revalidates(make_app):
+    flask_app = make_app()
+    cache = flask_app.extensions['soothing_bar'].render_cache
+    client = flask_app.test_client()
+
+    first = client.get('/products')
+    assert first.status_code == 200 and first.headers['ETag']
+    assert first.headers['Vary'] == 'Cookie'
+    assert set(first.headers['Cache-Control'].split(', ')) == {'private', 'no-cache'}
+    second = client.get('/products')
+    assert second.data == first.data and second.headers['ETag'] == first.headers['ETag']
+    assert (cache.misses, cache.hits) == (1, 1)
+
+    not_modified = client.get('/products', headers={'If-None-Match': first.headers['ETag']})
+    assert not_modified.status_code == 304 and not_modified.data == b''
+    stale = client.get('/products', headers={'If-None-Match': '"something-else"'})
+    assert stale.status_code == 200
+
+
+def test_cart_and_catalog_changes_give_a_new_page(make_app, data_dir):
+    path = os.path.join(data_dir, 'products.json')
+    products = [{'id': 'soapy', 'name': 'Soapy Soap', 'category': 'Classic', 'price': 15.0, 'image': 'soapy.jpg'}]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(products, f)
+    client = make_app(CATALOG_FILE=path, CATALOG_CHECK_INTERVAL=0).test_client()
+    etag = client.get('/').headers['ETag']
+
+    client.post('/cart/add/soapy')
+    with_cart = client.get('/', headers={'If-None-Match': etag})
+    assert with_cart.status_code == 200 and with_cart.headers['ETag'] != etag
+
+    assert b'15.00' in client.get('/product/soapy').data
+    products[0]['price'] = 16.0
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(products, f)
+    os.utime(path, (1, 1))
+    assert b'16.00' in client.get('/product/soapy').data
+
+
+def test_render_cache_evicts_least_recently_used():
+    cache = RenderCache(max_entries=2)
+    cache.put('a', b'A')
+    cache.put('b', b'B')
+    cache.get('a')
+    cache.put('c', b'C')
+    assert cache.get('b') is None
+    assert cache.get('a')[0] == b'A' and len(cache) == 2
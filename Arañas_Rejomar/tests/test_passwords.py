@@ -0,0 +1,56 @@
+import os
+
+from passwords import PasswordHasher, hash_method
+
+LEGACY_USER = {'username': 'rey', 'email': 'rey@mail.com', 'password': 'secret',
+               'created_at': '2025-11-07 15:34:21'}
+
+
+def log_in(client, password='secret'):
+    response = client.post('/login', data={'username': 'rey', 'password': password})
+    client.get('/logout')
+    return response.status_code
+
+
+def test_short_method_names_are_not_rehashed():
+    hasher = PasswordHasher('scrypt')
+    valid, new_hash = hasher.verify(LEGACY_USER, 'secret')
+    assert valid and hash_method(new_hash) == 'scrypt:32768:8:1'
+    assert hasher.verify({'password_hash': new_hash}, 'secret') == (True, None)
+
+
+def test_plaintext_upgraded_once(make_app, write_users, data_dir):
+    write_users([LEGACY_USER])
+    client = make_app(PASSWORD_HASH_METHOD='scrypt').test_client()
+    users_file = os.path.join(data_dir, 'users.json')
+
+    assert log_in(client) == 302
+    with open(users_file, 'rb') as f:
+        upgraded = f.read()
+    assert b'password_hash' in upgraded and b'"secret"' not in upgraded
+
+    assert log_in(client) == 302
+    with open(users_file, 'rb') as f:
+        assert f.read() == upgraded
+
+
+def test_wrong_password_rejected(make_app, write_users):
+    write_users([LEGACY_USER])
+    client = make_app().test_client()
+    assert log_in(client, 'nope') == 200
+    assert log_in(client) == 302
+    assert log_in(client, 'nope') == 200
+
+
+def test_signup_rejects_taken_username_without_hashing(make_app, write_users, monkeypatch):
+    write_users([LEGACY_USER])
+    flask_app = make_app()
+    hasher = flask_app.extensions['soothing_bar'].password_hasher
+
+    def no_hash(password):
+        raise AssertionError("hashed a password for a taken username")
+
+    monkeypatch.setattr(hasher, 'hash', no_hash)
+    form = {'username': 'rey', 'email': 'new@mail.com', 'password': 'pw', 'confirm_password': 'pw'}
+    response = flask_app.test_client().post('/signup', data=form)
+    assert response.status_code == 200 and b'Username already exists!' in response.data
@@ -0,0 +1,34 @@
+import app as app_module
+import pricing
+
+
+def test_to_cents_rounds_to_nearest_cent():
+    assert pricing.to_cents('19.99') == 1999
+    assert pricing.to_cents(0.29) == 29  # 0.29 * 100 is 28.999999999999996
+    assert pricing.to_cents(4.35) == 435
+    assert pricing.to_cents(150) == 15000
+
+
+def test_cart_total_is_summed_in_cents():
+    products = {'a': {'name': 'A', 'price_cents': pricing.to_cents(0.1)},
+                'b': {'name': 'B', 'price_cents': pricing.to_cents(0.2)}}
+    priced = pricing.price_cart({'a': 3, 'b': 1, 'gone': 2}, products)
+    assert priced.total_cents == 50
+    assert priced.total == 0.5
+    assert priced.count == 6
+    assert [(line.product_id, line.total_cents) for line in priced.lines] == [('a', 30), ('b', 20)]
+    item = priced.lines[0].as_order_item()
+    assert (item.quantity, item.unit_cents, item.total_cents) == (3, 10, 30)
+
+
+def test_cart_priced_once_per_request_until_it_changes(make_app):
+    flask_app = make_app()
+    with flask_app.test_request_context('/cart'):
+        app_module.add_to_cart('soapy', 2)
+        priced = app_module.get_priced_cart()
+        assert app_module.get_priced_cart() is priced
+        assert (priced.count, priced.total_cents) == (2, 3000)
+        app_module.add_to_cart('soapy')
+        repriced = app_module.get_priced_cart()
+        assert repriced is not priced
+        assert (repriced.count, repriced.total_cents) == (3, 4500)
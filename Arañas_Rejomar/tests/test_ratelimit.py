@@ -0,0 +1,79 @@
+import os
+import runpy
+
+from ratelimit import RateLimits, TokenBuckets, parse_limits
+
+WRONG_LOGIN = {'username': 'nobody', 'password': 'wrong'}
+
+
+def test_parse_limits():
+    assert parse_limits('login=10/60, signup=5/600') == {'login': (10, 60.0), 'signup': (5, 600.0)}
+    assert parse_limits('') == {}
+
+
+def test_bucket_refills_over_time(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('ratelimit.time.monotonic', lambda: now[0])
+    buckets = TokenBuckets(2, 10)
+    assert buckets.acquire('a') == 0
+    assert buckets.acquire('a') == 0
+    assert buckets.acquire('a') == 5.0
+    # Other clients have their own bucket
+    assert buckets.acquire('b') == 0
+    now[0] += 5
+    assert buckets.acquire('a') == 0
+    assert buckets.acquire('a') > 0
+    # Never refills past the burst size
+    now[0] += 1000
+    assert [buckets.acquire('a') for _ in range(3)] == [0, 0, 5.0]
+
+
+def test_retry_after_rounds_up_and_unlisted_routes_are_free():
+    limits = RateLimits({'login': (1, 60)})
+    assert limits.retry_after('login', 'a') == 0
+    assert limits.retry_after('login', 'a') == 60
+    assert limits.retry_after('checkout', 'a') == 0
+
+
+def test_concurrency_cap():
+    limits = RateLimits({}, concurrency=1)
+    assert limits.try_enter()
+    assert not limits.try_enter()
+    limits.leave()
+    assert limits.try_enter()
+    assert RateLimits({}, concurrency=0).try_enter()
+
+
+def post_login(client, forwarded_for):
+    return client.post('/login', data=WRONG_LOGIN, headers={'X-Forwarded-For': forwarded_for})
+
+
+def test_forwarded_clients_get_separate_buckets(make_app):
+    client = make_app(RATE_LIMITS={'login': (1, 60)}, PROXY_HOPS=1).test_client()
+    assert post_login(client, '203.0.113.1').status_code == 200
+    response = post_login(client, '203.0.113.1')
+    assert response.status_code == 429 and response.headers['Retry-After'] == '60'
+    assert post_login(client, '203.0.113.2').status_code == 200
+
+
+def test_forwarded_header_ignored_without_proxy(make_app):
+    client = make_app(RATE_LIMITS={'login': (1, 60)}).test_client()
+    assert post_login(client, '203.0.113.1').status_code == 200
+    assert post_login(client, '203.0.113.2').status_code == 429
+
+
+def load_gunicorn_conf(monkeypatch, bind):
+    monkeypatch.setenv('SOOTHING_BAR_BIND', bind)
+    # Set first so monkeypatch restores the variable the config file sets
+    monkeypatch.setenv('SOOTHING_BAR_PROXY_HOPS', '')
+    monkeypatch.delenv('SOOTHING_BAR_PROXY_HOPS')
+    runpy.run_path(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'gunicorn.conf.py'))
+    return os.environ.get('SOOTHING_BAR_PROXY_HOPS')
+
+
+def test_gunicorn_trusts_proxy_only_on_loopback(monkeypatch):
+    assert load_gunicorn_conf(monkeypatch, '127.0.0.1:8000') == '1'
+    assert load_gunicorn_conf(monkeypatch, '[::1]:8000') == '1'
+    assert load_gunicorn_conf(monkeypatch, 'unix:/run/soothing.sock') == '1'
+    assert load_gunicorn_conf(monkeypatch, '0.0.0.0:8000') is None
+    assert load_gunicorn_conf(monkeypatch, 'shop.example.com:80') is None
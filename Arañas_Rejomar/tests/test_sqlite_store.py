@@ -0,0 +1,47 @@
+import os
+import sqlite3
+
+from storage import LineItem, Order, SqliteDatabase, SqliteOrderStore
+
+
+def make_order(name):
+    return Order([LineItem('soapy', 'Soapy', 1, 1500)], customer_name=name, order_date='2026-01-01 10:00:00')
+
+
+def test_new_database_needs_no_term_backfill(data_dir):
+    store = SqliteOrderStore(SqliteDatabase(os.path.join(data_dir, 'store.db')))
+    store.import_orders([make_order('Imported')])
+    store.add(make_order('Added'))
+    conn = store.db.connect()
+    assert conn.execute("SELECT 1 FROM store_meta WHERE key = 'order_terms'").fetchone()
+    terms = conn.execute('SELECT COUNT(*) FROM order_terms').fetchone()[0]
+    conn.execute('CREATE TEMP TRIGGER no_backfill BEFORE DELETE ON order_terms '
+                 "BEGIN SELECT RAISE(FAIL, 'backfilled'); END")
+    orders, total = store.search('added')
+    assert [o.customer_name for o in orders] == ['Added'] and total == 1
+    assert conn.execute('SELECT COUNT(*) FROM order_terms').fetchone()[0] == terms
+
+
+def test_database_from_before_search_is_backfilled(data_dir):
+    path = os.path.join(data_dir, 'store.db')
+    store = SqliteOrderStore(SqliteDatabase(path))
+    store.add(make_order('Before Search'))
+    store.db.close()
+    with sqlite3.connect(path) as conn:
+        conn.execute('DELETE FROM order_terms')
+        conn.execute("DELETE FROM store_meta WHERE key = 'order_terms'")
+    store = SqliteOrderStore(SqliteDatabase(path))
+    orders, total = store.search('before')
+    assert [o.customer_name for o in orders] == ['Before Search'] and total == 1
+
+
+def test_cursor_from_before_first_changes_call_is_served(data_dir):
+    store = SqliteOrderStore(SqliteDatabase(os.path.join(data_dir, 'store.db')))
+    store.add(make_order('Rendered'))
+    # Handed out by a page render, before anything called changes()
+    cursor = store.change_cursor()
+    store.add(make_order('Later'))
+    changes, latest, reset = store.changes(cursor)
+    assert not reset
+    assert [(c['op'], c['order'].customer_name) for c in changes] == [('add', 'Later')]
+    assert latest == store.change_cursor()
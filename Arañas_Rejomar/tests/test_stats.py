@@ -0,0 +1,27 @@
+import pytest
+
+from storage import LineItem, Order, open_stores
+
+
+def make_order(quantity, unit_cents):
+    return Order([LineItem('soapy', 'Soapy', quantity, unit_cents)], order_date='2026-01-01 10:00:00')
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def store(request, data_dir):
+    return open_stores(request.param, data_dir)[0]
+
+
+def test_counters_follow_adds_status_changes_and_deletes(store):
+    first = store.add(make_order(2, 1500))
+    second = store.add(make_order(1, 1000))
+    third = store.add(make_order(3, 500))
+    store.update_status(second, 'Shipped')
+    store.update_status(third, 'Cancelled')
+    assert store.stats() == {'total_orders': 3, 'status_counts': {'Pending': 1, 'Shipped': 1, 'Cancelled': 1},
+                             'revenue': 40.0, 'units': 3}
+    store.delete(first)
+    store.update_status(second, 'Delivered')
+    # Statuses that have no orders left are dropped, on both backends
+    assert store.stats() == {'total_orders': 2, 'status_counts': {'Delivered': 1, 'Cancelled': 1},
+                             'revenue': 10.0, 'units': 1}
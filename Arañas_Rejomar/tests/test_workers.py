@@ -0,0 +1,56 @@
+import multiprocessing
+import os
+
+from storage import JsonOrderStore, JsonUserStore, LineItem, Order
+
+WORKERS = 4
+ORDERS_PER_WORKER = 25
+
+
+def make_order(name):
+    return Order([LineItem('soapy', 'Soapy', 1, 1500)], customer_name=name)
+
+
+def place_orders(path, worker):
+    store = JsonOrderStore(path)
+    for i in range(ORDERS_PER_WORKER):
+        if i % 5 == 4:
+            store.add_many([make_order(f'w{worker}-{i}-a'), make_order(f'w{worker}-{i}-b')])
+        else:
+            store.add(make_order(f'w{worker}-{i}'))
+
+
+def sign_up(path, worker):
+    store = JsonUserStore(path)
+    for i in range(10):
+        assert store.add({'username': f'w{worker}-{i}', 'email': f'w{worker}-{i}@mail.com'})[0]
+
+
+def run_workers(target, path):
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=target, args=(path, n)) for n in range(WORKERS)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+    assert all(worker.exitcode == 0 for worker in workers)
+
+
+def test_concurrent_workers_keep_every_order_with_unique_ids(data_dir):
+    path = os.path.join(data_dir, 'orders.jsonl')
+    reader = JsonOrderStore(path)
+    assert reader.all() == []
+    run_workers(place_orders, path)
+    expected = WORKERS * ORDERS_PER_WORKER * 6 // 5
+    for store in (reader, JsonOrderStore(path)):
+        orders = store.all()
+        assert len(orders) == expected
+        assert len({order.order_id for order in orders}) == expected
+        assert store.stats()['total_orders'] == expected
+
+
+def test_concurrent_signups_are_all_kept(data_dir):
+    path = os.path.join(data_dir, 'users.json')
+    run_workers(sign_up, path)
+    assert len(JsonUserStore(path).all()) == WORKERS * 10
+
@@ -0,0 +1,62 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+import pytest
+
+from storage import LineItem, Order, OrderWriter, SqliteDatabase, SqliteOrderStore
+
+
+class SlowStore:
+    """Holds every add_many() until released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.saved = []
+
+    def add_many(self, orders):
+        self.release.wait(5)
+        self.saved.extend(orders)
+        return list(orders)
+
+
+def test_running_write_is_waited_for_not_failed():
+    store = SlowStore()
+    writer = OrderWriter(store)
+    threading.Timer(0.2, store.release.set).start()
+    assert writer.save('first', timeout=0.05) == 'first'
+    assert store.saved == ['first']
+
+
+def test_queued_order_is_withdrawn_on_timeout():
+    store = SlowStore()
+    writer = OrderWriter(store)
+    first = writer.submit('first')
+    while not first.running():
+        time.sleep(0.001)
+    # The writer is busy with 'first', so 'second' is still queued
+    with pytest.raises(TimeoutError):
+        writer.save('second', timeout=0.05)
+    store.release.set()
+    writer.close()
+    assert store.saved == ['first']
+
+
+def make_order(name, order_id=None):
+    return Order([LineItem('soapy', 'Soapy', 1, 1500)], customer_name=name, order_id=order_id)
+
+
+def test_failed_batch_ids_are_not_reused(data_dir):
+    store = SqliteOrderStore(SqliteDatabase(os.path.join(data_dir, 'store.db')))
+    taken = store.add(make_order('first'))
+    writer = OrderWriter(store)
+    # The duplicate ID fails the batch, after the others were numbered
+    batch = [(make_order('a'), Future()), (make_order('dup', taken), Future()), (make_order('c'), Future())]
+    writer._commit(batch)
+    assert batch[1][1].exception() is not None
+    later = writer.save(make_order('d'))
+    writer.close()
+    assert [o.customer_name for o in store.all()] == ['first', 'a', 'c', 'd']
+    ids = [taken, batch[0][1].result(), batch[2][1].result(), later]
+    assert [o.order_id for o in store.all()] == ids and len(set(ids)) == 4